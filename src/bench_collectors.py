@@ -0,0 +1,181 @@
+import os
+import sys
+import json
+import math
+import shutil
+import asyncio
+import argparse
+import tempfile
+
+from aiohttp import web
+
+import mock_riot_api
+from mock_riot_api import (DEFAULT_RATE_LIMITS, DEFAULT_METHOD_LIMITS, seeded_random, synthetic_puuid,
+                           synthetic_match_ids, parse_limits, parse_method_limits)
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# every collector, how to run it, the seed files it starts from and the endpoints (method limits) it spends its budget on
+COLLECTORS = {
+    "puuids": {"args": ["puuids.py"], "seeds": ["summoner_ids"], "methods": ["summoner-v4.getBySummonerId"]},
+    "match_history": {"args": ["match_history.py"], "seeds": ["summoner_ids", "puuids"],
+                      "methods": ["match-v5.getMatchIdsByPUUID"]},
+    "match_details": {"args": ["match_details.py"], "seeds": ["match_ids"],
+                      "methods": ["match-v5.getMatch", "match-v5.getTimeline"]},
+    "region_collector": {
+        "args": ["region_collector.py", "--platforms", "na1", "--matches", "1000000", "--api-key", "mock"],
+        "seeds": ["summoner_ids", "puuids"],
+        "methods": ["match-v5.getMatchIdsByPUUID", "match-v5.getMatch", "match-v5.getTimeline"],
+    },
+}
+
+
+def allowed_requests(windows, seconds):
+    """
+    Get the most requests a fresh client can make in the given time under a set of sliding windows.
+    """
+    if not windows:
+        return math.inf
+    return min(limit * math.ceil(seconds / window) for limit, window in windows)
+
+
+def allowed_rate(limits, method_limits, methods, seconds):
+    """
+    Get the best achievable requests per second over a run, given the application limits
+    and the method limits of every endpoint the collector uses.
+    """
+    app = allowed_requests(limits, seconds)
+    methods_total = sum(allowed_requests(method_limits.get(method, []), seconds) for method in methods)
+    return min(app, methods_total) / seconds
+
+
+def prepare_sandbox(root, seed_names, players):
+    """
+    Lay out a working copy of the data folders with synthetic seeds, so the collectors run
+    unchanged from <root>/src and never touch the real data.
+    """
+    os.makedirs(os.path.join(root, "src"))
+    os.makedirs(os.path.join(root, "config"))
+    with open(os.path.join(root, "config", "credentials.json"), 'w') as f:
+        json.dump({"riot_api_key": "mock"}, f)
+
+    summoner_ids = [f"summoner-{i}" for i in range(players)]
+    puuids = {s: synthetic_puuid(seeded_random("summoner", "na1", s)) for s in summoner_ids}
+    match_ids = sorted({m for puuid in list(puuids.values())[:players // 10 + 1]
+                        for m in synthetic_match_ids("americas", puuid, 10)})
+
+    seeds = {
+        "summoner_ids": ("summoner_id/summoner_id.json", {"DIAMOND": summoner_ids}),
+        "puuids": ("puuids/puuids.json", puuids),
+        "match_ids": ("match_ids/match_ids.json", match_ids),
+    }
+    for path, data in (seeds[name] for name in seed_names):
+        path = os.path.join(root, "data", "raw", path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(data, f)
+
+
+async def run_collector(name, duration, port, app_options, sandbox_root, players):
+    """
+    Run one collector against a fresh mock server for at most `duration` seconds.
+
+    Returns:
+    - dict, what the mock answered and the achieved vs allowed request rate.
+    """
+    app = mock_riot_api.create_app(**app_options)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", port)
+    await site.start()
+
+    sandbox = os.path.join(sandbox_root, name)
+    prepare_sandbox(sandbox, COLLECTORS[name]["seeds"], players)
+    env = dict(os.environ, RIOT_API_BASE=f"http://127.0.0.1:{port}/{{route}}", PYTHONUNBUFFERED="1")
+    script, *args = COLLECTORS[name]["args"]
+    with open(os.path.join(sandbox, "collector.log"), 'w') as log:
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, os.path.join(SRC_DIR, script), *args,
+            cwd=os.path.join(sandbox, "src"), env=env, stdin=asyncio.subprocess.DEVNULL, stdout=log, stderr=log
+        )
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        try:
+            await asyncio.wait_for(process.wait(), duration)
+        except asyncio.TimeoutError:
+            process.terminate()
+            await process.wait()
+        elapsed = loop.time() - start
+    await runner.cleanup()
+
+    totals = {"ok": 0, "rate_limited": 0, "service_429": 0, "errors": 0}
+    for counts in app["stats"].values():
+        for key in totals:
+            totals[key] += counts[key]
+    allowed = allowed_rate(app_options["limits"], app_options["method_limits"], COLLECTORS[name]["methods"], elapsed)
+    achieved = totals["ok"] / elapsed
+    return {
+        "collector": name,
+        "seconds": elapsed,
+        "exit_code": process.returncode,
+        **totals,
+        "achieved_rps": achieved,
+        "allowed_rps": allowed,
+        "utilization": achieved / allowed if allowed else 0.0,
+    }
+
+
+async def benchmark(collectors, duration, app_options, port=8766, players=2000, keep_sandbox=False):
+    """
+    Measure every collector against the mock API, one at a time so they don't share a budget.
+
+    Returns:
+    - list of dicts, one per collector (see run_collector).
+    """
+    sandbox_root = tempfile.mkdtemp(prefix="bench_collectors_")
+    results = []
+    try:
+        for name in collectors:
+            print(f"Running {name} for up to {duration:.0f}s...")
+            results.append(await run_collector(name, duration, port, app_options, sandbox_root, players))
+    finally:
+        if keep_sandbox:
+            print(f"Collector logs and outputs kept in {sandbox_root}")
+        else:
+            shutil.rmtree(sandbox_root, ignore_errors=True)
+
+    print(f"{'collector':>17} {'seconds':>8} {'ok':>6} {'429':>5} {'svc 429':>8} {'5xx':>5} "
+          f"{'req/s':>7} {'allowed':>8} {'used':>6}")
+    for row in results:
+        print(f"{row['collector']:>17} {row['seconds']:8.1f} {row['ok']:6d} {row['rate_limited']:5d} "
+              f"{row['service_429']:8d} {row['errors']:5d} {row['achieved_rps']:7.2f} {row['allowed_rps']:8.2f} "
+              f"{row['utilization']:6.0%}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure each collector's achieved request rate against the mock Riot API.")
+    parser.add_argument("--collectors", nargs="+", default=list(COLLECTORS), choices=list(COLLECTORS))
+    parser.add_argument("--duration", type=float, default=150, help="seconds per collector; cover the longest window to see it bind")
+    parser.add_argument("--limits", type=parse_limits, default=DEFAULT_RATE_LIMITS, help='application windows, e.g. "20:1,100:120"')
+    parser.add_argument("--method-limits", type=parse_method_limits, default=DEFAULT_METHOD_LIMITS,
+                        help='per-endpoint windows, e.g. "match-v5.getTimeline=500:10"')
+    parser.add_argument("--latency-ms", type=float, default=30)
+    parser.add_argument("--jitter-ms", type=float, default=20)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--service-429-rate", type=float, default=0.0)
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--players", type=int, default=2000, help="synthetic summoners to seed the collectors with")
+    parser.add_argument("--keep-sandbox", action="store_true", help="keep the collectors' logs and outputs")
+    parser.add_argument("--output", default=None, help="write the results as JSON to this path")
+    args = parser.parse_args()
+
+    app_options = {
+        "limits": args.limits, "method_limits": args.method_limits,
+        "latency": args.latency_ms / 1000, "jitter": args.jitter_ms / 1000,
+        "error_rate": args.error_rate, "service_429_rate": args.service_429_rate,
+    }
+    results = asyncio.run(benchmark(args.collectors, args.duration, app_options, args.port, args.players, args.keep_sandbox))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=4)
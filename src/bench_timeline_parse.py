@@ -0,0 +1,106 @@
+import io
+import os
+import glob
+import json
+import time
+import argparse
+import tracemalloc
+
+from match_details import extract_match_details, parse_timeline_stream
+
+# recorded responses: timelines/<match_id>.json and, optionally, matches/<match_id>.json
+FIXTURES_DIR = "../data/raw/fixtures/"
+
+
+def load_fixtures(fixtures_dir, synthetic_count):
+    """
+    Load recorded timeline payloads, or generate synthetic ones with mock_riot_api when none are recorded.
+
+    Returns:
+    - list of (match_id, timeline bytes, match data or None).
+    """
+    fixtures = []
+    for path in sorted(glob.glob(os.path.join(fixtures_dir, "timelines", "*.json"))):
+        match_id = os.path.basename(path)[:-5]
+        with open(path, 'rb') as f:
+            body = f.read()
+        match_path = os.path.join(fixtures_dir, "matches", f"{match_id}.json")
+        match_data = None
+        if os.path.exists(match_path):
+            with open(match_path, 'r') as f:
+                match_data = json.load(f)
+        fixtures.append((match_id, body, match_data))
+
+    if not fixtures:
+        from mock_riot_api import synthetic_match, synthetic_timeline
+        for i in range(synthetic_count):
+            match_id = f"NA1_{5159373690 + i}"
+            fixtures.append((match_id, json.dumps(synthetic_timeline(match_id)).encode(), synthetic_match(match_id)))
+    return fixtures
+
+
+def measure(parse, body):
+    """
+    Parse one payload and return (result, seconds, peak traced bytes).
+
+    Time and memory come from separate runs, since tracing allocations slows parsing down.
+    """
+    start = time.perf_counter()
+    result = parse(io.BytesIO(body))
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    parse(io.BytesIO(body))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def benchmark(fixtures):
+    """
+    Compare full json.load parsing with the streaming purchase-event parser on every fixture.
+
+    Extracted match details are compared too whenever the match payload is available.
+
+    Returns:
+    - dict, per-parser mean and max of parse time and peak memory.
+    """
+    stats = {"json.load": {"seconds": [], "peak": []}, "streaming": {"seconds": [], "peak": []}}
+    mismatches = 0
+
+    for match_id, body, match_data in fixtures:
+        full, full_seconds, full_peak = measure(json.load, body)
+        streamed, stream_seconds, stream_peak = measure(parse_timeline_stream, body)
+        stats["json.load"]["seconds"].append(full_seconds)
+        stats["json.load"]["peak"].append(full_peak)
+        stats["streaming"]["seconds"].append(stream_seconds)
+        stats["streaming"]["peak"].append(stream_peak)
+
+        if match_data is not None and extract_match_details(match_data, full) != extract_match_details(match_data, streamed):
+            mismatches += 1
+            print(f"Extracted details differ for {match_id}")
+
+    sizes = [len(body) for _, body, _ in fixtures]
+    print(f"{len(fixtures)} timelines, mean size {sum(sizes) / len(sizes) / 1024:.0f} KiB, {mismatches} extraction mismatches")
+    print(f"{'parser':>10} {'mean ms':>9} {'max ms':>9} {'mean peak KiB':>14} {'max peak KiB':>13}")
+    summary = {}
+    for parser, values in stats.items():
+        summary[parser] = {
+            "mean_ms": sum(values["seconds"]) / len(fixtures) * 1000,
+            "max_ms": max(values["seconds"]) * 1000,
+            "mean_peak_kib": sum(values["peak"]) / len(fixtures) / 1024,
+            "max_peak_kib": max(values["peak"]) / 1024,
+        }
+        row = summary[parser]
+        print(f"{parser:>10} {row['mean_ms']:9.2f} {row['max_ms']:9.2f} {row['mean_peak_kib']:14.0f} {row['max_peak_kib']:13.0f}")
+    summary["mismatches"] = mismatches
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark full vs streaming timeline parsing.")
+    parser.add_argument("--fixtures-dir", default=FIXTURES_DIR)
+    parser.add_argument("--synthetic", type=int, default=20, help="synthetic timelines to generate when no fixtures are recorded")
+    args = parser.parse_args()
+
+    benchmark(load_fixtures(args.fixtures_dir, args.synthetic))
@@ -0,0 +1,310 @@
+import os
+import json
+import time
+import random
+import asyncio
+import argparse
+import resource
+import contextlib
+
+# traffic classes a mix can draw from
+TRAFFIC_KINDS = ("hot", "cold", "invalid", "counter")
+DEFAULT_MIX = {"hot": 0.6, "cold": 0.25, "invalid": 0.1, "counter": 0.05}
+
+
+class FakeContext:
+    """
+    Stand-in for discord.ext.commands.Context: records what the bot sends instead of sending it.
+    """
+
+    def __init__(self):
+        self.responses = []
+
+    async def send(self, content):
+        self.responses.append(content)
+
+
+class FakeGateway:
+    """
+    Dispatch "!command arg ..." messages straight to the bot's command callbacks, without a
+    Discord connection, and time every one of them.
+    """
+
+    def __init__(self, bot, prefix="!"):
+        self.bot = bot
+        self.prefix = prefix
+        self.results = []
+
+    async def dispatch(self, content, kind, scheduled):
+        """
+        Run one message through its command. Latency counts from the scheduled arrival, so time
+        spent waiting for a blocked event loop is included, as a Discord user would see it.
+        """
+        name, *args = content[len(self.prefix):].split()
+        command = self.bot.get_command(name)
+        ctx = FakeContext()
+        await command.callback(ctx, *args)
+        finished = time.perf_counter()
+
+        reply = ctx.responses[-1] if ctx.responses else ""
+        self.results.append({
+            "kind": kind,
+            "start": scheduled,
+            "latency": finished - scheduled,
+            "ok": not reply.startswith(("Error:", "An error occurred:")),
+        })
+
+
+def rss_mb(pid="self"):
+    """
+    Current resident set size of a process in MB (Linux), falling back to the peak for this process.
+    """
+    try:
+        with open(f"/proc/{pid}/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except OSError:
+        if pid != "self":
+            return 0.0
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def worker_pids():
+    import serving
+    if serving._executor is None:
+        return []
+    return list(serving._executor._processes)
+
+
+def build_traffic(df, count):
+    """
+    Prepare the message pool of every traffic class.
+
+    - hot: the 20 most played matchups, the requests a cache or warm path should absorb.
+    - cold: random champion pairs, mostly sparse or unseen matchups.
+    - invalid: misspelled champion names.
+    - counter: counter-pick searches for popular opponents.
+
+    Returns:
+    - dict, traffic class -> list of messages.
+    """
+    import serving
+
+    rng = random.Random(42)
+    hot = serving.sample_matchups(df, 20)
+    names = sorted(serving.champion_id_to_name[c] for c in df['championId'].unique() if c in serving.champion_id_to_name)
+    # command arguments are split on spaces, like the bot's own parser without quotes
+    names = [name for name in names if " " not in name]
+    hot = [(c, o) for c, o in hot if " " not in c and " " not in o]
+
+    return {
+        "hot": [f"!recommend {c} {o}" for c, o in hot],
+        "cold": [f"!recommend {rng.choice(names)} {rng.choice(names)}" for _ in range(count)],
+        "invalid": [f"!recommend {rng.choice(names)[::-1]}x {rng.choice(names)}" for _ in range(count)],
+        "counter": [f"!counter {o}" for _, o in hot[:5]],
+    }
+
+
+def parse_mix(text):
+    """
+    Parse a traffic mix like "hot=0.6,cold=0.3,invalid=0.1".
+    """
+    mix = {}
+    for part in text.split(","):
+        kind, share = part.split("=")
+        if kind not in TRAFFIC_KINDS:
+            raise argparse.ArgumentTypeError(f"Unknown traffic kind {kind} (choose from {', '.join(TRAFFIC_KINDS)})")
+        mix[kind] = float(share)
+    return mix
+
+
+async def monitor(samples, interval, stop):
+    """
+    Sample event loop lag (how late a timed sleep wakes up) and memory until stopped.
+    """
+    while not stop.is_set():
+        expected = time.perf_counter() + interval
+        await asyncio.sleep(interval)
+        now = time.perf_counter()
+        samples.append({
+            "time": now,
+            "lag": max(0.0, now - expected),
+            "rss_mb": rss_mb(),
+            "worker_rss_mb": sum(rss_mb(pid) for pid in worker_pids()),
+        })
+
+
+async def run_load(bot, traffic, mix, rate, duration, burst_size=0, burst_interval=1.0, sample_interval=0.05, seed=0):
+    """
+    Replay a traffic mix against the bot's command handlers.
+
+    Arrivals are open-loop: requests are issued on schedule whether or not earlier ones have
+    finished, so a slow handler shows up as growing latency and loop lag instead of lower load.
+
+    Parameters:
+    - bot: commands.Bot, the bot whose commands are exercised.
+    - traffic: dict, traffic class -> list of messages (see build_traffic).
+    - mix: dict, traffic class -> share of requests.
+    - rate: float, mean requests per second for Poisson arrivals.
+    - duration: float, seconds to issue requests for.
+    - burst_size: int, if > 0, issue this many requests at once every burst_interval seconds instead.
+    - sample_interval: float, seconds between event loop lag and memory samples.
+
+    Returns:
+    - tuple of (per-request results, monitor samples, wall-clock start, wall-clock end).
+    """
+    rng = random.Random(seed)
+    kinds = [kind for kind in mix if traffic.get(kind)]
+    weights = [mix[kind] for kind in kinds]
+    gateway = FakeGateway(bot)
+    samples = []
+    stop = asyncio.Event()
+    monitor_task = asyncio.create_task(monitor(samples, sample_interval, stop))
+    tasks = []
+
+    def issue(scheduled):
+        kind = rng.choices(kinds, weights)[0]
+        tasks.append(asyncio.create_task(gateway.dispatch(rng.choice(traffic[kind]), kind, scheduled)))
+
+    start = time.perf_counter()
+    next_arrival = start
+    while next_arrival - start < duration:
+        delay = next_arrival - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if burst_size > 0:
+            for _ in range(burst_size):
+                issue(next_arrival)
+            next_arrival += burst_interval
+        else:
+            issue(next_arrival)
+            next_arrival += rng.expovariate(rate)
+
+    await asyncio.gather(*tasks)
+    end = time.perf_counter()
+    stop.set()
+    await monitor_task
+    return gateway.results, samples, start, end
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+
+def summarize(results, samples, start, end):
+    """
+    Aggregate throughput, latency percentiles, event loop lag and memory, overall and per second.
+
+    Returns:
+    - dict, the report.
+    """
+    def latency_stats(rows):
+        latencies = [row["latency"] for row in rows]
+        return {
+            "requests": len(rows),
+            "errors": sum(not row["ok"] for row in rows),
+            "p50_ms": percentile(latencies, 0.50) * 1000,
+            "p95_ms": percentile(latencies, 0.95) * 1000,
+            "p99_ms": percentile(latencies, 0.99) * 1000,
+            "max_ms": max(latencies, default=0.0) * 1000,
+        }
+
+    lags = [sample["lag"] for sample in samples]
+    report = {
+        "seconds": end - start,
+        "throughput": len(results) / (end - start),
+        "latency": latency_stats(results),
+        "by_kind": {kind: latency_stats([r for r in results if r["kind"] == kind])
+                    for kind in TRAFFIC_KINDS if any(r["kind"] == kind for r in results)},
+        "loop_lag_ms": {
+            "p50": percentile(lags, 0.50) * 1000,
+            "p99": percentile(lags, 0.99) * 1000,
+            "max": max(lags, default=0.0) * 1000,
+        },
+        "timeline": [],
+    }
+
+    # one row per second: requests scheduled, their p95, the worst loop lag and the latest memory sample;
+    # a blocked loop takes no samples, so memory carries over and the lag shows when the loop frees up
+    last = {"rss_mb": 0.0, "worker_rss_mb": 0.0}
+    for second in range(int(end - start) + 1):
+        lo, hi = start + second, start + second + 1
+        issued = [r for r in results if lo <= r["start"] < hi]
+        window = [s for s in samples if lo <= s["time"] < hi]
+        report["timeline"].append({
+            "second": second,
+            "requests": len(issued),
+            "p95_ms": percentile([r["latency"] for r in issued], 0.95) * 1000,
+            "max_lag_ms": max((s["lag"] for s in window), default=0.0) * 1000,
+            "rss_mb": window[-1]["rss_mb"] if window else last["rss_mb"],
+            "worker_rss_mb": window[-1]["worker_rss_mb"] if window else last["worker_rss_mb"],
+        })
+        last = report["timeline"][-1]
+    return report
+
+
+def print_report(report):
+    latency = report["latency"]
+    print(f"{latency['requests']} requests in {report['seconds']:.1f}s: {report['throughput']:.1f} req/s, "
+          f"{latency['errors']} error replies")
+    print(f"{'kind':>8} {'requests':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for kind, stats in [("all", latency)] + list(report["by_kind"].items()):
+        print(f"{kind:>8} {stats['requests']:9d} {stats['p50_ms']:9.1f} {stats['p95_ms']:9.1f} "
+              f"{stats['p99_ms']:9.1f} {stats['max_ms']:9.1f}")
+    lag = report["loop_lag_ms"]
+    print(f"Event loop lag: p50 {lag['p50']:.1f} ms, p99 {lag['p99']:.1f} ms, max {lag['max']:.1f} ms")
+    print(f"{'second':>6} {'requests':>9} {'p95 ms':>9} {'lag ms':>9} {'rss MB':>8} {'workers MB':>11}")
+    for row in report["timeline"]:
+        print(f"{row['second']:6d} {row['requests']:9d} {row['p95_ms']:9.1f} {row['max_lag_ms']:9.1f} "
+              f"{row['rss_mb']:8.0f} {row['worker_rss_mb']:11.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test the Discord bot's command handlers without a Discord connection.")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX, help='traffic shares, e.g. "hot=0.6,cold=0.3,invalid=0.1"')
+    parser.add_argument("--rate", type=float, default=20, help="mean requests per second (Poisson arrivals)")
+    parser.add_argument("--duration", type=float, default=10, help="seconds to issue requests for")
+    parser.add_argument("--burst-size", type=int, default=0, help="issue this many requests at once instead of Poisson arrivals")
+    parser.add_argument("--burst-interval", type=float, default=1.0, help="seconds between bursts")
+    parser.add_argument("--workers", type=int, default=None, help="overrides SERVING_WORKERS for the bot")
+    parser.add_argument("--output", default=None, help="write the full report as JSON to this path")
+    parser.add_argument("--verbose", action="store_true", help="keep the bot's per-message debug logs")
+    parser.add_argument("--synthetic", action="store_true",
+                        help="use synthetic_data.py's dataset and models even if the real ones exist")
+    args = parser.parse_args()
+
+    if args.workers is not None:
+        os.environ["SERVING_WORKERS"] = str(args.workers)
+
+    import serving
+    missing = [path for path in serving.artifact_paths(serving.MODEL_DIR, serving.DF_PATH) if not os.path.exists(path)]
+    if args.synthetic or missing:
+        # stand in for the real artifacts the way mock_riot_api.py stands in for Riot, so the
+        # harness runs on a fresh checkout with no network
+        from synthetic_data import ensure_synthetic_artifacts
+        if missing and not args.synthetic:
+            print(f"Missing {', '.join(missing)}; using synthetic data and models instead.")
+        serving.DF_PATH, serving.MODEL_DIR = ensure_synthetic_artifacts()
+
+    # importing the bot loads the artifacts and forks the workers, like starting it would
+    import discord_bot
+
+    async def main():
+        traffic = build_traffic(serving.ARTIFACTS["df"], 200)
+        with contextlib.ExitStack() as stack:
+            if not args.verbose:
+                stack.enter_context(contextlib.redirect_stdout(stack.enter_context(open(os.devnull, "w"))))
+            return await run_load(discord_bot.bot, traffic, args.mix, args.rate, args.duration,
+                                  args.burst_size, args.burst_interval)
+
+    try:
+        report = summarize(*asyncio.run(main()))
+    finally:
+        serving.stop_worker_pool()
+
+    report.update(workers=discord_bot.SERVING_WORKERS, mix=args.mix, rate=args.rate, burst_size=args.burst_size,
+                  artifact_version=serving.ARTIFACTS["version"])
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=4)
@@ -1,156 +1,207 @@
-import joblib
-import pandas as pd
 import json
+import sys
+import time
+import argparse
+import contextlib
+from collections import deque
+
+import serving
+
+# display labels of the build, in the order the chatbot prints them
+BUILD_LABELS = [
+    ("Boots_id", "Boots"), ("Legendary_1_id", "Legendary Item 1"), ("Legendary_2_id", "Legendary Item 2"),
+    ("Keystone", "Keystone"), ("PrimarySlot1", "Primary Slot 1"), ("PrimarySlot2", "Primary Slot 2"),
+    ("PrimarySlot3", "Primary Slot 3"), ("SecondarySlot1", "Secondary Slot 1"), ("SecondarySlot2", "Secondary Slot 2"),
+]
 
-df_path = "../data/processed/transformed_data.csv"  
-df = pd.read_csv(df_path)
-
-model_path = "../models/best_recommendation_model.pkl"
-try:
-    best_model = joblib.load(model_path)
-except Exception as e:
-    print(f"Error loading model: {e}")
-
-# preprocessing pipeline
-pipeline_path = "../models/preprocessing_pipeline.pkl"
-pipeline = joblib.load(pipeline_path)
-
-# load label encoders
-label_encoders_path = "../models/label_encoders.pkl"
-label_encoders = joblib.load(label_encoders_path)
-
-# loading champion, item, and rune datasets
-with open("../data/raw/champion_data/champions.json", "r") as f:
-    champion_data = json.load(f)["data"]
+# question and answer openings of the conversational pairs in 05_transfer_learning.ipynb
+PAIR_TEMPLATES = [
+    ("What should I build as {champion} vs {opponent}?", "For sure! In this matchup, you should go:"),
+    ("Can you give me a build for {champion} vs {opponent}?", "Sure! Here is a solid build for {champion} in this matchup:"),
+    ("How about {champion} vs {opponent}?", "Absolutely! In this matchup, you should try:"),
+]
 
-with open("../data/raw/item_data/items.json", "r") as f:
-    item_data = json.load(f)["data"]
+BULK_FORMATS = ("results", "pairs")
+BULK_BATCH_SIZE = 32
 
-with open("../data/raw/runes_data/runes.json", "r") as f:
-    rune_data = json.load(f)
 
-# creating lookup dictionaries
-champion_name_to_id = {v["name"].lower(): int(v["key"]) for k, v in champion_data.items()}
-champion_id_to_name = {int(v["key"]): v["name"] for k, v in champion_data.items()}
+def read_matchups(stream):
+    """
+    Lazily read matchups, one per line: either "champion, opponent" or a JSON object with
+    "champion" and "opponent" keys. Blank lines and lines starting with # are skipped.
 
-item_id_to_name = {int(k): v["name"] for k, v in item_data.items()}
+    Yields (champion, opponent, error) triples; error is None, or why the line could not be read,
+    so one bad line becomes an error record instead of ending the run.
+    """
+    for line in stream:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if line.startswith("{"):
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield None, None, f"Malformed JSON line {line!r}: {e}"
+                continue
+            champion, opponent = row.get("champion", ""), row.get("opponent", "")
+            if not isinstance(champion, str) or not isinstance(opponent, str):
+                yield champion, opponent, f"Champion and opponent must be strings: {line!r}"
+                continue
+            yield champion, opponent, None
+        else:
+            champion, _, opponent = line.partition(",")
+            yield champion.strip(), opponent.strip(), None
+
+
+def batched(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def build_record(champion, opponent, index, output_format, error=None):
+    """
+    Predict one matchup and turn it into an output record.
 
-# create lookup dictionaries for rune names and rune trees
-rune_id_to_name = {}
-rune_id_to_tree = {}
-rune_id_to_row = {}
-rune_trees = []
+    Returns:
+    - dict, the build by display label ("results") or an input/output conversational pair ("pairs");
+      for an unreadable line, an unknown champion or matchup, the error instead.
+    """
+    if error is not None:
+        return {"champion": champion, "opponent": opponent, "error": error}
+    try:
+        build = serving.recommend(champion, opponent)
+    except ValueError as e:
+        return {"champion": champion, "opponent": opponent, "error": str(e)}
+
+    names = {label: str(build[col]) for col, label in BUILD_LABELS}
+    if output_format == "results":
+        return {"champion": champion, "opponent": opponent, "build": names}
+
+    # the notebook's pairs use display names, so normalize the user's casing
+    champion = serving.champion_id_to_name[serving.champion_name_to_id[champion.lower()]]
+    opponent = serving.champion_id_to_name[serving.champion_name_to_id[opponent.lower()]]
+    question, answer = PAIR_TEMPLATES[index % len(PAIR_TEMPLATES)]
+    lines = [answer.format(champion=champion)] + [f"{label}: {name}" for label, name in names.items()]
+    return {
+        "input": f"User: {question.format(champion=champion, opponent=opponent)}\nBot:",
+        "output": "\n".join(lines),
+    }
+
+
+def predict_batch(batch, output_format):
+    """
+    Predict a batch of (index, champion, opponent, error) matchups, in a worker or in this process.
 
-for style in rune_data:
-    # add the main style name
-    rune_id_to_name[style["id"]] = style["name"]
-    rune_trees.append(style["id"])  # Store available rune trees
+    Returns:
+    - list of dicts, one record per matchup, in input order.
+    """
+    return [build_record(champion, opponent, index, output_format, error)
+            for index, champion, opponent, error in batch]
 
-    # add individual runes within each style and map each rune to its tree and row
-    for row_idx, slot in enumerate(style["slots"]):
-        for rune in slot["runes"]:
-            rune_id_to_name[rune["id"]] = rune["name"]
-            rune_id_to_tree[rune["id"]] = style["id"]
-            rune_id_to_row[rune["id"]] = row_idx
 
+def bulk(input_stream, output_stream, workers=1, batch_size=BULK_BATCH_SIZE, output_format="results"):
+    """
+    Answer a stream of matchups without prompting, writing one JSON line per matchup as results come in.
 
-target_features = [
-    "Boots_id", "Legendary_1_id", "Legendary_2_id",
-    "Keystone", "PrimarySlot1", "PrimarySlot2",
-    "PrimarySlot3", "SecondarySlot1", "SecondarySlot2"
-]
+    Matchups are read lazily and sent to the workers in batches, with at most two batches per
+    worker in flight, so memory stays constant however long the input is. Output keeps the
+    input order. Unreadable lines and matchups that fail are written as errors, except in "pairs"
+    output, where they are only counted. A summary goes to stderr, keeping stdout free for the results.
 
-def predict_optimal_build(champion_name, matchup_champion_name, df, pipeline, model, label_encoders):
-    """
-    Predict the optimal item build and runes for the given champion and matchup champion.
-    
     Parameters:
-    - champion_name: str, champion name of the player.
-    - matchup_champion_name: str, champion name of the opponent.
-    - df: DataFrame, original DataFrame with historical data.
-    - pipeline: preprocessing pipeline used for transforming the features.
-    - model: trained MultiOutputClassifier model.
-    - label_encoders: dict, dictionary of LabelEncoders for each target feature.
+    - input_stream: iterable of str, lines of matchups (see read_matchups).
+    - output_stream: file object to write the JSON lines to.
+    - workers: int, worker processes of serving's pool; 1 predicts in this process.
+    - batch_size: int, matchups per batch sent to a worker.
+    - output_format: str, "results" for builds or "pairs" for conversational training pairs.
 
     Returns:
-    - DataFrame, containing the predicted items and runes.
+    - dict, counts and throughput of the run.
+    """
+    start = time.perf_counter()
+    batches = batched(((index, *matchup) for index, matchup in enumerate(read_matchups(input_stream))), batch_size)
+    counts = {"matchups": 0, "errors": 0}
+
+    def write(records):
+        for record in records:
+            counts["matchups"] += 1
+            if "error" in record:
+                counts["errors"] += 1
+                if output_format == "pairs":  # training pairs must not contain error messages
+                    continue
+            output_stream.write(json.dumps(record) + "\n")
+        output_stream.flush()
+
+    if workers <= 1:
+        for batch in batches:
+            write(predict_batch(batch, output_format))
+    else:
+        # the same pool the other front ends use, forked after the artifacts are loaded; its
+        # startup note goes to stderr, since stdout may be the results
+        with contextlib.redirect_stdout(sys.stderr):
+            executor = serving.start_worker_pool(workers)
+        try:
+            in_flight = deque()
+            for batch in batches:
+                in_flight.append(executor.submit(predict_batch, batch, output_format))
+                if len(in_flight) >= 2 * workers:
+                    write(in_flight.popleft().result())
+            while in_flight:
+                write(in_flight.popleft().result())
+        finally:
+            serving.stop_worker_pool()
+
+    elapsed = time.perf_counter() - start
+    summary = dict(counts, seconds=elapsed, per_second=counts["matchups"] / elapsed if elapsed else 0.0)
+    try:
+        import resource  # Unix only, and only needed for this summary
+        summary["peak_rss_mb"] = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                                     resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss) / 1024
+        peak = f", peak RSS {summary['peak_rss_mb']:.0f} MB per process"
+    except ImportError:
+        peak = ""
+    print(f"Answered {summary['matchups']} matchups ({summary['errors']} errors) in {elapsed:.1f}s: "
+          f"{summary['per_second']:.1f}/s with {workers} worker(s), batches of {batch_size}{peak}", file=sys.stderr)
+    return summary
+
+
+def counter_mode():
     """
-    # Convert champion names to IDs
-    champion_id = champion_name_to_id.get(champion_name.lower())
-    matchup_champion_id = champion_name_to_id.get(matchup_champion_name.lower())
-
-    if champion_id is None or matchup_champion_id is None:
-        raise ValueError(f"Champion name(s) provided are not valid: {champion_name}, {matchup_champion_name}")
-
-    # Create a new input DataFrame with average values for other features
-    input_data = df[(df['championId'] == champion_id) & (df['matchupChampion'] == matchup_champion_id)].mean().to_dict()
-
-    # Check if input_data has NaN values and provide default values if needed
-    if any(pd.isna(value) for value in input_data.values()):
-        raise ValueError(f"No data available for the matchup: {champion_name} vs {matchup_champion_name}")
-
-    # Override champion-specific fields
-    input_data['championId'] = champion_id
-    input_data['matchupChampion'] = matchup_champion_id
-
-    # Create a DataFrame for input
-    input_features = df.columns.difference(target_features)
-    input_df = pd.DataFrame([input_data], columns=input_features)
-
-    # Preprocess the input features using the pipeline
-    input_processed = pipeline.transform(input_df)
-
-    # Predict the output
-    predicted_output = model.predict(input_processed)
-
-    # Convert the prediction to a DataFrame for easier handling
-    predicted_encoded_df = pd.DataFrame(predicted_output, columns=target_features)
-
-    # Decode the predictions using the stored LabelEncoders
-    predicted_decoded_df = pd.DataFrame()
-    for col in target_features:
-        predicted_decoded_df[col] = label_encoders[col].inverse_transform(predicted_encoded_df[col])
-
-    # Validate rune selections - ensure they come from the same tree
-    primary_tree = rune_id_to_tree.get(predicted_decoded_df['Keystone'][0], None)
-    for col in ['PrimarySlot1', 'PrimarySlot2', 'PrimarySlot3']:
-        if rune_id_to_tree.get(predicted_decoded_df[col][0]) != primary_tree:
-            # Replace with the most frequent rune from the primary tree if it doesn't match
-            valid_runes = df[(df['Keystone'] == predicted_decoded_df['Keystone'][0])][col].value_counts().index.tolist()
-            if valid_runes:
-                predicted_decoded_df[col] = valid_runes[0]
-
-    # Validate that secondary runes come from the correct tree
-    secondary_tree = rune_id_to_tree.get(predicted_decoded_df['SecondarySlot1'][0], None)
-    if secondary_tree == primary_tree:
-        # Ensure secondary tree is different from the primary tree
-        secondary_tree_options = [t for t in rune_trees if t != primary_tree]
-        secondary_tree = secondary_tree_options[0]  # Replace with the first different tree found
-
-    for col in ['SecondarySlot1', 'SecondarySlot2']:
-        if rune_id_to_tree.get(predicted_decoded_df[col][0]) != secondary_tree:
-            if col == 'SecondarySlot2':
-                # If `SecondarySlot2` doesn't match, find the most frequent rune that pairs well historically
-                valid_runes = df[(df['championId'] == champion_id) & 
-                                 (df['matchupChampion'] == matchup_champion_id) & 
-                                 (df['SecondarySlot1'] == predicted_decoded_df['SecondarySlot1'][0])][col].value_counts().index.tolist()
-                if valid_runes:
-                    predicted_decoded_df[col] = valid_runes[0]
-
-    # Convert IDs to item and rune names for user-friendly output
-    for col in ['Boots_id', 'Legendary_1_id', 'Legendary_2_id']:
-        predicted_decoded_df[col] = predicted_decoded_df[col].apply(lambda x: item_id_to_name.get(int(x), "Unknown Item"))
-
-    for col in ['Keystone', 'PrimarySlot1', 'PrimarySlot2', 'PrimarySlot3', 'SecondarySlot1', 'SecondarySlot2']:
-        predicted_decoded_df[col] = predicted_decoded_df[col].apply(lambda x: rune_id_to_name.get(int(x), "Unknown Rune"))
-
-    return predicted_decoded_df
+    Ask for an opponent (and optionally a position) and print the best champions to play into it.
+    """
+    opponent = input("Enter the opponent champion: ").strip().lower()
+    position = input("Enter your position (top/jungle/mid/bot/support, or leave empty for any): ").strip().lower()
+    if opponent == "exit" or position == "exit":
+        return False
+
+    try:
+        picks = serving.recommend_counters(opponent, position or None)["picks"]
+        print(f"\nBest picks into {opponent}:")
+        for rank, pick in enumerate(picks, start=1):
+            print(f"{rank}. {pick['champion']} ({pick['win_rate']:.0%} win rate over {pick['games']} games)")
+            print(f"  Items: {pick['Boots_id']}, {pick['Legendary_1_id']}, {pick['Legendary_2_id']}")
+            print(f"  Runes: {pick['Keystone']}, {pick['PrimarySlot1']}, {pick['PrimarySlot2']}, {pick['PrimarySlot3']} / "
+                  f"{pick['SecondarySlot1']}, {pick['SecondarySlot2']}")
+    except ValueError as e:
+        print(f"Error: {e}. Please try again.")
+    return True
 
 def chatbot():
     print("Welcome to the League of Legends Recommendation Chatbot!")
-    print("Type 'exit' at any time to quit.")
+    print("Type 'counter' to find the best picks into an opponent, or 'exit' at any time to quit.")
     while True:
         champion = input("Enter your champion: ").strip().lower()
+        if champion == "counter":
+            if not counter_mode():
+                print("Goodbye!")
+                break
+            continue
         opponent = input("Enter the opponent champion: ").strip().lower()
 
         if champion == "exit" or opponent == "exit":
@@ -159,21 +210,46 @@ def chatbot():
 
         try:
             # making a prediction
-            recommended_build = predict_optimal_build(champion, opponent, df, pipeline, best_model, label_encoders)
+            recommended_build = serving.recommend(champion, opponent)
             print("\nRecommended Items and Runes for the given matchup:")
+            if recommended_build["substitute"]:
+                print(f"(based on the similar matchup {recommended_build['substitute']})")
             print("Items:")
-            print(f"  Boots: {recommended_build['Boots_id'].values[0]}")
-            print(f"  Legendary Item 1: {recommended_build['Legendary_1_id'].values[0]}")
-            print(f"  Legendary Item 2: {recommended_build['Legendary_2_id'].values[0]}")
+            print(f"  Boots: {recommended_build['Boots_id']}")
+            print(f"  Legendary Item 1: {recommended_build['Legendary_1_id']}")
+            print(f"  Legendary Item 2: {recommended_build['Legendary_2_id']}")
             print("\nRunes:")
-            print(f"  Keystone: {recommended_build['Keystone'].values[0]}")
-            print(f"  Primary Slot 1: {recommended_build['PrimarySlot1'].values[0]}")
-            print(f"  Primary Slot 2: {recommended_build['PrimarySlot2'].values[0]}")
-            print(f"  Primary Slot 3: {recommended_build['PrimarySlot3'].values[0]}")
-            print(f"  Secondary Slot 1: {recommended_build['SecondarySlot1'].values[0]}")
-            print(f"  Secondary Slot 2: {recommended_build['SecondarySlot2'].values[0]}")
+            print(f"  Keystone: {recommended_build['Keystone']}")
+            print(f"  Primary Slot 1: {recommended_build['PrimarySlot1']}")
+            print(f"  Primary Slot 2: {recommended_build['PrimarySlot2']}")
+            print(f"  Primary Slot 3: {recommended_build['PrimarySlot3']}")
+            print(f"  Secondary Slot 1: {recommended_build['SecondarySlot1']}")
+            print(f"  Secondary Slot 2: {recommended_build['SecondarySlot2']}")
         except ValueError as e:
             print(f"Error: {e}. Please try again.")
 
 if __name__ == "__main__":
-    chatbot()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Recommend builds interactively, or for a stream of matchups with --bulk.")
+    parser.add_argument("--bulk", metavar="INPUT", default=None,
+                        help="file of matchups, one \"champion, opponent\" or JSON object per line, or - for stdin")
+    parser.add_argument("--output", default="-", help="JSONL file to write, or - for stdout")
+    parser.add_argument("--format", choices=BULK_FORMATS, default="results",
+                        help="builds per matchup, or input/output pairs like 05_transfer_learning.ipynb's train_data.json")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--batch-size", type=int, default=BULK_BATCH_SIZE)
+    args = parser.parse_args()
+
+    # the dataset, model and lookups are the ones every front end uses; in bulk mode stdout may be the results
+    with contextlib.redirect_stdout(sys.stderr if args.bulk is not None else sys.stdout):
+        serving.load_artifacts()
+    if args.bulk is None:
+        chatbot()
+    else:
+        input_stream = sys.stdin if args.bulk == "-" else open(args.bulk, "r")
+        output_stream = sys.stdout if args.output == "-" else open(args.output, "w")
+        try:
+            bulk(input_stream, output_stream, args.workers, args.batch_size, args.format)
+        finally:
+            for stream in (input_stream, output_stream):
+                if stream not in (sys.stdin, sys.stdout):
+                    stream.close()
\ No newline at end of file
@@ -0,0 +1,223 @@
+import os
+import json
+import ast
+import contextlib
+import argparse
+
+import numpy as np
+import pandas as pd
+
+# the cleaning steps of 02_data_cleaning.ipynb as functions, so they can run as pipeline stages
+MATCH_DETAILS_DIR = "../data/raw/match_details"
+CLEANED_PATH = "../data/interim/cleaned_match_details.csv"
+DF_PATH = "../data/processed/transformed_data.csv"
+
+ITEMS_PATH = "../data/raw/item_data/items.json"
+RUNES_PATH = "../data/raw/runes_data/runes.json"
+CHAMPIONS_PATH = "../data/raw/champion_data/champions.json"
+
+BOOT_IDS = [1001, 3009, 3111, 3158, 3006, 3020]
+# items whose unknown purchase times are estimated, besides legendaries: boots and starter items
+ESTIMATED_ITEM_IDS = [1001, 2422, 3111, 3158, 3006, 3020, 1054, 1055, 1056]
+RUNE_COLUMNS = ['Keystone', 'PrimarySlot1', 'PrimarySlot2', 'PrimarySlot3', 'SecondarySlot1', 'SecondarySlot2']
+POSITION_MAPPING = {'TOP': 0, 'JUNGLE': 1, 'MIDDLE': 2, 'BOTTOM': 3, 'UTILITY': 4}
+MIN_GAME_DURATION = 1200
+
+
+def load_json(path):
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def load_match_details(folder=MATCH_DETAILS_DIR):
+    """
+    Load every match details shard of a folder into one DataFrame.
+    """
+    all_match_data = []
+    for filename in sorted(os.listdir(folder)):
+        if filename.endswith(".json"):
+            with open(os.path.join(folder, filename), "r") as f:
+                all_match_data.extend(json.load(f))
+    return pd.DataFrame(all_match_data)
+
+
+def item_costs(items_data):
+    """
+    Map item IDs (as strings, like items.json) to their total gold cost.
+    """
+    return {item_id: item.get("gold", {}).get("total", 0) for item_id, item in items_data["data"].items()}
+
+
+def estimate_purchase_times(df, costs):
+    """
+    Fill unknown purchase times of legendary items, boots and starter items.
+
+    An item bought after known purchases is estimated at the latest earlier known time plus 30
+    seconds per 100 gold of its cost; without earlier known purchases, at 15 minutes.
+    """
+    df = df.copy()
+    time_columns = [f"item_purchase_time_{i}" for i in range(6)]
+    item_columns = [f"item_{i}" for i in range(6)]
+    rows = df[item_columns + time_columns].to_numpy(dtype=object)
+
+    estimated = rows[:, 6:].copy()
+    for row, estimated_row in zip(rows, estimated):
+        items, times = row[:6], row[6:]
+        for i in range(6):
+            item_id = items[i]
+            item_cost = costs.get(str(item_id), 0)
+            if times[i] == "Unknown Time" and (item_cost > 2100 or item_id in ESTIMATED_ITEM_IDS):
+                # only originally known times count, not ones estimated earlier in the row
+                previous_times = [int(times[j]) for j in range(i) if times[j] != "Unknown Time"]
+                if previous_times:
+                    estimated_row[i] = max(previous_times) + (item_cost // 100) * 30
+                else:
+                    estimated_row[i] = 900
+
+    for i, col in enumerate(time_columns):
+        df[col] = estimated[:, i]
+    return df
+
+
+def purchase_order(purchase_time):
+    return int(purchase_time) if str(purchase_time).isdigit() else float('inf')
+
+
+def filter_important_items(df, costs):
+    """
+    Keep the boots and the two earliest legendary items (over 2100 gold) of every row, with their purchase times.
+    """
+    df = df.copy()
+    time_columns = [f"item_purchase_time_{i}" for i in range(6)]
+    item_columns = [f"item_{i}" for i in range(6)]
+
+    important = []
+    for row in df[item_columns + time_columns].to_numpy(dtype=object):
+        boots = (None, None)
+        legendary_items = []
+        for item_id, purchase_time in zip(row[:6], row[6:]):
+            if item_id in BOOT_IDS:
+                boots = (item_id, purchase_time)
+            if costs.get(str(item_id), 0) > 2100:
+                legendary_items.append((item_id, purchase_time))
+        legendary_items = sorted(legendary_items, key=lambda item: purchase_order(item[1]))[:2]
+        legendary_items += [(None, None)] * (2 - len(legendary_items))
+        important.append(boots + legendary_items[0] + legendary_items[1])
+
+    important = np.array(important, dtype=object).reshape(len(df), 6)
+    for i, col in enumerate(["Boots_id", "Boots_purchase_time", "Legendary_1_id", "Legendary_1_purchase_time",
+                             "Legendary_2_id", "Legendary_2_purchase_time"]):
+        df[col] = important[:, i]
+    return df.drop(columns=item_columns + time_columns)
+
+
+def split_runes(df, runes_data):
+    """
+    Replace the primaryRune and secondaryRune style dicts with one rune ID column per slot (0 when missing).
+    """
+    rune_ids = {rune["id"] for tree in runes_data for slot in tree["slots"] for rune in slot["runes"]}
+
+    def selections(style):
+        # shards saved to CSV hold the dicts as strings
+        if isinstance(style, str):
+            style = ast.literal_eval(style)
+        return [selection['perk'] if selection['perk'] in rune_ids else 0 for selection in style.get('selections', [])]
+
+    pages = []
+    for primary, secondary in zip(df["primaryRune"], df["secondaryRune"]):
+        primary, secondary = selections(primary), selections(secondary)
+        pages.append((primary + [0] * 4)[:4] + (secondary + [0] * 2)[:2])
+
+    df = df.drop(columns=["primaryRune", "secondaryRune"])
+    pages = np.array(pages, dtype=np.int64).reshape(len(df), 6)
+    for i, col in enumerate(RUNE_COLUMNS):
+        df[col] = pages[:, i]
+    return df
+
+
+def encode_columns(df, champions_data):
+    """
+    Encode matchup champions (-1 when unknown), positions (-1 when unknown) and booleans as integers,
+    and drop the identifier columns.
+    """
+    df = df.copy()
+    champion_name_to_id = {info["name"]: int(info["key"]) for info in champions_data["data"].values()}
+    df['matchupChampion'] = df['matchupChampion'].map(champion_name_to_id).fillna(-1).astype(int)
+
+    # the region tag added by region_collector.py is dropped with the identifiers
+    df = df.drop(columns=['matchId', 'championName', 'region'], errors='ignore')
+    df['individualPosition'] = df['individualPosition'].map(POSITION_MAPPING).fillna(-1).astype('int64')
+
+    bool_columns = df.select_dtypes(include='bool').columns
+    df[bool_columns] = df[bool_columns].astype(int)
+
+    for column in ['Boots_id', 'Boots_purchase_time', 'Legendary_1_id', 'Legendary_1_purchase_time',
+                   'Legendary_2_id', 'Legendary_2_purchase_time']:
+        # unknown times left on items that are not estimated become 0 like missing items
+        df[column] = pd.to_numeric(df[column], errors='coerce').fillna(0).astype('int64')
+    return df
+
+
+def clean_match_details(input_dir=MATCH_DETAILS_DIR, output_path=CLEANED_PATH, items_path=ITEMS_PATH,
+                        runes_path=RUNES_PATH, champions_path=CHAMPIONS_PATH, profiler=None):
+    """
+    Turn the raw match details shards into the cleaned, fully numeric table.
+
+    Parameters:
+    - profiler: MemoryProfiler, optional, records memory around every step.
+
+    Returns:
+    - int, number of rows written.
+    """
+    stage = profiler.stage if profiler is not None else lambda name, rows=None: contextlib.nullcontext({})
+    costs = item_costs(load_json(items_path))
+    with stage("load_match_details") as record:
+        df = load_match_details(input_dir)
+        record["rows"] = len(df)
+    with stage("estimate_purchase_times", len(df)):
+        df = estimate_purchase_times(df, costs)
+    with stage("filter_important_items", len(df)):
+        df = filter_important_items(df, costs)
+    with stage("split_runes", len(df)):
+        df = split_runes(df, load_json(runes_path))
+    with stage("encode_columns", len(df)):
+        df = encode_columns(df, load_json(champions_path))
+
+    with stage("write_cleaned", len(df)):
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        df.to_csv(output_path, index=False)
+    return len(df)
+
+
+def build_processed_dataset(input_path=CLEANED_PATH, output_path=DF_PATH, min_game_duration=MIN_GAME_DURATION,
+                            profiler=None):
+    """
+    Write the training and serving dataset: cleaned rows of games that lasted at least 20 minutes.
+
+    Parameters:
+    - profiler: MemoryProfiler, optional, records memory around every step.
+
+    Returns:
+    - int, number of rows written.
+    """
+    stage = profiler.stage if profiler is not None else lambda name, rows=None: contextlib.nullcontext({})
+    with stage("filter_game_duration") as record:
+        df = pd.read_csv(input_path)
+        record["rows"] = len(df)
+        df = df[df['gameDuration'] >= min_game_duration].reset_index(drop=True)
+    with stage("write_processed", len(df)):
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        df.to_csv(output_path, index=False)
+    return len(df)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Clean the raw match details into the processed dataset.")
+    parser.add_argument("--input-dir", default=MATCH_DETAILS_DIR)
+    parser.add_argument("--cleaned-path", default=CLEANED_PATH)
+    parser.add_argument("--output-path", default=DF_PATH)
+    args = parser.parse_args()
+
+    cleaned_rows = clean_match_details(args.input_dir, args.cleaned_path)
+    processed_rows = build_processed_dataset(args.cleaned_path, args.output_path)
+    print(f"Cleaned {cleaned_rows} rows, kept {processed_rows} in {args.output_path}")
@@ -0,0 +1,359 @@
+import os
+import json
+import heapq
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+FRONTIER_PATH = "../data/raw/crawl_frontier/frontier.json"
+
+# PUUIDs whose rank is unknown (they were never seeded) inherit the rank of the player
+# whose match history surfaced them, since ranked matchmaking keeps lobbies within a bracket
+UNKNOWN_RANK = "UNKNOWN"
+
+
+def region_from_match_id(match_id):
+    """
+    Get the platform routing value from a match ID (e.g. "NA1_5159373690" -> "na1").
+    """
+    return match_id.split("_", 1)[0].lower()
+
+
+def match_sequence(match_id):
+    """
+    Get the numeric part of a match ID. Riot assigns them increasingly, so it orders matches by recency.
+    """
+    try:
+        return int(match_id.split("_", 1)[1])
+    except (IndexError, ValueError):
+        return 0
+
+
+@contextmanager
+def locked(path):
+    """
+    Hold an exclusive lock on a sidecar file of a path, blocking until other processes release it.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path + ".lock", "a+") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        else:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class CrawlFrontier:
+    """
+    Priority queues of players and matches still to be crawled.
+
+    Players are popped most recently seen first and matches newest first, so the request budget
+    is spent on the freshest data. Every PUUID and match ID is only ever queued once, and the
+    optional quotas cap how many players are crawled per rank and per region.
+
+    Several collectors can share one frontier file (match_history.py pops players while
+    match_details.py pops matches): save() merges this process's changes into the file under a
+    lock instead of overwriting it, and picks up what the other processes saved meanwhile.
+    """
+
+    def __init__(self, path=FRONTIER_PATH, rank_quotas=None, region_quotas=None):
+        """
+        Parameters:
+        - path: str, JSON file the frontier is persisted to.
+        - rank_quotas: dict, maximum number of players to crawl per rank (missing ranks are unlimited).
+        - region_quotas: dict, maximum number of players to crawl per region (missing regions are unlimited).
+        """
+        self.path = path
+        self.rank_quotas = rank_quotas or {}
+        self.region_quotas = region_quotas or {}
+
+        self.player_heaps = {}  # (rank, region) -> heap of (-last_seen, puuid)
+        self.match_heap = []  # (-sequence, match_id, rank)
+        self.seen_puuids = set()
+        self.seen_match_ids = set()
+        self.crawled_per_rank = {}
+        self.crawled_per_region = {}
+        self._reset_changes()
+
+        if os.path.exists(path):
+            self.load()
+
+    def __len__(self):
+        return sum(len(heap) for heap in self.player_heaps.values())
+
+    def pending_matches(self):
+        return len(self.match_heap)
+
+    def push_player(self, puuid, rank=UNKNOWN_RANK, region=None, last_seen=0):
+        """
+        Queue a player for match-history fetching.
+
+        Parameters:
+        - puuid: str, PUUID of the player.
+        - rank: str, rank bracket the player belongs to.
+        - region: str, platform the player was seen on (e.g. "na1").
+        - last_seen: int, timestamp (ms) of the most recent match the player was seen in.
+
+        Returns:
+        - bool, True if the player was new and has been queued.
+        """
+        if not puuid or puuid in self.seen_puuids:
+            return False
+        self.seen_puuids.add(puuid)
+        heapq.heappush(self.player_heaps.setdefault((rank, region), []), (-last_seen, puuid))
+        self._pushed_players[puuid] = (-last_seen, puuid, rank, region)
+        return True
+
+    def pop_player(self):
+        """
+        Take the most recently seen player whose rank and region are still under quota.
+
+        Players over quota stay queued in case the quotas are raised on a later run. Only the head
+        of each (rank, region) queue is looked at, so a pop costs the same however many players
+        are waiting behind a full quota.
+
+        Returns:
+        - dict with puuid, rank, region and last_seen, or None if nothing is left to crawl.
+        """
+        best = None
+        for key, heap in self.player_heaps.items():
+            rank, region = key
+            if not heap or self._over_quota(self.crawled_per_rank, self.rank_quotas, rank) or \
+                    self._over_quota(self.crawled_per_region, self.region_quotas, region):
+                continue
+            if best is None or heap[0] < self.player_heaps[best][0]:
+                best = key
+        if best is None:
+            return None
+
+        rank, region = best
+        neg_last_seen, puuid = heapq.heappop(self.player_heaps[best])
+        self._popped_puuids.add(puuid)
+        for crawled, changes, key in ((self.crawled_per_rank, self._crawled_rank_changes, rank),
+                                      (self.crawled_per_region, self._crawled_region_changes, region)):
+            crawled[key] = crawled.get(key, 0) + 1
+            changes[key] = changes.get(key, 0) + 1
+        return {"puuid": puuid, "rank": rank, "region": region, "last_seen": -neg_last_seen}
+
+    def requeue_player(self, entry):
+        """
+        Put back a player taken with pop_player whose match history could not be fetched,
+        giving its slot in the rank and region quotas back.
+
+        Parameters:
+        - entry: dict, as returned by pop_player.
+        """
+        puuid, rank, region = entry["puuid"], entry["rank"], entry["region"]
+        heapq.heappush(self.player_heaps.setdefault((rank, region), []), (-entry["last_seen"], puuid))
+        self._popped_puuids.discard(puuid)
+        self._pushed_players[puuid] = (-entry["last_seen"], puuid, rank, region)
+        self._requeued_puuids.add(puuid)
+        for crawled, changes, key in ((self.crawled_per_rank, self._crawled_rank_changes, rank),
+                                      (self.crawled_per_region, self._crawled_region_changes, region)):
+            crawled[key] = crawled.get(key, 0) - 1
+            changes[key] = changes.get(key, 0) - 1
+
+    def push_match(self, match_id, rank=UNKNOWN_RANK):
+        """
+        Queue a match for detail fetching.
+
+        Returns:
+        - bool, True if the match was new and has been queued.
+        """
+        if match_id in self.seen_match_ids:
+            return False
+        self.seen_match_ids.add(match_id)
+        entry = (-match_sequence(match_id), match_id, rank)
+        heapq.heappush(self.match_heap, entry)
+        self._pushed_matches[match_id] = entry
+        return True
+
+    def pop_match(self):
+        """
+        Take the newest queued match.
+
+        Returns:
+        - dict with match_id and rank, or None if no matches are queued.
+        """
+        if not self.match_heap:
+            return None
+        _, match_id, rank = heapq.heappop(self.match_heap)
+        self._popped_match_ids.add(match_id)
+        return {"match_id": match_id, "rank": rank}
+
+    def requeue_match(self, entry):
+        """
+        Put back a match taken with pop_match whose details could not be fetched.
+
+        Parameters:
+        - entry: dict, as returned by pop_match.
+        """
+        match_id = entry["match_id"]
+        queued = (-match_sequence(match_id), match_id, entry["rank"])
+        heapq.heappush(self.match_heap, queued)
+        self._popped_match_ids.discard(match_id)
+        self._pushed_matches[match_id] = queued
+        self._requeued_match_ids.add(match_id)
+
+    def push_match_participants(self, match_data, rank=UNKNOWN_RANK):
+        """
+        Queue every participant of a fetched match, using the match end time as their recency.
+
+        Returns:
+        - int, number of newly discovered players.
+        """
+        info = match_data.get("info", {})
+        last_seen = info.get("gameEndTimestamp") or info.get("gameCreation") or 0
+        region = region_from_match_id(match_data["metadata"]["matchId"])
+
+        discovered = 0
+        for puuid in match_data["metadata"].get("participants", []):
+            if self.push_player(puuid, rank, region, last_seen):
+                discovered += 1
+        return discovered
+
+    def _over_quota(self, crawled, quotas, key):
+        quota = quotas.get(key)
+        return quota is not None and crawled.get(key, 0) >= quota
+
+    def _reset_changes(self):
+        # what this process changed since it last loaded or saved, replayed onto the file by save()
+        self._pushed_players = {}
+        self._popped_puuids = set()
+        self._pushed_matches = {}
+        self._popped_match_ids = set()
+        # popped and put back: already in the seen sets, but queued again all the same
+        self._requeued_puuids = set()
+        self._requeued_match_ids = set()
+        self._crawled_rank_changes = {}
+        self._crawled_region_changes = {}
+
+    def save(self):
+        """
+        Persist the frontier so a crawl can resume where it stopped.
+
+        The file is re-read under a lock and this process's pushes, pops and crawl counts since the
+        last load or save are applied to it, so players or matches saved by another collector in the
+        meantime are kept (and adopted here). Two processes popping from the same queue may still
+        both crawl an entry; the lock only guarantees nothing is lost.
+        """
+        with locked(self.path):
+            state = self._read_state() if os.path.exists(self.path) else {
+                "players": [], "matches": [], "seen_puuids": [], "seen_match_ids": [],
+                "crawled_per_rank": [], "crawled_per_region": [],
+            }
+            seen_puuids = set(state["seen_puuids"])
+            seen_match_ids = set(state["seen_match_ids"])
+
+            # a requeued entry may still be in the file if this process has not saved since popping it
+            players = [entry for entry in state["players"] if entry[1] not in self._requeued_puuids]
+            players += [entry for puuid, entry in self._pushed_players.items()
+                        if puuid not in seen_puuids or puuid in self._requeued_puuids]
+            players = [entry for entry in players if entry[1] not in self._popped_puuids]
+            matches = [entry for entry in state["matches"] if entry[1] not in self._requeued_match_ids]
+            matches += [entry for match_id, entry in self._pushed_matches.items()
+                        if match_id not in seen_match_ids or match_id in self._requeued_match_ids]
+            matches = [entry for entry in matches if entry[1] not in self._popped_match_ids]
+
+            crawled_per_rank = dict(state["crawled_per_rank"])
+            crawled_per_region = dict(state["crawled_per_region"])
+            for crawled, changes in ((crawled_per_rank, self._crawled_rank_changes),
+                                     (crawled_per_region, self._crawled_region_changes)):
+                for key, count in changes.items():
+                    crawled[key] = crawled.get(key, 0) + count
+
+            state = {
+                "players": players,
+                "matches": matches,
+                "seen_puuids": list(seen_puuids | self.seen_puuids),
+                "seen_match_ids": list(seen_match_ids | self.seen_match_ids),
+                # lists of pairs rather than objects: JSON object keys are strings, which would
+                # turn a None region into "null"
+                "crawled_per_rank": list(crawled_per_rank.items()),
+                "crawled_per_region": list(crawled_per_region.items()),
+            }
+            # write to a temporary file first so an interrupted save never corrupts the frontier
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(state, f)
+            os.replace(tmp_path, self.path)
+            self._apply_state(state)
+
+    def load(self):
+        with locked(self.path):
+            self._apply_state(self._read_state())
+
+    def _read_state(self):
+        with open(self.path, 'r') as f:
+            state = json.load(f)
+        state["players"] = [tuple(entry) for entry in state["players"]]
+        state["matches"] = [tuple(entry) for entry in state["matches"]]
+        return state
+
+    def _apply_state(self, state):
+        self.player_heaps = {}
+        for neg_last_seen, puuid, rank, region in state["players"]:
+            self.player_heaps.setdefault((rank, region), []).append((neg_last_seen, puuid))
+        for heap in self.player_heaps.values():
+            heapq.heapify(heap)
+        self.match_heap = [tuple(entry) for entry in state["matches"]]
+        heapq.heapify(self.match_heap)
+        self.seen_puuids = set(state["seen_puuids"])
+        self.seen_match_ids = set(state["seen_match_ids"])
+        self.crawled_per_rank = dict(state["crawled_per_rank"])
+        self.crawled_per_region = dict(state["crawled_per_region"])
+        self._reset_changes()
+
+
+def load_seed_ranks(summoner_ids_path, puuids_path):
+    """
+    Map seeded PUUIDs to the rank they were collected from.
+
+    Parameters:
+    - summoner_ids_path: str, JSON file of summoner IDs grouped by rank.
+    - puuids_path: str, JSON file mapping summoner IDs to PUUIDs.
+
+    Returns:
+    - dict, PUUID -> rank.
+    """
+    if not os.path.exists(summoner_ids_path) or not os.path.exists(puuids_path):
+        return {}
+
+    with open(summoner_ids_path, 'r') as f:
+        summoner_data = json.load(f)
+    with open(puuids_path, 'r') as f:
+        puuids_data = json.load(f)
+
+    puuid_ranks = {}
+    for rank, summoner_ids in summoner_data.items():
+        for summoner_id in summoner_ids:
+            puuid = puuids_data.get(summoner_id)
+            if puuid:
+                puuid_ranks[puuid] = rank
+    return puuid_ranks
+
+
+def seed_frontier(frontier, puuids, puuid_ranks, region):
+    """
+    Queue the seed PUUIDs. They have no known recency, so discovered players are crawled first.
+
+    Returns:
+    - int, number of newly queued players.
+    """
+    queued = 0
+    for puuid in puuids:
+        if frontier.push_player(puuid, puuid_ranks.get(puuid, UNKNOWN_RANK), region, 0):
+            queued += 1
+    return queued
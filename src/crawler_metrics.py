@@ -0,0 +1,279 @@
+import os
+import sys
+import json
+import time
+import argparse
+from collections import deque
+
+import requests
+
+METRICS_DIR = "../data/raw/crawl_metrics/"
+
+# URL template of every collector's requests; {route} is a platform (e.g. "na1") or regional
+# (e.g. "americas") routing value. Point it at mock_riot_api.py with e.g.
+# "http://127.0.0.1:8765/{route}" to run without an API key.
+RIOT_API_BASE = os.environ.get("RIOT_API_BASE", "https://{route}.api.riotgames.com")
+
+# development key limits, the budget a collector is measured against unless told otherwise
+DEFAULT_RATE_LIMITS = [(20, 1), (100, 120)]
+
+# why a collector slept: its own pacing, a 429's Retry-After, or backing off after server errors
+SLEEP_REASONS = ("self_imposed", "retry_after", "backoff")
+
+FLUSH_INTERVAL = 5.0
+
+
+def budget_rps(limits):
+    """
+    Get the sustained requests per second a set of (requests, seconds) windows allows.
+    """
+    return min(limit / seconds for limit, seconds in limits)
+
+
+class CrawlerMetrics:
+    """
+    Counters for one collector run, written as a JSON snapshot to <METRICS_DIR>/<name>.json every
+    few seconds so a dashboard (or anything else) can follow a crawl without parsing its output.
+    """
+
+    def __init__(self, name, limits=DEFAULT_RATE_LIMITS, metrics_dir=METRICS_DIR, flush_interval=FLUSH_INTERVAL):
+        """
+        Parameters:
+        - name: str, collector (and metrics file) name.
+        - limits: list of (requests, seconds) windows the collector's request budget comes from.
+        - metrics_dir: str, directory of the metrics files.
+        - flush_interval: float, minimum seconds between two snapshot writes.
+        """
+        self.name = name
+        self.budget_rps = budget_rps(limits)
+        # rates are measured over the longest limit window, the one that decides the sustained budget
+        self.rate_window = max(seconds for _, seconds in limits)
+        self.path = os.path.join(metrics_dir, f"{name}.json")
+        self.flush_interval = flush_interval
+        self.started_at = time.time()
+        self.last_flush = 0.0
+
+        self.requests = 0
+        self.ok = 0
+        self.rate_limited = 0
+        self.server_errors = 0
+        self.other_errors = 0
+        self.cache_hits = 0
+        self.done = 0
+        self.backlog = None
+        self.sleep_seconds = dict.fromkeys(SLEEP_REASONS, 0.0)
+        self.sleeping_until = 0.0
+        self.sleep_reason = None
+
+        # timestamps within the rate window, for current (not lifetime average) rates
+        self.recent_requests = deque()
+        self.recent_done = deque()
+
+    def record_request(self, status):
+        """
+        Count one HTTP request by its status code (None for a connection error or timeout).
+        """
+        self.requests += 1
+        self.recent_requests.append(time.time())
+        if status == 200:
+            self.ok += 1
+        elif status == 429:
+            self.rate_limited += 1
+        elif status is not None and status >= 500:
+            self.server_errors += 1
+        else:
+            self.other_errors += 1
+        self.flush()
+
+    def record_sleep(self, seconds, reason="self_imposed"):
+        """
+        Count time about to be spent sleeping. Long sleeps are written out right away, so the
+        dashboard shows the collector as sleeping rather than stale.
+        """
+        self.sleep_seconds[reason] += max(0.0, seconds)
+        self.sleeping_until = max(self.sleeping_until, time.time() + seconds)
+        self.sleep_reason = reason
+        self.flush(force=seconds >= self.flush_interval)
+
+    def record_cache_hit(self, count=1):
+        self.cache_hits += count
+
+    def record_done(self, count=1, backlog=None):
+        """
+        Count finished work items (summoners, players or matches) and update the remaining backlog.
+        """
+        self.done += count
+        now = time.time()
+        self.recent_done.extend([now] * count)
+        if backlog is not None:
+            self.backlog = backlog
+        self.flush()
+
+    def set_backlog(self, backlog):
+        self.backlog = backlog
+
+    def snapshot(self):
+        """
+        Get the current metrics.
+
+        Returns:
+        - dict, counters plus current rates, budget use and ETA.
+        """
+        now = time.time()
+        for recent in (self.recent_requests, self.recent_done):
+            while recent and recent[0] < now - self.rate_window:
+                recent.popleft()
+        elapsed = now - self.started_at
+        window = min(self.rate_window, elapsed) or 1.0
+        request_rate = len(self.recent_requests) / window
+        done_rate = len(self.recent_done) / window
+        # only the part of a sleep already spent counts
+        sleep_seconds = dict(self.sleep_seconds)
+        if self.sleep_reason is not None:
+            sleep_seconds[self.sleep_reason] -= max(0.0, self.sleeping_until - now)
+        return {
+            "collector": self.name,
+            "pid": os.getpid(),
+            "started_at": self.started_at,
+            "updated_at": now,
+            "elapsed_seconds": elapsed,
+            "requests": self.requests,
+            "ok": self.ok,
+            "rate_limited": self.rate_limited,
+            "server_errors": self.server_errors,
+            "other_errors": self.other_errors,
+            "cache_hits": self.cache_hits,
+            "requests_per_second": request_rate,
+            "average_requests_per_second": self.requests / elapsed if elapsed else 0.0,
+            "budget_rps": self.budget_rps,
+            "budget_used": request_rate / self.budget_rps if self.budget_rps else 0.0,
+            "sleep_seconds": sleep_seconds,
+            "sleeping_until": self.sleeping_until,
+            "done": self.done,
+            "done_per_second": done_rate,
+            "backlog": self.backlog,
+            "eta_seconds": self.backlog / done_rate if self.backlog is not None and done_rate else None,
+            "finished": False,
+        }
+
+    def flush(self, force=False, finished=False):
+        """
+        Write the snapshot if the flush interval has passed (or when forced), replacing the file atomically.
+        """
+        now = time.monotonic()
+        if not force and now - self.last_flush < self.flush_interval:
+            return
+        self.last_flush = now
+        snapshot = self.snapshot()
+        snapshot["finished"] = finished
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump(snapshot, f, indent=4)
+        os.replace(temp_path, self.path)
+
+    def close(self):
+        self.flush(force=True, finished=True)
+
+
+def get_recorded(url, headers, metrics=None, **kwargs):
+    """
+    requests.get that records the status (None when no response arrived) in the collector metrics.
+    """
+    try:
+        response = requests.get(url, headers=headers, **kwargs)
+    except requests.exceptions.RequestException:
+        if metrics is not None:
+            metrics.record_request(None)
+        raise
+    if metrics is not None:
+        metrics.record_request(response.status_code)
+    return response
+
+
+def load_snapshots(metrics_dir=METRICS_DIR):
+    snapshots = []
+    if not os.path.isdir(metrics_dir):
+        return snapshots
+    for filename in sorted(os.listdir(metrics_dir)):
+        if filename.endswith(".json"):
+            try:
+                with open(os.path.join(metrics_dir, filename), "r") as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+    return snapshots
+
+
+def format_duration(seconds):
+    if seconds is None:
+        return "-"
+    seconds = int(seconds)
+    days, seconds = divmod(seconds, 86400)
+    hours, seconds = divmod(seconds, 3600)
+    minutes, seconds = divmod(seconds, 60)
+    if days:
+        return f"{days}d{hours:02d}h"
+    if hours:
+        return f"{hours}h{minutes:02d}m"
+    return f"{minutes}m{seconds:02d}s"
+
+
+def render_dashboard(snapshots, stale_after=30.0):
+    """
+    Format one dashboard frame: a row per collector with its request rate against the budget,
+    errors, time spent sleeping and how much work is left.
+    """
+    now = time.time()
+    lines = [
+        f"{'collector':>24} {'state':>8} {'elapsed':>8} {'req/s':>6} {'budget':>6} {'used':>5} {'429':>5} {'5xx':>5} "
+        f"{'other':>5} {'sleep own':>9} {'sleep 429':>9} {'backoff':>8} {'done':>7} {'backlog':>8} {'ETA':>7}"
+    ]
+    for s in snapshots:
+        if s["finished"]:
+            state = "finished"
+        elif s["sleeping_until"] > now:
+            state = "sleeping"
+        elif now - s["updated_at"] > stale_after:
+            state = "stale"
+        else:
+            state = "running"
+        elapsed = s["elapsed_seconds"] or 1.0
+        sleeps = s["sleep_seconds"]
+        lines.append(
+            f"{s['collector']:>24} {state:>8} {format_duration(s['elapsed_seconds']):>8} "
+            f"{s['requests_per_second']:6.2f} {s['budget_rps']:6.2f} {s['budget_used']:5.0%} "
+            f"{s['rate_limited']:5d} {s['server_errors']:5d} {s['other_errors']:5d} "
+            f"{sleeps['self_imposed'] / elapsed:9.0%} {sleeps['retry_after'] / elapsed:9.0%} {sleeps['backoff'] / elapsed:8.0%} "
+            f"{s['done']:7d} {'-' if s['backlog'] is None else s['backlog']:>8} {format_duration(s['eta_seconds']):>7}"
+        )
+    if not snapshots:
+        lines.append("No collector metrics yet.")
+    return "\n".join(lines)
+
+
+def watch(metrics_dir=METRICS_DIR, interval=2.0, once=False):
+    """
+    Redraw the dashboard from the metrics files every `interval` seconds until interrupted.
+    """
+    try:
+        while True:
+            frame = render_dashboard(load_snapshots(metrics_dir), stale_after=max(30.0, 3 * FLUSH_INTERVAL))
+            if once:
+                print(frame)
+                return
+            # clear the screen and move the cursor home before each frame
+            sys.stdout.write("\033[2J\033[H" + time.strftime("%Y-%m-%d %H:%M:%S") + f"  {metrics_dir}\n\n" + frame + "\n")
+            sys.stdout.flush()
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Show a live dashboard of the collectors' metrics files.")
+    parser.add_argument("--dir", default=METRICS_DIR, help="directory of the collectors' metrics files")
+    parser.add_argument("--interval", type=float, default=2.0, help="seconds between refreshes")
+    parser.add_argument("--once", action="store_true", help="print one frame and exit")
+    args = parser.parse_args()
+    watch(args.dir, args.interval, args.once)
@@ -0,0 +1,345 @@
+import os
+import time
+import argparse
+
+import numpy as np
+
+FAST_PATH_FILE = "fast_path.npz"
+
+ITEM_TARGETS = ["Boots_id", "Legendary_1_id", "Legendary_2_id"]
+UNKNOWN_NAMES = {"item": "Unknown Item", "rune": "Unknown Rune"}
+
+
+def _is_passthrough(transformer):
+    # newer scikit-learn fits the passthrough remainder as an identity FunctionTransformer
+    return transformer == "passthrough" or (type(transformer).__name__ == "FunctionTransformer"
+                                            and transformer.func is None)
+
+
+def export_arrays(pipeline, label_encoders, target_features, id_to_name=None):
+    """
+    Turn the fitted preprocessing pipeline and label encoders into plain arrays.
+
+    Supports the ColumnTransformer of 04_modeling.ipynb and train_streaming.py: OneHotEncoder,
+    StandardScaler and passthrough (or dropped) columns.
+
+    Parameters:
+    - pipeline: the fitted preprocessing Pipeline (or a bare ColumnTransformer).
+    - label_encoders: dict, the fitted LabelEncoders of every target.
+    - target_features: list of str, targets in prediction order.
+    - id_to_name: dict, optional, target feature -> {item or rune ID: display name}; every ID is
+      exported, not only the classes, since serving's rune repairs can pick IDs the model never predicts.
+
+    Returns:
+    - dict of str -> array, savable with np.savez and loadable without pickle.
+
+    Raises:
+    - ValueError, if the pipeline holds a step the NumPy path cannot reproduce exactly.
+    """
+    preprocessor = pipeline.named_steps["preprocessor"] if hasattr(pipeline, "named_steps") else pipeline
+    if hasattr(pipeline, "steps") and len(pipeline.steps) != 1:
+        raise ValueError(f"Only a single preprocessing step is supported, got {[name for name, _ in pipeline.steps]}")
+    input_features = list(preprocessor.feature_names_in_)
+
+    def column_indices(columns):
+        return np.array([c if isinstance(c, (int, np.integer)) else input_features.index(c) for c in columns],
+                        dtype=np.int64)
+
+    arrays = {
+        "input_features": np.array(input_features),
+        "n_output": np.array(sum(s.stop - s.start for s in preprocessor.output_indices_.values())),
+        "sparse_output": np.array(bool(preprocessor.sparse_output_)),
+    }
+    kinds = []
+    for name, transformer, columns in preprocessor.transformers_:
+        output = preprocessor.output_indices_[name]
+        if transformer == "drop" or output.stop == output.start:
+            continue
+        i = len(kinds)
+        arrays[f"{i}_columns"] = column_indices(columns)
+        arrays[f"{i}_output"] = np.array([output.start, output.stop])
+
+        kind = type(transformer).__name__
+        if _is_passthrough(transformer):
+            kinds.append("passthrough")
+        elif kind == "StandardScaler":
+            kinds.append("scale")
+            n = len(columns)
+            # subtracting 0 and dividing by 1 leave every value bit for bit unchanged
+            arrays[f"{i}_mean"] = transformer.mean_ if transformer.with_mean else np.zeros(n)
+            arrays[f"{i}_scale"] = transformer.scale_ if transformer.with_std else np.ones(n)
+        elif kind == "OneHotEncoder":
+            if getattr(transformer, "infrequent_categories_", None) is not None and \
+                    any(c is not None for c in transformer.infrequent_categories_):
+                raise ValueError(f"Infrequent category grouping in {name} is not supported")
+            kinds.append("onehot")
+            arrays[f"{i}_unknown_error"] = np.array(transformer.handle_unknown == "error")
+            drop_idx = transformer.drop_idx_ if transformer.drop_idx_ is not None else [None] * len(columns)
+            for j, (categories, dropped) in enumerate(zip(transformer.categories_, drop_idx)):
+                if categories.dtype.kind not in "iuf":
+                    raise ValueError(f"Only numeric categories are supported, {name} has {categories.dtype}")
+                keep = np.ones(len(categories), dtype=bool)
+                if dropped is not None:
+                    keep[dropped] = False
+                arrays[f"{i}_categories_{j}"] = categories.astype(np.float64)
+                arrays[f"{i}_keep_{j}"] = keep
+        else:
+            raise ValueError(f"Transformer {name} ({kind}) is not supported by the NumPy fast path")
+    arrays["kinds"] = np.array(kinds)
+
+    arrays["target_features"] = np.array(target_features)
+    for col in target_features:
+        classes = label_encoders[col].classes_
+        arrays[f"classes_{col}"] = classes
+        if id_to_name is not None:
+            name_ids = np.array(sorted(int(i) for i in id_to_name[col]), dtype=np.int64)
+            arrays[f"name_ids_{col}"] = name_ids
+            arrays[f"names_{col}"] = np.array([id_to_name[col][i] for i in name_ids.tolist()], dtype=str)
+    return arrays
+
+
+class FastPath:
+    """
+    The preprocessing transform and the label decoding of the fitted scikit-learn objects, as
+    plain NumPy over exported arrays. Outputs are bit-identical to pipeline.transform and
+    LabelEncoder.inverse_transform, without building DataFrames or going through their
+    input validation, which dominate the cost for a handful of rows.
+    """
+
+    def __init__(self, arrays):
+        """
+        Parameters:
+        - arrays: dict, the output of export_arrays (or a loaded fast_path.npz).
+        """
+        self.arrays = arrays
+        self.input_features = [str(f) for f in arrays["input_features"]]
+        self.n_output = int(arrays["n_output"])
+        self.sparse_output = bool(arrays["sparse_output"])
+        self.segments = []
+        for i, kind in enumerate(arrays["kinds"]):
+            start, stop = arrays[f"{i}_output"]
+            segment = {"kind": str(kind), "columns": arrays[f"{i}_columns"], "output": slice(int(start), int(stop))}
+            if kind == "scale":
+                segment.update(mean=arrays[f"{i}_mean"], scale=arrays[f"{i}_scale"])
+            elif kind == "onehot":
+                segment["unknown_error"] = bool(arrays[f"{i}_unknown_error"])
+                segment["categories"] = [arrays[f"{i}_categories_{j}"] for j in range(len(segment["columns"]))]
+                segment["keep"] = [arrays[f"{i}_keep_{j}"] for j in range(len(segment["columns"]))]
+            self.segments.append(segment)
+
+        self.target_features = [str(col) for col in arrays["target_features"]]
+        self.classes = {col: arrays[f"classes_{col}"] for col in self.target_features}
+        self.name_ids = {col: arrays[f"name_ids_{col}"] for col in self.target_features if f"name_ids_{col}" in arrays}
+        self.names = {col: arrays[f"names_{col}"] for col in self.name_ids}
+
+    @classmethod
+    def from_fitted(cls, pipeline, label_encoders, target_features, id_to_name=None):
+        return cls(export_arrays(pipeline, label_encoders, target_features, id_to_name))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as f:
+            return cls(dict(f))
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        np.savez(path, **self.arrays)
+
+    def transform(self, X):
+        """
+        Preprocess rows like pipeline.transform.
+
+        Parameters:
+        - X: DataFrame with the input features, or 2D array with them in input_features order.
+
+        Returns:
+        - array (rows x outputs) of float64, or a CSR matrix when the pipeline outputs sparse.
+        """
+        if hasattr(X, "columns"):
+            X = X[self.input_features].to_numpy(dtype=np.float64)
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim != 2 or X.shape[1] != len(self.input_features):
+            raise ValueError(f"Expected {len(self.input_features)} input features, got an array of shape {X.shape}")
+
+        out = np.zeros((X.shape[0], self.n_output))
+        for segment in self.segments:
+            values = X[:, segment["columns"]]
+            if segment["kind"] == "passthrough":
+                out[:, segment["output"]] = values
+            elif segment["kind"] == "scale":
+                out[:, segment["output"]] = (values - segment["mean"]) / segment["scale"]
+            else:
+                blocks = []
+                for j, (categories, keep) in enumerate(zip(segment["categories"], segment["keep"])):
+                    matches = values[:, j, None] == categories[None, :]
+                    if segment["unknown_error"] and not matches.any(axis=1).all():
+                        raise ValueError(f"Found unknown categories in column {j} during transform")
+                    # an unknown or dropped category leaves the row's block all zeros, as with handle_unknown="ignore"
+                    blocks.append(matches[:, keep])
+                out[:, segment["output"]] = np.hstack(blocks)
+
+        if self.sparse_output:
+            from scipy import sparse
+            return sparse.csr_matrix(out)
+        return out
+
+    def transform_records(self, records):
+        """
+        Preprocess a list of dicts of feature values, skipping the DataFrame entirely.
+        """
+        return self.transform([[record[f] for f in self.input_features] for record in records])
+
+    def decode(self, codes):
+        """
+        Turn predicted class codes (rows x targets) into item and rune IDs, like inverse_transform.
+
+        Returns:
+        - dict, target feature -> array of IDs.
+        """
+        codes = np.asarray(codes)
+        decoded = {}
+        for t, col in enumerate(self.target_features):
+            column = codes[:, t] if codes.ndim == 2 else codes
+            if column.size and (column.min() < 0 or column.max() >= len(self.classes[col])):
+                raise ValueError(f"y contains previously unseen labels: {col}")
+            decoded[col] = self.classes[col][column]
+        return decoded
+
+    def names_of(self, col, ids):
+        """
+        Look up the display names of one target's item or rune IDs, like id_to_name.get(id, unknown).
+
+        Returns:
+        - array of names.
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        name_ids, names = self.name_ids[col], self.names[col]
+        unknown = UNKNOWN_NAMES["item" if col in ITEM_TARGETS else "rune"]
+        if not len(name_ids):
+            return np.full(ids.shape, unknown)
+        positions = np.minimum(np.searchsorted(name_ids, ids), len(name_ids) - 1)
+        return np.where(name_ids[positions] == ids, names[positions], unknown)
+
+    def decode_names(self, codes):
+        """
+        Turn predicted class codes (rows x targets) straight into display names.
+
+        Returns:
+        - dict, target feature -> array of names.
+        """
+        codes = np.asarray(codes)
+        return {col: self.names_of(col, self.classes[col][codes[:, t]]) for t, col in enumerate(self.target_features)}
+
+
+def check_identical(fast_path, pipeline, label_encoders, X_df, codes):
+    """
+    Compare the fast path with the scikit-learn objects, bit for bit.
+
+    Returns:
+    - dict, "transform" and "decode" -> bool.
+    """
+    expected = pipeline.transform(X_df)
+    actual = fast_path.transform(X_df)
+    if hasattr(expected, "toarray"):
+        expected, actual = expected.toarray(), actual.toarray()
+    transform_ok = expected.dtype == actual.dtype and expected.shape == actual.shape and \
+        np.array_equal(np.ascontiguousarray(expected).view(np.uint64), np.ascontiguousarray(actual).view(np.uint64))
+
+    decoded = fast_path.decode(codes)
+    decode_ok = all(
+        np.array_equal(label_encoders[col].inverse_transform(codes[:, t]), decoded[col])
+        and label_encoders[col].inverse_transform(codes[:, t]).dtype == decoded[col].dtype
+        for t, col in enumerate(fast_path.target_features)
+    )
+    return {"transform": bool(transform_ok), "decode": bool(decode_ok)}
+
+
+def time_call(function, repeat):
+    """
+    Median seconds of one call over `repeat` calls.
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings))
+
+
+def benchmark(fast_path, pipeline, label_encoders, df, id_to_name, rows=1000, repeat=200, seed=42):
+    """
+    Time the scikit-learn and NumPy paths the way serving uses them: one averaged matchup row
+    (built into a DataFrame for scikit-learn), a batch of rows, and decoding one prediction
+    into IDs and display names.
+
+    Returns:
+    - list of (operation, scikit-learn seconds, NumPy seconds) rows.
+    """
+    import pandas as pd
+
+    sample = df.sample(min(rows, len(df)), random_state=seed)
+    record = sample.iloc[0].to_dict()
+    feature_order = df.columns.difference(fast_path.target_features)
+    batch = sample[feature_order]
+    rng = np.random.default_rng(seed)
+    codes = np.stack([rng.integers(0, len(fast_path.classes[col]), 1) for col in fast_path.target_features], axis=1)
+
+    def sklearn_decode():
+        decoded = pd.DataFrame()
+        for t, col in enumerate(fast_path.target_features):
+            decoded[col] = label_encoders[col].inverse_transform(codes[:, t])
+        for col in fast_path.target_features:
+            unknown = UNKNOWN_NAMES["item" if col in ITEM_TARGETS else "rune"]
+            decoded[col] = decoded[col].apply(lambda x: id_to_name[col].get(int(x), unknown))
+        return decoded
+
+    return [
+        ("transform 1 row", time_call(lambda: pipeline.transform(pd.DataFrame([record], columns=feature_order)), repeat),
+         time_call(lambda: fast_path.transform_records([record]), repeat)),
+        (f"transform {len(batch)} rows", time_call(lambda: pipeline.transform(batch), max(1, repeat // 10)),
+         time_call(lambda: fast_path.transform(batch), max(1, repeat // 10))),
+        ("decode 1 row + names", time_call(sklearn_decode, repeat),
+         time_call(lambda: (fast_path.decode(codes), fast_path.decode_names(codes)), repeat)),
+    ]
+
+
+if __name__ == "__main__":
+    import joblib
+    import pandas as pd
+    from serving import (DF_PATH, MODEL_DIR, PIPELINE_FILE, LABEL_ENCODERS_FILE, MODEL_FILE, target_features,
+                         target_names, write_fast_path)
+
+    parser = argparse.ArgumentParser(description="Export the preprocessing pipeline and label encoders to NumPy arrays, "
+                                                 "check the NumPy path against scikit-learn and benchmark both.")
+    parser.add_argument("command", choices=["export", "bench"])
+    parser.add_argument("--model-dir", default=MODEL_DIR)
+    parser.add_argument("--df-path", default=DF_PATH)
+    parser.add_argument("--output", default=None,
+                        help=f"defaults to <model-dir>/{FAST_PATH_FILE}, which serving loads instead of rebuilding it")
+    parser.add_argument("--rows", type=int, default=1000, help="rows checked and used for the batch benchmark")
+    parser.add_argument("--repeat", type=int, default=200, help="timed calls per operation")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        output = args.output or os.path.join(args.model_dir, FAST_PATH_FILE)
+        fast_path = write_fast_path(args.model_dir, output)
+        print(f"Exported {len(fast_path.segments)} preprocessing steps and {len(target_features)} targets to {output} "
+              f"({os.path.getsize(output) / 1024:.1f} KB)")
+    else:
+        pipeline = joblib.load(os.path.join(args.model_dir, PIPELINE_FILE))
+        label_encoders = joblib.load(os.path.join(args.model_dir, LABEL_ENCODERS_FILE))
+        id_to_name = target_names()
+        fast_path = FastPath.from_fitted(pipeline, label_encoders, target_features, id_to_name)
+        df = pd.read_csv(args.df_path)
+        sample = df.sample(min(args.rows, len(df)), random_state=42)
+        model = joblib.load(os.path.join(args.model_dir, MODEL_FILE))
+        codes = model.predict(pipeline.transform(sample[df.columns.difference(target_features)]))
+        checks = check_identical(fast_path, pipeline, label_encoders, sample[df.columns.difference(target_features)],
+                                 codes)
+        print(f"Bit-identical on {len(sample)} rows: transform {checks['transform']}, decode {checks['decode']}")
+
+        print(f"{'operation':>22} {'sklearn µs':>11} {'numpy µs':>9} {'speedup':>8}")
+        for operation, sklearn_seconds, numpy_seconds in benchmark(fast_path, pipeline, label_encoders, df, id_to_name,
+                                                                   args.rows, args.repeat):
+            print(f"{operation:>22} {sklearn_seconds * 1e6:11.1f} {numpy_seconds * 1e6:9.1f} "
+                  f"{sklearn_seconds / numpy_seconds:7.1f}x")
@@ -0,0 +1,216 @@
+import time
+import argparse
+
+# targets grouped into the three choices the tables rank independently
+BOOTS_COLUMN = "Boots_id"
+LEGENDARY_COLUMNS = ["Legendary_1_id", "Legendary_2_id"]
+RUNE_COLUMNS = ["Keystone", "PrimarySlot1", "PrimarySlot2", "PrimarySlot3", "SecondarySlot1", "SecondarySlot2"]
+
+# processed data stores positions as integers (see 02_data_cleaning.ipynb)
+POSITION_IDS = {"top": 0, "jungle": 1, "mid": 2, "middle": 2, "bot": 3, "bottom": 3, "adc": 3, "support": 4, "utility": 4}
+
+
+class FrequencyTable:
+    """
+    Game and win counts for every choice seen in one (champion, matchup, position) cell.
+
+    The most-winning choice is tracked as counts are added, so reading it never scans the table.
+    """
+
+    __slots__ = ("counts", "best")
+
+    def __init__(self):
+        self.counts = {}
+        self.best = None
+
+    def add(self, choice, win):
+        games, wins = self.counts.get(choice, (0, 0))
+        games, wins = games + 1, wins + int(win)
+        self.counts[choice] = (games, wins)
+
+        # counts only ever grow, so a challenger can only overtake the current best, never the reverse
+        if self.best is None or choice == self.best:
+            self.best = choice
+        else:
+            best_games, best_wins = self.counts[self.best]
+            if (wins, games) > (best_wins, best_games):
+                self.best = choice
+
+
+class FrequencyRecommender:
+    """
+    Recommend the historically most-winning legal build for a matchup from incrementally
+    maintained count tables.
+
+    Boots, the legendary pair and the full rune page are ranked separately per
+    (championId, matchupChampion, individualPosition) and per (championId, matchupChampion)
+    over all positions, so a lookup is a couple of dict reads.
+    """
+
+    def __init__(self, rune_id_to_tree, rune_id_to_row):
+        """
+        Parameters:
+        - rune_id_to_tree: dict, rune ID -> rune tree (style) ID.
+        - rune_id_to_row: dict, rune ID -> row index inside its tree (0 is the keystone row).
+        """
+        self.rune_id_to_tree = rune_id_to_tree
+        self.rune_id_to_row = rune_id_to_row
+        self.tables = {}
+        self.rows_seen = 0
+
+    def is_legal_rune_page(self, page):
+        """
+        Check that a rune page is one the client would accept.
+
+        Keystone and primary slots come from one tree, one per row; the two secondary
+        runes come from a different tree, from two different non-keystone rows.
+        """
+        keystone, primary_1, primary_2, primary_3, secondary_1, secondary_2 = page
+        primary_tree = self.rune_id_to_tree.get(keystone)
+        if primary_tree is None or self.rune_id_to_row.get(keystone) != 0:
+            return False
+        primary_rows = [self.rune_id_to_row.get(r) for r in (primary_1, primary_2, primary_3)]
+        if any(self.rune_id_to_tree.get(r) != primary_tree for r in (primary_1, primary_2, primary_3)) or \
+                sorted(primary_rows) != [1, 2, 3]:
+            return False
+
+        secondary_tree = self.rune_id_to_tree.get(secondary_1)
+        if secondary_tree is None or secondary_tree == primary_tree or self.rune_id_to_tree.get(secondary_2) != secondary_tree:
+            return False
+        secondary_rows = {self.rune_id_to_row.get(secondary_1), self.rune_id_to_row.get(secondary_2)}
+        return len(secondary_rows) == 2 and 0 not in secondary_rows
+
+    def _cell(self, key):
+        cell = self.tables.get(key)
+        if cell is None:
+            cell = self.tables[key] = {"boots": FrequencyTable(), "legendaries": FrequencyTable(), "runes": FrequencyTable()}
+        return cell
+
+    def add_game(self, champion_id, matchup_champion_id, position, boots, legendaries, rune_page, win):
+        """
+        Count one historical game. Missing or illegal choices are skipped, so they can never be recommended.
+        """
+        self.rows_seen += 1
+        cells = [self._cell((champion_id, matchup_champion_id, position)), self._cell((champion_id, matchup_champion_id, None))]
+
+        for cell in cells:
+            if boots:
+                cell["boots"].add(boots, win)
+            if all(legendaries) and legendaries[0] != legendaries[1]:
+                cell["legendaries"].add(legendaries, win)
+            if self.is_legal_rune_page(rune_page):
+                cell["runes"].add(rune_page, win)
+
+    def update(self, df):
+        """
+        Add every game of a processed DataFrame (or a newly processed chunk of one).
+        """
+        columns = ["championId", "matchupChampion", "individualPosition", "win", BOOTS_COLUMN] + LEGENDARY_COLUMNS + RUNE_COLUMNS
+        for row in df[columns].itertuples(index=False, name=None):
+            champion_id, matchup_champion_id, position, win, boots = (int(value) for value in row[:5])
+            legendaries = (int(row[5]), int(row[6]))
+            rune_page = tuple(int(value) for value in row[7:])
+            self.add_game(champion_id, matchup_champion_id, position, boots, legendaries, rune_page, win)
+        return self
+
+    def recommend_ids(self, champion_id, matchup_champion_id, position=None):
+        """
+        Look up the most-winning boots, legendary pair and rune page for a matchup.
+
+        Parameters:
+        - champion_id: int, champion ID of the player.
+        - matchup_champion_id: int, champion ID of the opponent.
+        - position: int, optional individualPosition; None uses games from every position.
+
+        Returns:
+        - dict, target feature -> item or rune ID, or None if a cell has no legal choice.
+        """
+        cell = self.tables.get((champion_id, matchup_champion_id, position))
+        if cell is None:
+            return None
+        boots, legendaries, rune_page = cell["boots"].best, cell["legendaries"].best, cell["runes"].best
+        if boots is None or legendaries is None or rune_page is None:
+            return None
+
+        build = {BOOTS_COLUMN: boots}
+        build.update(zip(LEGENDARY_COLUMNS, legendaries))
+        build.update(zip(RUNE_COLUMNS, rune_page))
+        return build
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def compare_engines(pairs, recommend):
+    """
+    Compare the model and frequency engines on the same matchups.
+
+    Parameters:
+    - pairs: list of (champion name, opponent name).
+    - recommend: callable(champion, opponent, engine=...) returning a build dict.
+
+    Returns:
+    - dict, per-target agreement rates, full-build agreement and latency percentiles per engine.
+    """
+    from serving import target_features
+
+    latencies = {"model": [], "frequency": []}
+    agreement = {col: 0 for col in target_features}
+    full_agreement = 0
+    compared = 0
+
+    for champion, opponent in pairs:
+        builds = {}
+        for engine in latencies:
+            start = time.perf_counter()
+            try:
+                builds[engine] = recommend(champion, opponent, engine=engine)
+            except ValueError:
+                builds[engine] = None
+            latencies[engine].append(time.perf_counter() - start)
+
+        if builds["model"] is None or builds["frequency"] is None:
+            continue
+        compared += 1
+        matches = [builds["model"][col] == builds["frequency"][col] for col in target_features]
+        for col, same in zip(target_features, matches):
+            agreement[col] += same
+        full_agreement += all(matches)
+
+    report = {
+        "matchups": len(pairs),
+        "compared": compared,
+        "agreement": {col: count / compared if compared else 0.0 for col, count in agreement.items()},
+        "full_build_agreement": full_agreement / compared if compared else 0.0,
+        "latency_ms": {
+            engine: {
+                "p50": percentile(values, 0.50) * 1000,
+                "p95": percentile(values, 0.95) * 1000,
+                "p99": percentile(values, 0.99) * 1000,
+            }
+            for engine, values in latencies.items() if values
+        },
+    }
+    return report
+
+
+if __name__ == "__main__":
+    import serving
+
+    parser = argparse.ArgumentParser(description="Compare the frequency-table engine with the model engine.")
+    parser.add_argument("--matchups", type=int, default=200, help="number of most played matchups to compare")
+    args = parser.parse_args()
+
+    bundle = serving.load_artifacts()
+    report = compare_engines(serving.sample_matchups(bundle["df"], args.matchups), serving.recommend)
+
+    print(f"Compared {report['compared']} of {report['matchups']} matchups (artifact version {bundle['version']})")
+    print("Agreement per target:")
+    for col, rate in report["agreement"].items():
+        print(f"  {col:>16}: {rate:6.1%}")
+    print(f"  {'full build':>16}: {report['full_build_agreement']:6.1%}")
+    print("Latency (ms):")
+    for engine, stats in report["latency_ms"].items():
+        print(f"  {engine:>9}: p50 {stats['p50']:8.3f}  p95 {stats['p95']:8.3f}  p99 {stats['p99']:8.3f}")
@@ -4,6 +4,13 @@ import requests
 import time
 import datetime
 
+import ijson
+
+import raw_cache
+from crawl_frontier import CrawlFrontier
+from crawler_metrics import RIOT_API_BASE, CrawlerMetrics, get_recorded
+
+
 def load_api_key():
     """
     load the API key from the credentials file.
@@ -12,27 +19,94 @@ def load_api_key():
         data = json.load(f)
     return data.get("riot_api_key")
 
-def fetch_match_details(api_key, match_id, region):
+def fetch_match_details(api_key, match_id, region, metrics=None):
     """
-    fetch raw match data from Riot API.
+    fetch raw match data from Riot API, or from the raw response cache if it was fetched before.
+    the raw response is cached so the extraction can be re-run later without the API.
     """
-    url = f"https://{region}.api.riotgames.com/lol/match/v5/matches/{match_id}"
+    match_data = raw_cache.get_json("match", match_id)
+    if match_data is not None:
+        if metrics is not None:
+            metrics.record_cache_hit()
+        return match_data
+
+    url = RIOT_API_BASE.format(route=region) + f"/lol/match/v5/matches/{match_id}"
     headers = {"X-Riot-Token": api_key}
 
-    response = requests.get(url, headers=headers)
+    response = get_recorded(url, headers, metrics)
     response.raise_for_status()
+    raw_cache.put("match", match_id, response.content)
     return response.json()
 
-def fetch_match_timeline(api_key, match_id, region):
+# the only timeline events and fields extract_match_details reads
+PURCHASE_EVENT_PREFIX = "info.frames.item.events.item"
+PURCHASE_EVENT_FIELDS = ("type", "participantId", "itemId", "timestamp")
+
+def purchase_event(event):
+    """
+    keep only the fields of an ITEM_PURCHASED event, or None for any other event.
+    """
+    if event.get("type") != "ITEM_PURCHASED":
+        return None
+    return {field: event[field] for field in PURCHASE_EVENT_FIELDS}
+
+def parse_timeline_stream(stream):
+    """
+    incrementally parse a timeline JSON stream, keeping only ITEM_PURCHASED events.
+
+    participantFrames are skipped by the parser without being built, and other events are
+    dropped one at a time, so memory stays bounded by the purchases instead of the whole
+    document. returns a timeline-shaped dict with a single frame, which extract_match_details
+    reads like a full timeline.
+    """
+    purchases = []
+    for event in ijson.items(stream, PURCHASE_EVENT_PREFIX):
+        event = purchase_event(event)
+        if event is not None:
+            purchases.append(event)
+    return {"info": {"frames": [{"events": purchases}]}}
+
+async def parse_timeline_stream_async(stream):
+    """
+    same as parse_timeline_stream, for asynchronous streams such as an aiohttp response body.
+    """
+    purchases = []
+    async for event in ijson.items_async(stream, PURCHASE_EVENT_PREFIX):
+        event = purchase_event(event)
+        if event is not None:
+            purchases.append(event)
+    return {"info": {"frames": [{"events": purchases}]}}
+
+def load_cached_timeline(match_id):
+    """
+    stream-parse a cached timeline, or return None if it was never fetched.
+    """
+    stream = raw_cache.open_cached("timeline", match_id)
+    if stream is None:
+        return None
+    with stream:
+        return parse_timeline_stream(stream)
+
+def fetch_match_timeline(api_key, match_id, region, metrics=None):
     """
-    fetch match timeline data from Riot API.
+    fetch match timeline data from Riot API, streaming out only the item purchase events.
+
+    the full response is streamed into the raw response cache first and parsed from there,
+    so it is never held in memory and later re-extractions don't need the API.
     """
-    url = f"https://{region}.api.riotgames.com/lol/match/v5/matches/{match_id}/timeline"
+    timeline_data = load_cached_timeline(match_id)
+    if timeline_data is not None:
+        if metrics is not None:
+            metrics.record_cache_hit()
+        return timeline_data
+
+    url = RIOT_API_BASE.format(route=region) + f"/lol/match/v5/matches/{match_id}/timeline"
     headers = {"X-Riot-Token": api_key}
 
-    response = requests.get(url, headers=headers)
-    response.raise_for_status()
-    return response.json()
+    with get_recorded(url, headers, metrics, stream=True) as response:
+        response.raise_for_status()
+        raw_cache.put_stream("timeline", match_id, response.iter_content(raw_cache.CHUNK_SIZE))
+    return load_cached_timeline(match_id)
 
 def extract_match_details(match_data, timeline_data):
     """
@@ -102,94 +176,127 @@ def extract_match_details(match_data, timeline_data):
 
     return extracted_data
 
-# load API key and set up paths
-API_KEY = load_api_key()
-REGION = "americas"
-MATCH_IDS_PATH = "../data/raw/match_ids/match_ids.json"
-MATCH_DETAILS_OUTPUT_DIR = "../data/raw/match_details/"
-
-# ensure the output directory exists
-os.makedirs(MATCH_DETAILS_OUTPUT_DIR, exist_ok=True)
-
-# load match ids
-if os.path.exists(MATCH_IDS_PATH):
-    with open(MATCH_IDS_PATH, 'r') as f:
-        match_ids = json.load(f)
-else:
-    match_ids = []
-
-# find the latest match details file or create the first one
-existing_files = [f for f in os.listdir(MATCH_DETAILS_OUTPUT_DIR) if f.startswith("all_match_details") and f.endswith(".json")]
-existing_files.sort()
-
-if existing_files:
-    latest_file = existing_files[-1]
-    with open(os.path.join(MATCH_DETAILS_OUTPUT_DIR, latest_file), 'r') as f:
-        all_match_details = json.load(f)
-else:
-    latest_file = "all_match_details01.json"
-    all_match_details = []
-
-# process each match ID and extract details
-request_count = 0
-start_time = datetime.datetime.now()
-
-for match_id in match_ids:
+if __name__ == "__main__":
+    # load API key and set up paths
+    API_KEY = load_api_key()
+    REGION = "americas"
+    MATCH_IDS_PATH = "../data/raw/match_ids/match_ids.json"
+    MATCH_DETAILS_OUTPUT_DIR = "../data/raw/match_details/"
+
+    # save the frontier every N matches instead of after every request
+    FRONTIER_SAVE_INTERVAL = 20
+
+    # progress, request and sleep metrics for crawler_metrics.py's dashboard
+    METRICS = CrawlerMetrics("match_details")
+
+    # ensure the output directory exists
+    os.makedirs(MATCH_DETAILS_OUTPUT_DIR, exist_ok=True)
+
+    # load match ids
+    if os.path.exists(MATCH_IDS_PATH):
+        with open(MATCH_IDS_PATH, 'r') as f:
+            match_ids = json.load(f)
+    else:
+        match_ids = []
+
+    # queue match IDs collected before the frontier existed; already queued or processed ones are skipped
+    frontier = CrawlFrontier()
+    for match_id in match_ids:
+        frontier.push_match(match_id)
+
+    # find the latest match details file or create the first one
+    existing_files = [f for f in os.listdir(MATCH_DETAILS_OUTPUT_DIR) if f.startswith("all_match_details") and f.endswith(".json")]
+    existing_files.sort()
+
+    if existing_files:
+        latest_file = existing_files[-1]
+        with open(os.path.join(MATCH_DETAILS_OUTPUT_DIR, latest_file), 'r') as f:
+            all_match_details = json.load(f)
+    else:
+        latest_file = "all_match_details01.json"
+        all_match_details = []
+
+    # process each match ID and extract details
+    request_count = 0
+    start_time = datetime.datetime.now()
+    matches_processed = 0
+    players_discovered = 0
+
+    # newest matches first, so the request budget goes to the freshest data
     while True:
-        try:
-            # check request rate limits
-            current_time = datetime.datetime.now()
-            elapsed_seconds = (current_time - start_time).total_seconds()
-
-            if request_count >= 50 and elapsed_seconds < 120:
-                sleep_time = 120 - elapsed_seconds
-                print(f"Approaching 2-minute rate limit. Waiting for {sleep_time:.2f} seconds...")
-                time.sleep(sleep_time)
-                request_count = 0
-                start_time = datetime.datetime.now()
-
-            # if 10 requests made in the last second, wait for the next second
-            if request_count % 10 == 0 and request_count > 0:
-                print("10 requests made in the last second. Pausing for 1 second to avoid limit...")
-                time.sleep(1)
-
-            # fetch match details and timeline
-            match_data = fetch_match_details(API_KEY, match_id, REGION)
-            timeline_data = fetch_match_timeline(API_KEY, match_id, REGION)
-
-            # extract relevant details
-            extracted_details = extract_match_details(match_data, timeline_data)
-
-            # append new match details to the existing data
-            all_match_details.extend(extracted_details)
-
-            # check if the file exceeds 10,000 entries
-            if len(all_match_details) > 10000:
-                # save the current file and start a new one
-                with open(os.path.join(MATCH_DETAILS_OUTPUT_DIR, latest_file), 'w') as f:
-                    json.dump(all_match_details[:10000], f, indent=4)
-                print(f"Saved {latest_file} with 10,000 entries.")
-
-                # update the list of remaining details
-                all_match_details = all_match_details[10000:]
-
-                # increment the file name
-                latest_file_number = int(latest_file[-6:-5]) + 1
-                latest_file = f"all_match_details{latest_file_number:02d}.json"
-
-            # save the current details to the latest file
-            with open(os.path.join(MATCH_DETAILS_OUTPUT_DIR, latest_file), 'w') as f:
-                json.dump(all_match_details, f, indent=4)
-
-            print(f"Details for match {match_id} processed and saved to JSON.")
-            request_count += 2  # increment by 2 due to two requests (details and timeline)
+        entry = frontier.pop_match()
+        if entry is None:
             break
+        match_id = entry["match_id"]
+
+        while True:
+            try:
+                # check request rate limits
+                current_time = datetime.datetime.now()
+                elapsed_seconds = (current_time - start_time).total_seconds()
+
+                if request_count >= 50 and elapsed_seconds < 120:
+                    sleep_time = 120 - elapsed_seconds
+                    print(f"Approaching 2-minute rate limit. Waiting for {sleep_time:.2f} seconds...")
+                    METRICS.record_sleep(sleep_time)
+                    time.sleep(sleep_time)
+                    request_count = 0
+                    start_time = datetime.datetime.now()
+
+                # if 10 requests made in the last second, wait for the next second
+                if request_count % 10 == 0 and request_count > 0:
+                    print("10 requests made in the last second. Pausing for 1 second to avoid limit...")
+                    METRICS.record_sleep(1)
+                    time.sleep(1)
+
+                # fetch match details and timeline; cached responses don't count against the rate limit
+                cached = raw_cache.has("match", match_id) + raw_cache.has("timeline", match_id)
+                match_data = fetch_match_details(API_KEY, match_id, REGION, METRICS)
+                timeline_data = fetch_match_timeline(API_KEY, match_id, REGION, METRICS)
+
+                # extract relevant details
+                extracted_details = extract_match_details(match_data, timeline_data)
+
+                # feed the other participants back into match history fetching
+                players_discovered += frontier.push_match_participants(match_data, entry["rank"])
+
+                # append new match details to the existing data
+                all_match_details.extend(extracted_details)
+
+                # check if the file exceeds 10,000 entries
+                if len(all_match_details) > 10000:
+                    # save the current file and start a new one
+                    with open(os.path.join(MATCH_DETAILS_OUTPUT_DIR, latest_file), 'w') as f:
+                        json.dump(all_match_details[:10000], f, indent=4)
+                    print(f"Saved {latest_file} with 10,000 entries.")
+
+                    # update the list of remaining details
+                    all_match_details = all_match_details[10000:]
+
+                    # increment the file name
+                    latest_file_number = int(latest_file[-6:-5]) + 1
+                    latest_file = f"all_match_details{latest_file_number:02d}.json"
+
+                # save the current details to the latest file
+                with open(os.path.join(MATCH_DETAILS_OUTPUT_DIR, latest_file), 'w') as f:
+                    json.dump(all_match_details, f, indent=4)
 
-        except requests.exceptions.RequestException as e:
-            print(f"Error: {e}")
-            if "expired" in str(e).lower():
-                API_KEY = input("API key expired. Please enter a new API key: ")
-            else:
+                print(f"Details for match {match_id} processed and saved to JSON.")
+                request_count += 2 - cached  # up to two requests (details and timeline)
                 break
 
-print("All match details have been processed.")
+            except requests.exceptions.RequestException as e:
+                print(f"Error: {e}")
+                if "expired" in str(e).lower():
+                    API_KEY = input("API key expired. Please enter a new API key: ")
+                else:
+                    break
+
+        matches_processed += 1
+        METRICS.record_done(backlog=frontier.pending_matches())
+        if matches_processed % FRONTIER_SAVE_INTERVAL == 0:
+            frontier.save()
+
+    frontier.save()
+    METRICS.close()
+    print(f"All match details have been processed. {players_discovered} new players queued for match history.")
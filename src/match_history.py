@@ -4,6 +4,10 @@ import requests
 import time
 import datetime
 
+from crawl_frontier import CrawlFrontier, load_seed_ranks, seed_frontier
+from crawler_metrics import RIOT_API_BASE, CrawlerMetrics, get_recorded
+
+
 def load_api_key():
     """
     Load the API key from the credentials file.
@@ -12,7 +16,7 @@ def load_api_key():
         data = json.load(f)
     return data.get("riot_api_key")
 
-def fetch_match_ids(api_key, puuid, region, count=10):
+def fetch_match_ids(api_key, puuid, region, count=10, metrics=None):
     """
     Fetch match IDs for a given PUUID, filtering for ranked solo/duo games only.
 
@@ -21,16 +25,17 @@ def fetch_match_ids(api_key, puuid, region, count=10):
     - puuid: str, PUUID of the summoner.
     - region: str, region for match data (e.g., "americas").
     - count: int, number of matches to retrieve.
+    - metrics: CrawlerMetrics, optional; records the request's status.
 
     Returns:
     - match_ids: list of match IDs.
     """
     headers = {"X-Riot-Token": api_key}
-    url = f"https://{region}.api.riotgames.com/lol/match/v5/matches/by-puuid/{puuid}/ids?queue=420&start=0&count={count}"
+    url = RIOT_API_BASE.format(route=region) + f"/lol/match/v5/matches/by-puuid/{puuid}/ids?queue=420&start=0&count={count}"
     # queue=420 ensures only ranked solo/duo matches are fetched
     
     try:
-        response = requests.get(url, headers=headers)
+        response = get_recorded(url, headers, metrics)
         if response.status_code == 403:  # possible expired API key
             raise Exception("API Key might be expired. Please renew your key.")
         response.raise_for_status()
@@ -61,14 +66,28 @@ def load_puuids(puuids_path):
 # usage
 API_KEY = load_api_key()
 PUUIDS_PATH = "../data/raw/puuids/puuids.json"
+SUMMONER_IDS_PATH = "../data/raw/summoner_id/summoner_id.json"
+PLATFORM = "na1"
 REGION = "americas"
 MATCH_OUTPUT_PATH = "../data/raw/match_ids/match_ids.json"
 
-# load PUUIDs from file
+# maximum number of players to crawl per rank / per platform, e.g. {"DIAMOND": 5000}; missing keys are unlimited
+RANK_QUOTAS = {}
+REGION_QUOTAS = {}
+
+# save the frontier every N players instead of after every request
+FRONTIER_SAVE_INTERVAL = 20
+
+# progress, request and sleep metrics for crawler_metrics.py's dashboard
+METRICS = CrawlerMetrics("match_history")
+
+# load PUUIDs from file and queue them behind any players discovered by match_details.py
 puuids = load_puuids(PUUIDS_PATH)
+frontier = CrawlFrontier(rank_quotas=RANK_QUOTAS, region_quotas=REGION_QUOTAS)
+seed_frontier(frontier, puuids, load_seed_ranks(SUMMONER_IDS_PATH, PUUIDS_PATH), PLATFORM)
 
-# fetch match IDs for each PUUID from bottom to top and append to existing JSON
-if puuids:
+# fetch match IDs for each queued player, most recently seen first, and append to existing JSON
+if len(frontier):
     # ensure the output directory exists
     os.makedirs(os.path.dirname(MATCH_OUTPUT_PATH), exist_ok=True)
 
@@ -81,9 +100,15 @@ if puuids:
 
     request_count = 0
     start_time = datetime.datetime.now()
+    players_crawled = 0
+
+    # pop players until the frontier is empty or every rank/region quota is reached
+    while True:
+        entry = frontier.pop_player()
+        if entry is None:
+            break
+        puuid = entry["puuid"]
 
-    # iterate over PUUIDs from bottom to top
-    for puuid in puuids:
         while True:
             try:
                 # check request rate limits
@@ -94,6 +119,7 @@ if puuids:
                 if request_count >= 100 and elapsed_seconds < 120:
                     sleep_time = 120 - elapsed_seconds
                     print(f"Approaching 2-minute rate limit. Waiting for {sleep_time:.2f} seconds...")
+                    METRICS.record_sleep(sleep_time)
                     time.sleep(sleep_time)
                     request_count = 0
                     start_time = datetime.datetime.now()
@@ -101,11 +127,16 @@ if puuids:
                 # if 20 requests made in the last second, wait for the next second
                 if request_count % 20 == 0 and request_count > 0:
                     print("20 requests made in the last second. Pausing for 1 second to avoid limit...")
+                    METRICS.record_sleep(1)
                     time.sleep(1)
 
-                match_ids = fetch_match_ids(API_KEY, puuid, REGION)
+                match_ids = fetch_match_ids(API_KEY, puuid, REGION, metrics=METRICS)
                 existing_match_ids.update(match_ids)
 
+                # queue the new matches for match_details.py, newest first
+                for match_id in match_ids:
+                    frontier.push_match(match_id, entry["rank"])
+
                 # save updated match IDs to JSON file
                 with open(MATCH_OUTPUT_PATH, 'w') as f:
                     json.dump(list(existing_match_ids), f, indent=4)
@@ -120,5 +151,14 @@ if puuids:
                     API_KEY = input("API key expired. Please enter a new API key: ")
                 else:
                     break
+
+        players_crawled += 1
+        METRICS.record_done(backlog=len(frontier))
+        if players_crawled % FRONTIER_SAVE_INTERVAL == 0:
+            frontier.save()
+
+    frontier.save()
+    METRICS.close()
+    print(f"Crawled {players_crawled} players, {frontier.pending_matches()} matches queued for details.")
 else:
-    print("No PUUIDs found in the provided file.")
+    print("No PUUIDs found in the provided file or the crawl frontier.")
@@ -0,0 +1,139 @@
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+STAT_COLUMNS = ["kills", "deaths", "assists", "goldEarned", "totalDamageDealt", "totalDamageTaken", "totalHeal"]
+PROFILE_COLUMNS = ["Boots_id", "Keystone", "SecondarySlot1", "individualPosition"]
+
+# requested pairs whose substitute list is kept; the least recently requested ones are dropped first
+SUBSTITUTE_CACHE_SIZE = 4096
+
+
+def champion_embeddings(df, rune_id_to_tree):
+    """
+    Describe every champion by how it is played: boots, keystone and secondary-tree choices,
+    positions, and average (standardized) stats.
+
+    Parameters:
+    - df: DataFrame, processed historical data.
+    - rune_id_to_tree: dict, rune ID -> rune tree ID, used to turn secondary runes into trees.
+
+    Returns:
+    - tuple of (array of champion IDs, L2-normalized embedding matrix with one row per champion).
+    """
+    profile = df[["championId"] + PROFILE_COLUMNS + STAT_COLUMNS].copy()
+    profile["SecondarySlot1"] = profile["SecondarySlot1"].map(rune_id_to_tree).fillna(-1)
+
+    blocks = []
+    for col in PROFILE_COLUMNS:
+        # share of games with each choice, so popular and niche champions are comparable
+        blocks.append(pd.crosstab(profile["championId"], profile[col], normalize="index").add_prefix(f"{col}_"))
+
+    stats = profile.groupby("championId")[STAT_COLUMNS].mean()
+    blocks.append((stats - stats.mean()) / stats.std(ddof=0).replace(0, 1))
+
+    features = pd.concat(blocks, axis=1).fillna(0.0)
+    matrix = features.to_numpy(dtype=np.float64)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    matrix = matrix / np.where(norms == 0, 1.0, norms)
+    return features.index.to_numpy(), matrix
+
+
+class MatchupIndex:
+    """
+    Precomputed nearest neighbors of every champion, used to substitute the closest
+    data-rich matchup when a (champion, matchup) pair has no games at all.
+
+    Pairs with even a single game are answered from their own data; only pairs with at least
+    min_games games are offered as substitutes.
+    """
+
+    def __init__(self, champion_ids, neighbors, similarities, pair_counts, min_games, cache_size=SUBSTITUTE_CACHE_SIZE):
+        self.neighbors = {
+            int(champion_id): [(int(n), float(sim)) for n, sim in zip(neighbor_row, similarity_row)]
+            for champion_id, neighbor_row, similarity_row in zip(champion_ids, neighbors, similarities)
+        }
+        self.pair_counts = pair_counts
+        self.min_games = min_games
+        self.cache_size = cache_size
+        self.substitute_cache = OrderedDict()
+
+    @classmethod
+    def build(cls, df, rune_id_to_tree, k=10, min_games=5):
+        """
+        Build the index from the processed data.
+
+        Parameters:
+        - df: DataFrame, processed historical data.
+        - rune_id_to_tree: dict, rune ID -> rune tree ID.
+        - k: int, neighbors kept per champion.
+        - min_games: int, games a pair needs to be used as a substitute.
+        """
+        champion_ids, matrix = champion_embeddings(df, rune_id_to_tree)
+        similarity = matrix @ matrix.T
+        np.fill_diagonal(similarity, -np.inf)
+
+        k = min(k, len(champion_ids) - 1)
+        if k <= 0:
+            neighbors = np.empty((len(champion_ids), 0), dtype=np.int64)
+            similarities = np.empty((len(champion_ids), 0))
+        else:
+            top = np.argpartition(-similarity, k - 1, axis=1)[:, :k]
+            top_similarity = np.take_along_axis(similarity, top, axis=1)
+            order = np.argsort(-top_similarity, axis=1)
+            neighbors = champion_ids[np.take_along_axis(top, order, axis=1)]
+            similarities = np.take_along_axis(top_similarity, order, axis=1)
+
+        pair_counts = df.groupby(["championId", "matchupChampion"]).size()
+        pair_counts = {(int(c), int(m)): int(n) for (c, m), n in pair_counts.items()}
+        return cls(champion_ids, neighbors, similarities, pair_counts, min_games)
+
+    def has_data(self, champion_id, matchup_champion_id):
+        return self.pair_counts.get((champion_id, matchup_champion_id), 0) > 0
+
+    def is_data_rich(self, champion_id, matchup_champion_id):
+        return self.pair_counts.get((champion_id, matchup_champion_id), 0) >= self.min_games
+
+    def substitutes(self, champion_id, matchup_champion_id):
+        """
+        List data-rich pairs similar to the requested one, closest first.
+
+        Keeping the player's champion and swapping the opponent is preferred, then keeping the
+        opponent and swapping the champion, then swapping both.
+
+        Returns:
+        - list of (champion ID, matchup champion ID).
+        """
+        key = (champion_id, matchup_champion_id)
+        cached = self.substitute_cache.get(key)
+        if cached is not None:
+            self.substitute_cache.move_to_end(key)
+            return cached
+
+        champion_neighbors = self.neighbors.get(champion_id, [])
+        matchup_neighbors = self.neighbors.get(matchup_champion_id, [])
+
+        candidates = [(1.0 + sim, (champion_id, m)) for m, sim in matchup_neighbors]
+        candidates += [(1.0 + sim, (c, matchup_champion_id)) for c, sim in champion_neighbors]
+        candidates += [(c_sim + m_sim, (c, m)) for c, c_sim in champion_neighbors for m, m_sim in matchup_neighbors]
+        candidates.sort(key=lambda candidate: -candidate[0])
+
+        result = []
+        seen = set()
+        for _, pair in candidates:
+            if pair not in seen and self.is_data_rich(*pair):
+                seen.add(pair)
+                result.append(pair)
+
+        self.substitute_cache[key] = result
+        if len(self.substitute_cache) > self.cache_size:
+            self.substitute_cache.popitem(last=False)
+        return result
+
+    def substitute(self, champion_id, matchup_champion_id):
+        """
+        Get the closest data-rich substitute pair, or None if no neighbor has enough games.
+        """
+        substitutes = self.substitutes(champion_id, matchup_champion_id)
+        return substitutes[0] if substitutes else None
@@ -0,0 +1,330 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import resource
+import threading
+import contextlib
+import subprocess
+import tracemalloc
+
+import numpy as np
+
+REPORT_DIR = "../data/memory_profile/"
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+MATCH_DETAILS_DIR = "../data/raw/match_details"
+DF_PATH = "../data/processed/transformed_data.csv"
+ENTRY_POINTS = ("clean", "train")
+
+TOP_N = 10
+# frames kept per allocation, enough to walk up from pandas/numpy internals to the repo line that called them
+TRACE_FRAMES = 25
+SAMPLE_INTERVAL = 0.01
+# a stage whose peak grows like rows ** slope with slope above this is flagged
+SUPERLINEAR_SLOPE = 1.2
+# ignore stages whose growth stays this small: allocator and page-cache noise dominate the slope there
+MIN_FLAGGED_MB = 32.0
+
+
+def rss_mb():
+    """
+    Current resident set size in MB (Linux), falling back to the peak on other systems.
+    """
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class RssSampler:
+    """
+    Sample RSS on a background thread to catch the peak inside a stage, which the OS only
+    reports for the whole process lifetime.
+    """
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        self.peak = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self.peak = rss_mb()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, rss_mb())
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, rss_mb())
+
+
+class MemoryProfiler:
+    """
+    Record memory at stage boundaries: RSS before, after and at its peak, the Python heap peak
+    (tracemalloc) and the source lines that allocated the most during the stage.
+    """
+
+    def __init__(self, trace=True, top_n=TOP_N):
+        """
+        Parameters:
+        - trace: bool, use tracemalloc for heap peaks and allocation sites; it slows the run
+          down several times, so it can be turned off to only sample RSS.
+        - top_n: int, allocation sites kept per stage.
+        """
+        self.trace = trace
+        self.top_n = top_n
+        self.stages = []
+
+    def __enter__(self):
+        if self.trace:
+            tracemalloc.start(TRACE_FRAMES)
+        return self
+
+    def __exit__(self, *exc):
+        if self.trace:
+            tracemalloc.stop()
+
+    def _top_allocations(self, before, after):
+        """
+        Sum the memory a stage allocated (and still holds) by the innermost line of this repo's
+        code on the allocation's stack, so library internals are charged to the step that called them.
+        Snapshots are compared unfiltered: filtering them costs more than the whole profiled stage.
+        """
+        sites = {}
+        for stat in after.compare_to(before, "traceback"):
+            frames = [frame for frame in reversed(stat.traceback)
+                      if frame.filename.startswith(SRC_DIR) and frame.filename != __file__]
+            frame = frames[0] if frames else stat.traceback[-1]
+            site = f"{os.path.relpath(frame.filename, SRC_DIR) if frames else frame.filename}:{frame.lineno}"
+            size, count = sites.get(site, (0, 0))
+            sites[site] = (size + stat.size_diff, count + stat.count_diff)
+        top = sorted(sites.items(), key=lambda item: item[1][0], reverse=True)[:self.top_n]
+        return [{"site": site, "size_diff_mb": size / 2 ** 20, "count_diff": count} for site, (size, count) in top]
+
+    @contextlib.contextmanager
+    def stage(self, name, rows=None):
+        """
+        Profile the code in the with block as one stage. Set record["rows"] inside the block
+        when the input size is only known there.
+        """
+        record = {"stage": name, "rows": rows}
+        rss_before = rss_mb()
+        if self.trace:
+            before = tracemalloc.take_snapshot()
+            tracemalloc.reset_peak()
+            heap_before = tracemalloc.get_traced_memory()[0]
+
+        start = time.perf_counter()
+        with RssSampler() as sampler:
+            yield record
+        record["seconds"] = time.perf_counter() - start
+        record.update(rss_before_mb=rss_before, rss_after_mb=rss_mb(), rss_peak_mb=sampler.peak)
+
+        if self.trace:
+            heap_after, heap_peak = tracemalloc.get_traced_memory()
+            top = self._top_allocations(before, tracemalloc.take_snapshot())
+            del before
+            record.update(
+                heap_before_mb=heap_before / 2 ** 20,
+                heap_after_mb=heap_after / 2 ** 20,
+                # extra Python memory the stage needed at its worst, on top of what it started with
+                heap_peak_delta_mb=(heap_peak - heap_before) / 2 ** 20,
+                top_allocations=top,
+            )
+        self.stages.append(record)
+        print(f"[memory] {name}: {record['seconds']:.1f}s, RSS {rss_before:.0f} -> {record['rss_after_mb']:.0f} MB "
+              f"(peak {sampler.peak:.0f} MB)" +
+              (f", heap peak +{record['heap_peak_delta_mb']:.0f} MB" if self.trace else ""))
+
+
+def heap_growth(stage):
+    """
+    Python heap a stage needed at its worst on top of what it started with (None when untraced).
+    """
+    return stage.get("heap_peak_delta_mb")
+
+
+def rss_growth(stage):
+    """
+    RSS a stage needed at its worst on top of what it started with. Unlike the heap, this sees
+    native memory (XGBoost's matrices and trees), but also the allocator keeping freed pages.
+    """
+    return stage["rss_peak_mb"] - stage["rss_before_mb"]
+
+
+def growth_slope(points):
+    """
+    Slope of log(memory) against log(rows): 1 is linear, 2 quadratic. None without two usable sizes.
+    """
+    points = [(rows, mb) for rows, mb in points if rows and mb is not None and mb > 0]
+    if len({rows for rows, _ in points}) < 2:
+        return None
+    return float(np.polyfit(np.log([rows for rows, _ in points]), np.log([mb for _, mb in points]), 1)[0])
+
+
+def subset_match_details(input_dir, fraction, output_dir):
+    """
+    Copy the first `fraction` of every match details shard, to profile cleaning at a smaller input size.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    for filename in sorted(os.listdir(input_dir)):
+        if filename.endswith(".json"):
+            with open(os.path.join(input_dir, filename), "r") as f:
+                rows = json.load(f)
+            with open(os.path.join(output_dir, filename), "w") as f:
+                json.dump(rows[:int(len(rows) * fraction)], f)
+
+
+def subset_csv(path, fraction, output_path):
+    """
+    Copy the header and the first `fraction` of the rows of a CSV.
+    """
+    with open(path, "r") as f:
+        total = sum(1 for _ in f) - 1
+    keep = int(total * fraction)
+    with open(path, "r") as src, open(output_path, "w") as dst:
+        for i, line in enumerate(src):
+            if i > keep:
+                break
+            dst.write(line)
+
+
+def profile_entry_point(entry_point, fraction, trace, work_dir, n_estimators=20, max_depth=6, chunksize=50000):
+    """
+    Run one entry point on a fraction of its input under the profiler.
+
+    Returns:
+    - list of dicts, the stage records.
+    """
+    # imported before tracing starts, importing pandas and xgboost under tracemalloc takes minutes
+    import clean_data
+    import train_streaming
+
+    with MemoryProfiler(trace=trace) as profiler:
+        if entry_point == "clean":
+            input_dir = MATCH_DETAILS_DIR
+            if fraction < 1:
+                input_dir = os.path.join(work_dir, "match_details")
+                subset_match_details(MATCH_DETAILS_DIR, fraction, input_dir)
+            cleaned_path = os.path.join(work_dir, "cleaned.csv")
+            clean_data.clean_match_details(input_dir, cleaned_path, profiler=profiler)
+            clean_data.build_processed_dataset(cleaned_path, os.path.join(work_dir, "processed.csv"), profiler=profiler)
+        else:
+            df_path = DF_PATH
+            if fraction < 1:
+                df_path = os.path.join(work_dir, "processed.csv")
+                subset_csv(DF_PATH, fraction, df_path)
+            train_streaming.train_streaming([df_path], os.path.join(work_dir, "models"), chunksize, n_estimators,
+                                            max_depth, profiler=profiler)
+    return profiler.stages
+
+
+def analyze(runs):
+    """
+    Fit how every stage's memory grows with its input, over the profiled input sizes, for both
+    the heap and RSS growth. A stage is flagged when either grows clearly faster than linearly.
+
+    Parameters:
+    - runs: list of (fraction, stage records) pairs.
+
+    Returns:
+    - list of dicts, one per stage, in pipeline order.
+    """
+    summary = []
+    for largest in runs[-1][1]:
+        name = largest["stage"]
+        stages = [stage for _, run in runs for stage in run if stage["stage"] == name]
+        heap_slope = growth_slope([(stage["rows"], heap_growth(stage)) for stage in stages])
+        rss_slope = growth_slope([(stage["rows"], rss_growth(stage)) for stage in stages])
+        flagged = [
+            (slope, growth) for slope, growth in ((heap_slope, heap_growth(largest)), (rss_slope, rss_growth(largest)))
+            if slope is not None and slope > SUPERLINEAR_SLOPE and growth >= MIN_FLAGGED_MB
+        ]
+        summary.append({
+            "stage": name,
+            "rows": largest["rows"],
+            "seconds": largest["seconds"],
+            "heap_growth_mb": heap_growth(largest),
+            "heap_slope": heap_slope,
+            "rss_growth_mb": rss_growth(largest),
+            "rss_slope": rss_slope,
+            "rss_peak_mb": largest["rss_peak_mb"],
+            "superlinear": bool(flagged),
+            "top_allocations": largest.get("top_allocations", [])[:3],
+        })
+    return summary
+
+
+def print_report(summary):
+    def number(value, spec):
+        return "-" if value is None else format(value, spec)
+
+    print(f"{'stage':>28} {'rows':>9} {'seconds':>8} {'+heap MB':>9} {'slope':>6} {'+RSS MB':>8} {'slope':>6} {'RSS peak':>9}")
+    for row in summary:
+        flag = "  SUPERLINEAR" if row["superlinear"] else ""
+        print(f"{row['stage']:>28} {row['rows'] or 0:9d} {row['seconds']:8.1f} {number(row['heap_growth_mb'], '.1f'):>9} "
+              f"{number(row['heap_slope'], '.2f'):>6} {row['rss_growth_mb']:8.1f} {number(row['rss_slope'], '.2f'):>6} "
+              f"{row['rss_peak_mb']:9.0f}{flag}")
+        for site in row["top_allocations"]:
+            print(f"{'':>30}{site['size_diff_mb']:+8.1f} MB  {site['site']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Profile the memory of the cleaning or training entry point, stage by stage.")
+    parser.add_argument("entry_point", choices=ENTRY_POINTS)
+    parser.add_argument("--scales", type=float, nargs="+", default=[0.25, 0.5, 1.0],
+                        help="fractions of the input to profile, to see how each stage grows with input size")
+    parser.add_argument("--no-trace", action="store_true", help="only sample RSS, without tracemalloc's slowdown")
+    parser.add_argument("--n-estimators", type=int, default=20, help="boosting rounds when profiling training")
+    parser.add_argument("--max-depth", type=int, default=6)
+    parser.add_argument("--chunksize", type=int, default=50000)
+    parser.add_argument("--output", default=None, help=f"defaults to {REPORT_DIR}<entry_point>.json")
+    # internal: profile a single input size and write its stage records to the given path
+    parser.add_argument("--run-one", type=float, nargs=1, default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--result", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_one is not None:
+        work_dir = tempfile.mkdtemp(prefix="memory_profile_")
+        try:
+            stages = profile_entry_point(args.entry_point, args.run_one[0], not args.no_trace, work_dir,
+                                         args.n_estimators, args.max_depth, args.chunksize)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+        with open(args.result, "w") as f:
+            json.dump(stages, f)
+        sys.exit(0)
+
+    runs = []
+    for fraction in sorted(args.scales):
+        print(f"Profiling {args.entry_point} on {fraction:.0%} of the input...")
+        # every input size runs in its own process, so its RSS isn't inflated by the sizes before it
+        with tempfile.TemporaryDirectory(prefix="memory_profile_") as result_dir:
+            result_path = os.path.join(result_dir, "stages.json")
+            command = [sys.executable, os.path.abspath(__file__), args.entry_point,
+                       "--run-one", str(fraction), "--result", result_path,
+                       "--n-estimators", str(args.n_estimators), "--max-depth", str(args.max_depth),
+                       "--chunksize", str(args.chunksize)] + (["--no-trace"] if args.no_trace else [])
+            subprocess.run(command, check=True)
+            with open(result_path, "r") as f:
+                runs.append((fraction, json.load(f)))
+
+    summary = analyze(runs)
+    print_report(summary)
+    output = args.output or os.path.join(REPORT_DIR, f"{args.entry_point}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({"entry_point": args.entry_point, "traced": not args.no_trace, "summary": summary,
+                   "runs": [{"fraction": fraction, "stages": stages} for fraction, stages in runs]}, f, indent=4)
+    print(f"Wrote the memory report to {output}")
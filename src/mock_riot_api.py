@@ -0,0 +1,418 @@
+import os
+import json
+import time
+import random
+import asyncio
+import hashlib
+import argparse
+from collections import deque
+
+from aiohttp import web
+
+# every routing value gets its own limits, like the real API: application limits cover every
+# request on the routing value, method limits each endpoint (named as in Riot's developer portal)
+DEFAULT_RATE_LIMITS = [(20, 1), (100, 120)]
+DEFAULT_METHOD_LIMITS = {
+    "summoner-v4.getBySummonerId": [(1600, 60)],
+    "match-v5.getMatchIdsByPUUID": [(2000, 10)],
+    "match-v5.getMatch": [(2000, 10)],
+    "match-v5.getTimeline": [(2000, 10)],
+}
+
+# recorded responses: matches/<match_id>.json and timelines/<match_id>.json, as for bench_timeline_parse.py
+FIXTURES_DIR = "../data/raw/fixtures/"
+
+POSITIONS = ["TOP", "JUNGLE", "MIDDLE", "BOTTOM", "UTILITY"]
+
+# per-frame fields of real timelines, so synthetic payloads have a realistic size and shape
+CHAMPION_STATS = [
+    "abilityHaste", "abilityPower", "armor", "armorPen", "armorPenPercent", "attackDamage", "attackSpeed",
+    "bonusArmorPenPercent", "bonusMagicPenPercent", "ccReduction", "cooldownReduction", "health", "healthMax",
+    "healthRegen", "lifesteal", "magicPen", "magicPenPercent", "magicResist", "movementSpeed", "omnivamp",
+    "physicalVamp", "power", "powerMax", "powerRegen", "spellVamp",
+]
+DAMAGE_STATS = [
+    "magicDamageDone", "magicDamageDoneToChampions", "magicDamageTaken", "physicalDamageDone",
+    "physicalDamageDoneToChampions", "physicalDamageTaken", "totalDamageDone", "totalDamageDoneToChampions",
+    "totalDamageTaken", "trueDamageDone", "trueDamageDoneToChampions", "trueDamageTaken",
+]
+FILLER_EVENTS = ["SKILL_LEVEL_UP", "WARD_PLACED", "WARD_KILL", "LEVEL_UP", "ITEM_DESTROYED", "CHAMPION_KILL", "ITEM_SOLD"]
+
+with open("../data/raw/champion_data/champions.json", "r") as f:
+    champion_data = json.load(f)["data"]
+
+with open("../data/raw/item_data/items.json", "r") as f:
+    item_data = json.load(f)["data"]
+
+with open("../data/raw/runes_data/runes.json", "r") as f:
+    rune_data = json.load(f)
+
+champions = [(int(v["key"]), v["name"]) for v in champion_data.values()]
+item_ids = [int(k) for k, v in item_data.items() if v.get("gold", {}).get("total", 0) > 2100]
+boot_ids = [1001, 3009, 3111, 3158, 3006, 3020]
+
+
+def seeded_random(*parts):
+    """
+    Get a Random seeded from the request identifiers, so the same ID always returns the same document.
+    """
+    seed = hashlib.sha256("|".join(str(p) for p in parts).encode()).hexdigest()
+    return random.Random(int(seed[:16], 16))
+
+
+def synthetic_puuid(rng):
+    return "".join(rng.choice("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789-_") for _ in range(78))
+
+
+def synthetic_perks(rng):
+    primary, secondary = rng.sample(rune_data, 2)
+    primary_selections = [rng.choice(slot["runes"])["id"] for slot in primary["slots"][:4]]
+    secondary_rows = rng.sample(secondary["slots"][1:], 2)
+    secondary_selections = [rng.choice(slot["runes"])["id"] for slot in secondary_rows]
+    return {
+        "styles": [
+            {"description": "primaryStyle", "style": primary["id"],
+             "selections": [{"perk": perk, "var1": 0, "var2": 0, "var3": 0} for perk in primary_selections]},
+            {"description": "subStyle", "style": secondary["id"],
+             "selections": [{"perk": perk, "var1": 0, "var2": 0, "var3": 0} for perk in secondary_selections]},
+        ]
+    }
+
+
+def synthetic_match(match_id):
+    """
+    Build a deterministic match-v5 document with the fields extract_match_details reads.
+    """
+    rng = seeded_random("match", match_id)
+    picks = rng.sample(champions, 10)
+    winning_team = rng.choice([100, 200])
+    game_duration = rng.randint(1200, 2400)
+    game_end = 1_730_000_000_000 + int(match_id.split("_")[1]) % 10_000_000 * 1000
+
+    participants = []
+    for index, (champion_id, champion_name) in enumerate(picks):
+        team_id = 100 if index < 5 else 200
+        items = [rng.choice(boot_ids)] + rng.sample(item_ids, 3) + [0, 0, 3340]
+        participant = {
+            "participantId": index + 1,
+            "puuid": synthetic_puuid(seeded_random("puuid", match_id, index)),
+            "championId": champion_id,
+            "championName": champion_name,
+            "teamId": team_id,
+            "individualPosition": POSITIONS[index % 5],
+            "kills": rng.randint(0, 15),
+            "deaths": rng.randint(0, 12),
+            "assists": rng.randint(0, 20),
+            "win": team_id == winning_team,
+            "goldEarned": rng.randint(7000, 20000),
+            "totalDamageDealtToChampions": rng.randint(5000, 60000),
+            "totalDamageTaken": rng.randint(8000, 60000),
+            "totalHeal": rng.randint(500, 20000),
+            "perks": synthetic_perks(rng),
+        }
+        for slot, item_id in enumerate(items):
+            participant[f"item{slot}"] = item_id
+        participants.append(participant)
+
+    return {
+        "metadata": {"matchId": match_id, "participants": [p["puuid"] for p in participants]},
+        "info": {
+            "gameDuration": game_duration,
+            "gameEndTimestamp": game_end,
+            "gameCreation": game_end - game_duration * 1000,
+            "queueId": 420,
+            "participants": participants,
+        },
+    }
+
+
+def synthetic_timeline(match_id):
+    """
+    Build a timeline with one frame per minute, full participantFrames, filler events and an
+    ITEM_PURCHASED event for every final item.
+    """
+    match = synthetic_match(match_id)
+    rng = seeded_random("timeline", match_id)
+    minutes = match["info"]["gameDuration"] // 60
+    frames = [{"timestamp": minute * 60000, "events": [], "participantFrames": {}} for minute in range(minutes + 1)]
+
+    for participant in match["info"]["participants"]:
+        for slot in range(6):
+            item_id = participant[f"item{slot}"]
+            if not item_id:
+                continue
+            minute = rng.randint(1, minutes)
+            frames[minute]["events"].append({
+                "type": "ITEM_PURCHASED",
+                "participantId": participant["participantId"],
+                "itemId": item_id,
+                "timestamp": minute * 60000 + rng.randint(0, 59999),
+            })
+        for frame in frames:
+            frame["participantFrames"][str(participant["participantId"])] = {
+                "championStats": {stat: rng.randint(0, 5000) for stat in CHAMPION_STATS},
+                "damageStats": {stat: rng.randint(0, 100000) for stat in DAMAGE_STATS},
+                "currentGold": rng.randint(0, 3000), "goldPerSecond": 0, "jungleMinionsKilled": rng.randint(0, 200),
+                "level": rng.randint(1, 18), "minionsKilled": rng.randint(0, 300), "participantId": participant["participantId"],
+                "position": {"x": rng.randint(0, 15000), "y": rng.randint(0, 15000)},
+                "timeEnemySpentControlled": rng.randint(0, 100000), "totalGold": rng.randint(500, 20000),
+                "xp": rng.randint(0, 20000),
+            }
+
+    for minute, frame in enumerate(frames):
+        for _ in range(rng.randint(10, 30)):
+            frame["events"].append({
+                "type": rng.choice(FILLER_EVENTS),
+                "participantId": rng.randint(1, 10),
+                "timestamp": minute * 60000 + rng.randint(0, 59999),
+                "position": {"x": rng.randint(0, 15000), "y": rng.randint(0, 15000)},
+                "skillSlot": rng.randint(1, 4), "levelUpType": "NORMAL",
+                "assistingParticipantIds": rng.sample(range(1, 11), 2),
+            })
+        frame["events"].sort(key=lambda event: event["timestamp"])
+    return {"metadata": {"matchId": match_id}, "info": {"frameInterval": 60000, "frames": frames}}
+
+
+def synthetic_match_ids(route, puuid, count):
+    """
+    Return match IDs for a player; platforms of the route are used as match ID prefixes.
+    """
+    rng = seeded_random("ids", route, puuid)
+    prefix = {"americas": "NA1", "europe": "EUW1", "asia": "KR", "sea": "OC1"}.get(route, route.upper())
+    return [f"{prefix}_{rng.randint(5_100_000_000, 5_200_000_000)}" for _ in range(count)]
+
+
+class RouteLimiter:
+    """
+    Server-side sliding windows for one routing value (application limit) or one endpoint on it (method limit).
+    """
+
+    def __init__(self, limits):
+        self.limits = limits
+        self.windows = [deque() for _ in limits]
+
+    def retry_after(self):
+        """
+        Get the seconds the client must wait before a request fits every window (0 if it fits now).
+        """
+        now = time.monotonic()
+        retry_after = 0.0
+        for (limit, seconds), window in zip(self.limits, self.windows):
+            while window and window[0] <= now - seconds:
+                window.popleft()
+            if len(window) >= limit:
+                retry_after = max(retry_after, window[0] + seconds - now)
+        return retry_after
+
+    def record(self):
+        now = time.monotonic()
+        for window in self.windows:
+            window.append(now)
+
+    def headers(self, prefix):
+        """
+        Describe the windows and their current counts the way Riot does, e.g. X-App-Rate-Limit: "20:1,100:120".
+        """
+        if not self.limits:
+            return {}
+        return {
+            f"X-{prefix}-Rate-Limit": format_limits(self.limits),
+            f"X-{prefix}-Rate-Limit-Count": ",".join(f"{len(window)}:{seconds}"
+                                                     for (_, seconds), window in zip(self.limits, self.windows)),
+        }
+
+
+class Fixtures:
+    """
+    Recorded match and timeline responses: files in the fixtures directory, then the raw response cache.
+    """
+
+    def __init__(self, fixtures_dir=FIXTURES_DIR, cache_dir=None):
+        import raw_cache
+        from region_collector import PLATFORM_TO_REGION
+        self.raw_cache = raw_cache
+        self.fixtures_dir = fixtures_dir
+        self.cache_dir = cache_dir or raw_cache.CACHE_DIR
+
+        self.match_ids = set()
+        matches_dir = os.path.join(fixtures_dir, "matches")
+        if os.path.isdir(matches_dir):
+            self.match_ids.update(name[:-5] for name in os.listdir(matches_dir) if name.endswith(".json"))
+        self.match_ids.update(raw_cache.keys("match", self.cache_dir))
+        self.match_ids = sorted(self.match_ids)
+
+        # regional route -> recorded match IDs of its platforms
+        self.route_ids = {}
+        for match_id in self.match_ids:
+            region = PLATFORM_TO_REGION.get(match_id.split("_", 1)[0].lower())
+            self.route_ids.setdefault(region, []).append(match_id)
+
+    def body(self, kind, match_id):
+        """
+        Get the recorded body of a "match" or "timeline" response as bytes, or None if it was never recorded.
+        """
+        path = os.path.join(self.fixtures_dir, "matches" if kind == "match" else "timelines", f"{match_id}.json")
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                return f.read()
+        stream = self.raw_cache.open_cached(kind, match_id, self.cache_dir)
+        if stream is None:
+            return None
+        with stream:
+            return stream.read()
+
+    def ids_for(self, route, puuid, count):
+        """
+        Pick recorded match IDs of the route's platforms for a player, so a crawl stays inside the recordings.
+        """
+        rng = seeded_random("ids", route, puuid)
+        route_ids = self.route_ids.get(route, [])
+        return rng.sample(route_ids, min(count, len(route_ids)))
+
+
+def create_app(limits=DEFAULT_RATE_LIMITS, method_limits=DEFAULT_METHOD_LIMITS, latency=0.0, jitter=0.0,
+               error_rate=0.0, service_429_rate=0.0, fixtures=None, seed=0):
+    """
+    Build the mock API. Every path is prefixed with its routing value, e.g. /americas/lol/match/v5/...
+
+    Parameters:
+    - limits: list of (requests, seconds), application windows per routing value.
+    - method_limits: dict, endpoint name -> list of (requests, seconds) windows per routing value.
+    - latency: float, mean seconds added to every accepted request.
+    - jitter: float, added latency is drawn uniformly from latency +/- jitter.
+    - error_rate: float, share of accepted requests answered with a 500 or 503.
+    - service_429_rate: float, share of accepted requests answered with a 429 without Retry-After,
+      like Riot's underlying services do when they are overloaded.
+    - fixtures: Fixtures, optional recorded responses served instead of synthetic ones.
+    - seed: int, seed for latency and fault injection.
+
+    GET /_stats returns per route and endpoint counts of what the mock answered.
+    """
+    app_limiters = {}
+    method_limiters = {}
+    stats = {}
+    rng = random.Random(seed)
+
+    @web.middleware
+    async def rate_limit(request, handler):
+        route = request.match_info.get("route")
+        method = request.match_info.route.name
+        if route is None or method is None:
+            return await handler(request)
+
+        counts = stats.setdefault(f"{route} {method}", {"ok": 0, "rate_limited": 0, "service_429": 0, "errors": 0,
+                                                         "first": time.time(), "last": 0.0})
+        counts["last"] = time.time()
+        app_limiter = app_limiters.setdefault(route, RouteLimiter(limits))
+        method_limiter = method_limiters.setdefault((route, method), RouteLimiter(method_limits.get(method, [])))
+
+        app_retry, method_retry = app_limiter.retry_after(), method_limiter.retry_after()
+        if app_retry > 0 or method_retry > 0:
+            counts["rate_limited"] += 1
+            headers = {**app_limiter.headers("App"), **method_limiter.headers("Method"),
+                       "X-Rate-Limit-Type": "application" if app_retry >= method_retry else "method",
+                       "Retry-After": str(max(1, int(max(app_retry, method_retry) + 0.999)))}
+            return web.json_response({"status": {"message": "Rate limit exceeded", "status_code": 429}},
+                                     status=429, headers=headers)
+        app_limiter.record()
+        method_limiter.record()
+        headers = {**app_limiter.headers("App"), **method_limiter.headers("Method")}
+
+        if latency > 0 or jitter > 0:
+            await asyncio.sleep(max(0.0, rng.uniform(latency - jitter, latency + jitter)))
+
+        fault = rng.random()
+        if fault < error_rate:
+            counts["errors"] += 1
+            status = rng.choice([500, 503])
+            return web.json_response({"status": {"message": "Internal server error", "status_code": status}},
+                                     status=status, headers=headers)
+        if fault < error_rate + service_429_rate:
+            counts["service_429"] += 1
+            return web.json_response({"status": {"message": "Rate limit exceeded", "status_code": 429}},
+                                     status=429, headers={**headers, "X-Rate-Limit-Type": "service"})
+
+        counts["ok"] += 1
+        response = await handler(request)
+        response.headers.update(headers)
+        return response
+
+    def recorded_or(kind, match_id, synthetic):
+        body = fixtures.body(kind, match_id) if fixtures is not None else None
+        if body is not None:
+            return web.Response(body=body, content_type="application/json")
+        return web.json_response(synthetic(match_id))
+
+    async def summoner(request):
+        rng = seeded_random("summoner", request.match_info["route"], request.match_info["summoner_id"])
+        return web.json_response({"id": request.match_info["summoner_id"], "puuid": synthetic_puuid(rng)})
+
+    async def match_ids(request):
+        count = min(int(request.query.get("count", 20)), 100)
+        route, puuid = request.match_info["route"], request.match_info["puuid"]
+        if fixtures is not None and fixtures.route_ids.get(route):
+            return web.json_response(fixtures.ids_for(route, puuid, count))
+        return web.json_response(synthetic_match_ids(route, puuid, count))
+
+    async def match(request):
+        return recorded_or("match", request.match_info["match_id"], synthetic_match)
+
+    async def timeline(request):
+        return recorded_or("timeline", request.match_info["match_id"], synthetic_timeline)
+
+    async def stats_handler(request):
+        return web.json_response(stats)
+
+    app = web.Application(middlewares=[rate_limit])
+    app["stats"] = stats
+    app.router.add_get("/_stats", stats_handler)
+    app.router.add_get("/{route}/lol/summoner/v4/summoners/{summoner_id}", summoner, name="summoner-v4.getBySummonerId")
+    app.router.add_get("/{route}/lol/match/v5/matches/by-puuid/{puuid}/ids", match_ids, name="match-v5.getMatchIdsByPUUID")
+    app.router.add_get("/{route}/lol/match/v5/matches/{match_id}/timeline", timeline, name="match-v5.getTimeline")
+    app.router.add_get("/{route}/lol/match/v5/matches/{match_id}", match, name="match-v5.getMatch")
+    return app
+
+
+def parse_limits(text):
+    """
+    Parse "20:1,100:120" into [(20, 1), (100, 120)].
+    """
+    return [tuple(int(part) for part in window.split(":")) for window in text.split(",")]
+
+
+def format_limits(limits):
+    return ",".join(f"{limit}:{seconds}" for limit, seconds in limits)
+
+
+def parse_method_limits(text):
+    """
+    Parse "match-v5.getMatch=2000:10;match-v5.getTimeline=2000:10" into a method limits dict.
+    """
+    method_limits = dict(DEFAULT_METHOD_LIMITS)
+    for part in text.split(";"):
+        method, windows = part.split("=")
+        method_limits[method] = parse_limits(windows)
+    return method_limits
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve synthetic Riot API responses with per-route rate limits.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--limits", type=parse_limits, default=DEFAULT_RATE_LIMITS, help='per-route windows, e.g. "20:1,100:120"')
+    parser.add_argument("--method-limits", type=parse_method_limits, default=DEFAULT_METHOD_LIMITS,
+                        help='per-endpoint windows, e.g. "match-v5.getMatch=2000:10;match-v5.getTimeline=500:10"')
+    parser.add_argument("--latency-ms", type=float, default=0, help="mean latency added to every accepted request")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="added latency varies uniformly by this much")
+    parser.add_argument("--error-rate", type=float, default=0, help="share of requests answered with 500/503")
+    parser.add_argument("--service-429-rate", type=float, default=0, help="share of requests answered with a 429 without Retry-After")
+    parser.add_argument("--fixtures-dir", default=FIXTURES_DIR, help="recorded matches/<id>.json and timelines/<id>.json")
+    parser.add_argument("--synthetic", action="store_true", help="ignore recorded fixtures and the raw response cache")
+    args = parser.parse_args()
+
+    fixtures = None if args.synthetic else Fixtures(args.fixtures_dir)
+    if fixtures is not None:
+        print(f"Serving {len(fixtures.match_ids)} recorded matches, synthetic responses for anything else")
+    app = create_app(args.limits, args.method_limits, args.latency_ms / 1000, args.jitter_ms / 1000,
+                     args.error_rate, args.service_429_rate, fixtures)
+    web.run_app(app, host=args.host, port=args.port)
@@ -0,0 +1,153 @@
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+
+import joblib
+import numpy as np
+
+PARTITIONS_DIR = "../models/partitions"
+MANIFEST_FILE = "manifest.json"
+DEFAULT_CACHE_SIZE = 3
+
+
+def champion_column(pipeline):
+    """
+    Find the column of the preprocessed matrix that carries the raw championId.
+
+    championId is passed through untransformed by the preprocessing ColumnTransformer, so a
+    prediction can be routed from the matrix alone, without changing the callers.
+    """
+    preprocessor = pipeline.named_steps["preprocessor"]
+    remainder = preprocessor.output_indices_["remainder"]
+    remainder_columns = [column if isinstance(column, str) else preprocessor.feature_names_in_[column]
+                         for column in preprocessor.transformers_[-1][2]]
+    return remainder.start + remainder_columns.index("championId")
+
+
+class _TargetClasses:
+    """
+    Stand-in for a fitted per-target estimator: callers only read classes_ to decode probabilities.
+    """
+
+    def __init__(self, n_classes):
+        self.classes_ = np.arange(n_classes)
+
+
+class PartitionedModel:
+    """
+    A set of smaller models, one per champion partition (main position or champion cluster),
+    that predicts like the single MultiOutputClassifier.
+
+    Partitions are loaded on first use into a bounded LRU, so a process only holds the models
+    of the champions it is actually asked about. Predictions are returned in the label space
+    of the global label encoders, so predict_optimal_build and counter_picks work unchanged.
+    """
+
+    def __init__(self, partition_dir, pipeline, label_encoders, target_features, cache_size=DEFAULT_CACHE_SIZE,
+                 manifest=None):
+        """
+        Parameters:
+        - partition_dir: str, directory with manifest.json and one pickle per partition.
+        - pipeline: the fitted preprocessing pipeline shared by all partitions.
+        - label_encoders: dict, the global LabelEncoders of every target.
+        - target_features: list of str, targets in prediction order.
+        - cache_size: int, maximum number of partition models held in memory.
+        - manifest: dict, optional; the manifest already read by the caller, so the partitions
+          loaded later are exactly the ones it names. Read from partition_dir when omitted.
+        """
+        if manifest is None:
+            with open(os.path.join(partition_dir, MANIFEST_FILE), "r") as f:
+                manifest = json.load(f)
+        self.manifest = manifest
+        self.partition_dir = partition_dir
+        self.routing = {int(champion_id): key for champion_id, key in self.manifest["routing"].items()}
+        self.default_partition = self.manifest["default_partition"]
+        self.target_features = target_features
+        self.global_classes = [label_encoders[col].classes_ for col in target_features]
+        self.estimators_ = [_TargetClasses(len(classes)) for classes in self.global_classes]
+        self.champion_column = champion_column(pipeline)
+
+        self.cache_size = max(1, cache_size)
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.load_seconds = 0.0
+
+    def partition_for(self, champion_id):
+        return self.routing.get(int(champion_id), self.default_partition)
+
+    def _partition(self, key):
+        """
+        Get a partition's model, loading it (and evicting the least recently used one) on a miss.
+
+        The pickle is loaded outside the lock, so a miss does not hold up requests for the
+        partitions already in memory.
+        """
+        with self.lock:
+            partition = self.cache.get(key)
+            if partition is not None:
+                self.hits += 1
+                self.cache.move_to_end(key)
+                return partition
+            self.misses += 1
+
+        start = time.perf_counter()
+        partition = joblib.load(os.path.join(self.partition_dir, self.manifest["partitions"][key]["file"]))
+        # positions of the partition's classes in the global label space, per target
+        partition["global_codes"] = [np.searchsorted(global_classes, classes)
+                                     for global_classes, classes in zip(self.global_classes, partition["classes"])]
+        load_seconds = time.perf_counter() - start
+
+        with self.lock:
+            self.load_seconds += load_seconds
+            # another thread may have loaded the same partition meanwhile; keep the first copy
+            partition = self.cache.setdefault(key, partition)
+            self.cache.move_to_end(key)
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+            return partition
+
+    def _groups(self, X):
+        if hasattr(X, "toarray"):
+            X = X.toarray()
+        keys = np.array([self.partition_for(c) for c in X[:, self.champion_column]])
+        for key in np.unique(keys):
+            yield self._partition(str(key)), np.flatnonzero(keys == key), X
+
+    def predict(self, X):
+        """
+        Predict every target, as global label codes, routing each row to its champion's partition.
+        """
+        output = np.zeros((X.shape[0], len(self.target_features)), dtype=np.int64)
+        for partition, rows, X in self._groups(X):
+            for t, (estimator, codes) in enumerate(zip(partition["estimators"], partition["global_codes"])):
+                if estimator is None:  # only one class in this partition
+                    output[rows, t] = codes[0]
+                else:
+                    output[rows, t] = codes[estimator.predict(X[rows])]
+        return output
+
+    def predict_proba(self, X):
+        """
+        Predict class probabilities of every target, with columns in the global label space.
+        """
+        output = [np.zeros((X.shape[0], len(classes))) for classes in self.global_classes]
+        for partition, rows, X in self._groups(X):
+            for t, (estimator, codes) in enumerate(zip(partition["estimators"], partition["global_codes"])):
+                if estimator is None:
+                    output[t][rows, codes[0]] = 1.0
+                else:
+                    output[t][np.ix_(rows, codes)] = estimator.predict_proba(X[rows])
+        return output
+
+    def stats(self):
+        return {
+            "loaded": list(self.cache),
+            "capacity": self.cache_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "load_seconds": self.load_seconds,
+        }
@@ -0,0 +1,315 @@
+import os
+import glob
+import json
+import time
+import hashlib
+import argparse
+import traceback
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+# paths are relative to src/ like the rest of the scripts, code inputs are found next to this file
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+STATE_PATH = "../data/pipeline_state.json"
+HASH_CHUNK_SIZE = 1 << 20
+
+MATCH_DETAILS_GLOB = "../data/raw/match_details/*.json"
+RUNES_PATH = "../data/raw/runes_data/runes.json"
+LOOKUP_PATHS = ["../data/raw/item_data/items.json", RUNES_PATH, "../data/raw/champion_data/champions.json"]
+CLEANED_PATH = "../data/interim/cleaned_match_details.csv"
+DF_PATH = "../data/processed/transformed_data.csv"
+MODEL_DIR = "../models"
+MODEL_PATHS = [os.path.join(MODEL_DIR, name) for name in
+               ("preprocessing_pipeline.pkl", "label_encoders.pkl", "best_recommendation_model.pkl")]
+INDEXES_PATH = os.path.join(MODEL_DIR, "serving_indexes.pkl")
+FAST_PATH_PATH = os.path.join(MODEL_DIR, "fast_path.npz")
+MANIFEST_PATH = os.path.join(MODEL_DIR, "bundle_manifest.json")
+
+
+def code(*names):
+    return [os.path.join(SRC_DIR, name) for name in names]
+
+
+def run_cleaned(params):
+    import clean_data
+    return f"{clean_data.clean_match_details(output_path=CLEANED_PATH)} rows"
+
+
+def run_processed(params):
+    import clean_data
+    return f"{clean_data.build_processed_dataset(CLEANED_PATH, DF_PATH, params['min_game_duration'])} rows"
+
+
+def run_indexes(params):
+    import serving
+    indexes = serving.write_indexes(DF_PATH, MODEL_DIR)
+    return f"{len(indexes['frequency'].tables)} frequency cells"
+
+
+def run_model(params):
+    import train_streaming
+    train_streaming.train_streaming([DF_PATH], MODEL_DIR, params["chunksize"], params["n_estimators"], params["max_depth"])
+    return f"{params['n_estimators']} rounds per target"
+
+
+def run_serving_bundle(params):
+    """
+    Export the fast path, load the new artifacts the way the apps do, run the smoke prediction and
+    record what went into them.
+    """
+    import serving
+    try:
+        serving.write_fast_path(MODEL_DIR)
+    except ValueError as e:
+        # serving falls back to scikit-learn for such a pipeline anyway
+        print(f"Not exporting the fast path: {e}")
+    bundle = serving.read_artifacts(MODEL_DIR, DF_PATH)
+    serving.smoke_test(bundle)
+    with open(MANIFEST_PATH, "w") as f:
+        json.dump({"artifact_version": bundle["version"], "rows": len(bundle["df"]), "built_at": time.time()}, f, indent=4)
+    return f"version {bundle['version']}"
+
+
+# the data -> model -> serving graph: every stage's inputs are files (data and the code that
+# transforms it), so a stage reruns exactly when one of them changed or its outputs are missing
+STAGES = {
+    "raw_shards": {"deps": [], "inputs": [MATCH_DETAILS_GLOB], "outputs": [], "run": None, "params": []},
+    "cleaned": {
+        "deps": ["raw_shards"],
+        "inputs": [MATCH_DETAILS_GLOB] + LOOKUP_PATHS + code("clean_data.py"),
+        "outputs": [CLEANED_PATH], "run": run_cleaned, "params": [],
+    },
+    "processed": {
+        "deps": ["cleaned"],
+        "inputs": [CLEANED_PATH] + code("clean_data.py"),
+        "outputs": [DF_PATH], "run": run_processed, "params": ["min_game_duration"],
+    },
+    "indexes": {
+        "deps": ["processed"],
+        "inputs": [DF_PATH, RUNES_PATH] + code("serving.py", "frequency_engine.py", "matchup_index.py"),
+        "outputs": [INDEXES_PATH], "run": run_indexes, "params": [],
+    },
+    "model": {
+        "deps": ["processed"],
+        "inputs": [DF_PATH] + code("train_streaming.py"),
+        "outputs": MODEL_PATHS, "run": run_model, "params": ["chunksize", "n_estimators", "max_depth"],
+    },
+    "serving_bundle": {
+        "deps": ["indexes", "model"],
+        "inputs": [DF_PATH, INDEXES_PATH] + MODEL_PATHS + LOOKUP_PATHS + code("serving.py", "fast_path.py"),
+        "outputs": [FAST_PATH_PATH, MANIFEST_PATH], "run": run_serving_bundle, "params": [],
+    },
+}
+
+
+def load_state(path=STATE_PATH):
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            return json.load(f)
+    return {"files": {}, "stages": {}}
+
+
+def save_state(state, path=STATE_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = path + ".tmp"
+    with open(temp_path, "w") as f:
+        json.dump(state, f, indent=4)
+    os.replace(temp_path, path)
+
+
+def expand(patterns):
+    paths = []
+    for pattern in patterns:
+        if glob.has_magic(pattern):
+            paths.extend(sorted(glob.glob(pattern)))
+        else:
+            paths.append(pattern)
+    return [os.path.normpath(path) for path in paths]
+
+
+def file_digest(path, file_cache):
+    """
+    SHA-256 of a file's contents, or None if it doesn't exist.
+
+    Digests are cached by size and modification time, so unchanged multi-GB inputs are not
+    reread on every run; touching a file without changing it still hashes to the same digest.
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    cached = file_cache.get(path)
+    if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+        return cached[2]
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    file_cache[path] = [stat.st_size, stat.st_mtime_ns, digest.hexdigest()]
+    return digest.hexdigest()
+
+
+def stage_key(name, params, file_cache):
+    """
+    Hash everything a stage's result depends on: its input files' contents and its parameters.
+
+    Returns:
+    - tuple of (key, list of missing input paths).
+    """
+    stage = STAGES[name]
+    digests = {path: file_digest(path, file_cache) for path in expand(stage["inputs"])}
+    missing = [path for path, digest in digests.items() if digest is None]
+    payload = {"stage": name, "inputs": digests, "params": {p: params[p] for p in stage["params"]}}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest(), missing
+
+
+def is_up_to_date(name, key, state):
+    """
+    A stage is up to date if it last ran with the same key and its outputs are still what it wrote.
+    """
+    record = state["stages"].get(name)
+    if record is None or record["key"] != key:
+        return False
+    return all(file_digest(path, state["files"]) == digest for path, digest in record["outputs"].items())
+
+
+def select_stages(targets):
+    """
+    Get the targets and everything they depend on, in dependency order.
+    """
+    selected = []
+
+    def visit(name):
+        if name not in selected:
+            for dep in STAGES[name]["deps"]:
+                visit(dep)
+            selected.append(name)
+
+    for name in targets:
+        visit(name)
+    return selected
+
+
+def run_stage(name, params):
+    start = time.perf_counter()
+    detail = STAGES[name]["run"](params)
+    return detail, time.perf_counter() - start
+
+
+def run_pipeline(targets=None, params=None, workers=2, force=(), dry_run=False, state_path=STATE_PATH):
+    """
+    Bring the selected stages up to date, running independent stages in parallel.
+
+    A stage is submitted as soon as all its dependencies finished. Its key is computed then, from
+    the inputs as they are after upstream stages ran, so an upstream rebuild that produces
+    identical output doesn't force the downstream stages to rerun.
+
+    Parameters:
+    - targets: list of str, stages to bring up to date (with their dependencies); all stages by default.
+    - params: dict, stage parameters (see STAGES).
+    - workers: int, stages that may run at the same time.
+    - force: collection of str, stages to rerun even if up to date.
+    - dry_run: bool, only report which stages are stale. Stages downstream of a stale one are
+      reported stale too, since their inputs will change.
+
+    Returns:
+    - list of dicts, one per stage: name, status, hash and run seconds, detail.
+    """
+    params = params or {}
+    state = load_state(state_path)
+    selected = select_stages(targets or list(STAGES))
+    results = {}
+    pending = list(selected)
+    running = {}
+
+    def finish(name, status, hash_seconds=0.0, run_seconds=0.0, detail=""):
+        results[name] = {"stage": name, "status": status, "hash_seconds": hash_seconds,
+                         "run_seconds": run_seconds, "detail": detail}
+
+    with ProcessPoolExecutor(max_workers=max(1, workers)) as executor:
+        while pending or running:
+            for name in list(pending):
+                dep_status = [results[dep]["status"] if dep in results else None for dep in STAGES[name]["deps"]]
+                if None in dep_status:
+                    continue
+                pending.remove(name)
+                if any(status in ("failed", "blocked", "missing inputs") for status in dep_status):
+                    finish(name, "blocked", detail="a dependency did not complete")
+                    continue
+
+                hash_start = time.perf_counter()
+                key, missing = stage_key(name, params, state["files"])
+                hash_seconds = time.perf_counter() - hash_start
+                if STAGES[name]["run"] is None:
+                    # source stages only fingerprint data produced outside the pipeline
+                    count = len(expand(STAGES[name]["inputs"]))
+                    finish(name, "missing inputs" if missing or not count else "source", hash_seconds,
+                           detail=f"{count} files")
+                elif dry_run:
+                    stale = (name in force or not is_up_to_date(name, key, state)
+                             or any(status == "stale" for status in dep_status))
+                    finish(name, "stale" if stale else "up to date", hash_seconds,
+                           detail=", ".join(missing) + " missing" if missing else "")
+                elif missing:
+                    finish(name, "missing inputs", hash_seconds, detail=", ".join(missing))
+                elif name not in force and is_up_to_date(name, key, state):
+                    finish(name, "skipped", hash_seconds, detail="inputs unchanged")
+                else:
+                    running[executor.submit(run_stage, name, params)] = (name, key, hash_seconds)
+
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, key, hash_seconds = running.pop(future)
+                try:
+                    detail, run_seconds = future.result()
+                except Exception as e:
+                    traceback.print_exception(type(e), e, e.__traceback__)
+                    finish(name, "failed", hash_seconds, detail=f"{type(e).__name__}: {e}")
+                    continue
+                outputs = {path: file_digest(path, state["files"]) for path in expand(STAGES[name]["outputs"])}
+                state["stages"][name] = {"key": key, "outputs": outputs, "finished_at": time.time()}
+                # saved after every stage, so an interrupted run keeps what already finished
+                save_state(state, state_path)
+                finish(name, "ran", hash_seconds, run_seconds, detail)
+
+    if not dry_run:
+        save_state(state, state_path)
+    return [results[name] for name in selected]
+
+
+def print_summary(results, wall_seconds):
+    print(f"{'stage':>15} {'status':>14} {'hash s':>7} {'run s':>8}  detail")
+    for row in results:
+        print(f"{row['stage']:>15} {row['status']:>14} {row['hash_seconds']:7.2f} {row['run_seconds']:8.2f}  {row['detail']}")
+    stage_seconds = sum(row["hash_seconds"] + row["run_seconds"] for row in results)
+    print(f"Wall time {wall_seconds:.2f}s for {stage_seconds:.2f}s of stage time")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the data -> model -> serving artifacts, skipping stages whose inputs did not change.")
+    parser.add_argument("targets", nargs="*", help=f"stages to bring up to date with their dependencies "
+                                                   f"(default: all of {', '.join(STAGES)})")
+    parser.add_argument("--workers", type=int, default=2, help="stages to run at the same time")
+    parser.add_argument("--force", nargs="*", choices=list(STAGES), default=None,
+                        help="rerun these stages even if up to date (all selected stages if none given)")
+    parser.add_argument("--dry-run", action="store_true", help="only show which stages are stale")
+    parser.add_argument("--state", default=STATE_PATH, help="where stage keys and file digests are kept")
+    parser.add_argument("--min-game-duration", type=int, default=1200)
+    parser.add_argument("--chunksize", type=int, default=50000)
+    parser.add_argument("--n-estimators", type=int, default=100)
+    parser.add_argument("--max-depth", type=int, default=6)
+    args = parser.parse_args()
+    unknown = [name for name in args.targets if name not in STAGES]
+    if unknown:
+        parser.error(f"unknown stage(s) {', '.join(unknown)} (choose from {', '.join(STAGES)})")
+
+    force = args.force if args.force else (list(STAGES) if args.force is not None else [])
+    params = {"min_game_duration": args.min_game_duration, "chunksize": args.chunksize,
+              "n_estimators": args.n_estimators, "max_depth": args.max_depth}
+    start = time.perf_counter()
+    results = run_pipeline(args.targets, params, args.workers, force, args.dry_run, args.state)
+    print_summary(results, time.perf_counter() - start)
+    if any(row["status"] in ("failed", "blocked", "missing inputs") for row in results):
+        raise SystemExit(1)
@@ -6,6 +6,9 @@ import datetime
 import asyncio
 import aiohttp
 
+from crawler_metrics import RIOT_API_BASE, CrawlerMetrics
+
+
 def load_api_key():
     """
     Load the API key from the credentials file.
@@ -16,12 +19,16 @@ def load_api_key():
 
 API_KEY = load_api_key()  # lod API key initially
 
-async def fetch_puuid(session, url, headers, summoner_id):
+async def fetch_puuid(session, url, headers, summoner_id, metrics=None):
     """
     Asynchronously fetch the PUUID for a given summoner ID.
     """
+    status = None
     try:
         async with session.get(url, headers=headers) as response:
+            status = response.status
+            if metrics is not None:
+                metrics.record_request(status)
             print(f"Requesting PUUID for summonerId {summoner_id}, Status: {response.status}")  # Log the response status
             if response.status == 403:  # Forbidden, possible expired API key
                 raise Exception("API Key might be expired. Please renew your key.")
@@ -29,10 +36,12 @@ async def fetch_puuid(session, url, headers, summoner_id):
             summoner_data = await response.json()
             return summoner_data.get("puuid")
     except Exception as e:
+        if metrics is not None and status is None:  # no response at all
+            metrics.record_request(None)
         print(f"Error fetching PUUID for summonerId {summoner_id}: {e}")
         return None
 
-async def fetch_puuids(api_key, summoner_ids_path, region, output_path):
+async def fetch_puuids(api_key, summoner_ids_path, region, output_path, metrics=None):
     """
     Fetch PUUIDs for summoners given their summoner IDs asynchronously.
 
@@ -41,6 +50,7 @@ async def fetch_puuids(api_key, summoner_ids_path, region, output_path):
     - summoner_ids_path: str, path to the JSON file containing summoner IDs.
     - region: str, region for summoner data (e.g., "na1").
     - output_path: str, path to save the output JSON file for PUUIDs.
+    - metrics: CrawlerMetrics, optional; records requests, sleeps and progress.
 
     Returns:
     - puuids: list, list of PUUIDs for all summoners.
@@ -76,9 +86,11 @@ async def fetch_puuids(api_key, summoner_ids_path, region, output_path):
 
     request_count = 0
     start_time = datetime.datetime.now()
+    if metrics is not None:
+        metrics.set_backlog(len(summoner_ids_to_process))
 
     async with aiohttp.ClientSession() as session:
-        for summoner_id in summoner_ids_to_process:
+        for position, summoner_id in enumerate(summoner_ids_to_process):
             current_time = datetime.datetime.now()
             elapsed_seconds = (current_time - start_time).total_seconds()
 
@@ -96,6 +108,8 @@ async def fetch_puuids(api_key, summoner_ids_path, region, output_path):
             if request_count >= 90:
                 sleep_time = 120 - elapsed_seconds
                 print(f"Approaching 2-minute rate limit. Waiting for {sleep_time:.2f} seconds...")
+                if metrics is not None:
+                    metrics.record_sleep(sleep_time)
                 await asyncio.sleep(sleep_time)
                 request_count = 0
                 start_time = datetime.datetime.now()
@@ -106,8 +120,8 @@ async def fetch_puuids(api_key, summoner_ids_path, region, output_path):
                     json.dump(existing_puuids, f, indent=4)
                 print(f"PUUIDs updated and saved to {output_path} after 2-minute rate limit wait.")
 
-            url = f"https://{region}.api.riotgames.com/lol/summoner/v4/summoners/{summoner_id}"
-            puuid = await fetch_puuid(session, url, headers, summoner_id)
+            url = RIOT_API_BASE.format(route=region) + f"/lol/summoner/v4/summoners/{summoner_id}"
+            puuid = await fetch_puuid(session, url, headers, summoner_id, metrics)
             if puuid and puuid not in existing_puuids:
                 existing_puuids[summoner_id] = puuid
                 # save the updated list immediately after adding a new PUUID
@@ -117,9 +131,13 @@ async def fetch_puuids(api_key, summoner_ids_path, region, output_path):
                 print(f"PUUID for summonerId {summoner_id} saved.")
 
             request_count += 1
+            if metrics is not None:
+                metrics.record_done(backlog=len(summoner_ids_to_process) - position - 1)
 
             if request_count % 20 == 0:
                 print("20 requests made in the last second. Pausing for 1 second to avoid limit...")
+                if metrics is not None:
+                    metrics.record_sleep(1)
                 await asyncio.sleep(1)
 
     # ensure the output directory exists
@@ -130,6 +148,8 @@ async def fetch_puuids(api_key, summoner_ids_path, region, output_path):
         json.dump(existing_puuids, f, indent=4)
 
     print(f"PUUIDs updated and saved to {output_path}")
+    if metrics is not None:
+        metrics.close()
     return list(existing_puuids.values())
 
 # usage
@@ -143,5 +163,6 @@ asyncio.run(fetch_puuids(
     api_key=API_KEY, 
     summoner_ids_path=SUMMONER_IDS_PATH, 
     region=REGION, 
-    output_path=OUTPUT_PATH
+    output_path=OUTPUT_PATH,
+    metrics=CrawlerMetrics("puuids")
 ))
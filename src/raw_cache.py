@@ -0,0 +1,193 @@
+import os
+import gzip
+import json
+import asyncio
+import hashlib
+import tempfile
+
+# objects/<2 hex>/<sha256>.json.gz hold the compressed response bodies, deduplicated by content;
+# refs/<endpoint>/<id> hold the digest of the body last returned for that endpoint and id
+CACHE_DIR = "../data/raw/response_cache/"
+CHUNK_SIZE = 64 * 1024
+
+
+def object_path(digest, cache_dir=CACHE_DIR):
+    return os.path.join(cache_dir, "objects", digest[:2], f"{digest}.json.gz")
+
+
+def ref_path(endpoint, key, cache_dir=CACHE_DIR):
+    return os.path.join(cache_dir, "refs", endpoint, key)
+
+
+def resolve(endpoint, key, cache_dir=CACHE_DIR):
+    """
+    Get the digest of the cached response for an endpoint and id, or None if it was never cached.
+    """
+    path = ref_path(endpoint, key, cache_dir)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        return f.read().strip()
+
+
+def has(endpoint, key, cache_dir=CACHE_DIR):
+    return resolve(endpoint, key, cache_dir) is not None
+
+
+def _write_atomically(path, data, mode='w'):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+    with os.fdopen(fd, mode) as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class ObjectWriter:
+    """
+    Hash and compress a response body into a temporary file, then move it to its content address.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR):
+        self.cache_dir = cache_dir
+        objects_dir = os.path.join(cache_dir, "objects")
+        os.makedirs(objects_dir, exist_ok=True)
+        self.digest = hashlib.sha256()
+        fd, self.tmp_path = tempfile.mkstemp(dir=objects_dir, suffix=".tmp")
+        self.raw = os.fdopen(fd, 'wb')
+        self.gzip = gzip.GzipFile(fileobj=self.raw, mode='wb', mtime=0)
+
+    def write(self, chunk):
+        self.digest.update(chunk)
+        self.gzip.write(chunk)
+
+    def commit(self, endpoint, key):
+        """
+        Store the object (an identical body already stored is kept as is) and point the ref at it.
+
+        Returns:
+        - str, the SHA-256 digest of the uncompressed body.
+        """
+        self.gzip.close()
+        self.raw.close()
+        hexdigest = self.digest.hexdigest()
+        path = object_path(hexdigest, self.cache_dir)
+        if os.path.exists(path):
+            os.remove(self.tmp_path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(self.tmp_path, path)
+        _write_atomically(ref_path(endpoint, key, self.cache_dir), hexdigest)
+        return hexdigest
+
+    def abort(self):
+        self.gzip.close()
+        self.raw.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+
+def put_stream(endpoint, key, chunks, cache_dir=CACHE_DIR):
+    """
+    Store a response body from an iterable of byte chunks without holding it in memory.
+
+    Returns:
+    - str, the SHA-256 digest of the uncompressed body.
+    """
+    writer = ObjectWriter(cache_dir)
+    try:
+        for chunk in chunks:
+            writer.write(chunk)
+    except BaseException:
+        writer.abort()
+        raise
+    return writer.commit(endpoint, key)
+
+
+def put(endpoint, key, body, cache_dir=CACHE_DIR):
+    """
+    Store a complete response body (bytes).
+
+    Returns:
+    - str, the SHA-256 digest of the body.
+    """
+    return put_stream(endpoint, key, [body], cache_dir)
+
+
+class CachingReader:
+    """
+    Asynchronous reader over a response body that stores every chunk it reads into the cache,
+    so the body can be parsed while it streams in.
+
+    Compression and file writes run in a worker thread, keeping the event loop free.
+    """
+
+    def __init__(self, stream, writer):
+        self.stream = stream
+        self.writer = writer
+
+    async def read(self, size=-1):
+        chunk = await self.stream.read(size)
+        if chunk:
+            await asyncio.to_thread(self.writer.write, chunk)
+        return chunk
+
+    async def drain(self):
+        # store whatever the parser left unread
+        while await self.read(CHUNK_SIZE):
+            pass
+
+
+async def put_stream_async(endpoint, key, stream, parse=None, cache_dir=CACHE_DIR):
+    """
+    Store an asynchronous response body (e.g. aiohttp's response.content) chunk by chunk.
+
+    Parameters:
+    - parse: async callable, optional; parses the body (from a CachingReader) while it is stored.
+
+    Returns:
+    - the result of parse, or the SHA-256 digest of the uncompressed body when no parser is given.
+    """
+    writer = await asyncio.to_thread(ObjectWriter, cache_dir)
+    reader = CachingReader(stream, writer)
+    try:
+        result = await parse(reader) if parse is not None else None
+        await reader.drain()
+    except BaseException:
+        await asyncio.to_thread(writer.abort)
+        raise
+    digest = await asyncio.to_thread(writer.commit, endpoint, key)
+    return digest if parse is None else result
+
+
+def open_cached(endpoint, key, cache_dir=CACHE_DIR):
+    """
+    Open the cached body of an endpoint and id as a decompressing binary stream.
+
+    Returns:
+    - file object, or None if nothing is cached.
+    """
+    digest = resolve(endpoint, key, cache_dir)
+    if digest is None:
+        return None
+    return gzip.open(object_path(digest, cache_dir), 'rb')
+
+
+def get_json(endpoint, key, cache_dir=CACHE_DIR):
+    """
+    Load a cached JSON response, or None if nothing is cached.
+    """
+    f = open_cached(endpoint, key, cache_dir)
+    if f is None:
+        return None
+    with f:
+        return json.load(f)
+
+
+def keys(endpoint, cache_dir=CACHE_DIR):
+    """
+    List the ids cached for an endpoint.
+    """
+    directory = os.path.join(cache_dir, "refs", endpoint)
+    if not os.path.isdir(directory):
+        return []
+    return sorted(os.listdir(directory))
@@ -0,0 +1,114 @@
+import os
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import raw_cache
+from crawl_frontier import region_from_match_id, match_sequence
+from match_details import extract_match_details, parse_timeline_stream
+from region_collector import PLATFORM_TO_REGION, SHARD_SIZE
+
+OUTPUT_DIR = "../data/raw/match_details_reextracted/"
+
+# every match yields one row per participant
+ROWS_PER_MATCH = 10
+
+
+def cached_match_ids(cache_dir=raw_cache.CACHE_DIR):
+    """
+    List the matches whose match and timeline responses are both cached.
+    """
+    return sorted(set(raw_cache.keys("match", cache_dir)) & set(raw_cache.keys("timeline", cache_dir)))
+
+
+def plan_shards(match_ids, matches_per_shard=SHARD_SIZE // ROWS_PER_MATCH):
+    """
+    Split the cached matches into shards the way region_collector.py writes them: one
+    numbered series per regional route, oldest matches first.
+
+    Returns:
+    - list of (regional route, shard number, list of match IDs).
+    """
+    by_region = {}
+    for match_id in match_ids:
+        region = PLATFORM_TO_REGION.get(region_from_match_id(match_id), "unknown")
+        by_region.setdefault(region, []).append(match_id)
+
+    shards = []
+    for region, region_ids in sorted(by_region.items()):
+        region_ids.sort(key=match_sequence)
+        for start in range(0, len(region_ids), matches_per_shard):
+            shards.append((region, start // matches_per_shard + 1, region_ids[start:start + matches_per_shard]))
+    return shards
+
+
+def extract_shard(region, shard_number, match_ids, output_dir, cache_dir=raw_cache.CACHE_DIR):
+    """
+    Extract one shard from cached responses only and write it to the output directory.
+
+    Returns:
+    - tuple of (shard file name, matches extracted, rows written).
+    """
+    rows = []
+    extracted = 0
+    for match_id in match_ids:
+        match_data = raw_cache.get_json("match", match_id, cache_dir)
+        with raw_cache.open_cached("timeline", match_id, cache_dir) as stream:
+            timeline_data = parse_timeline_stream(stream)
+        try:
+            match_rows = extract_match_details(match_data, timeline_data)
+        except (KeyError, TypeError) as e:
+            print(f"Skipping {match_id}: {e!r}")
+            continue
+        for row in match_rows:
+            row["region"] = region
+        rows.extend(match_rows)
+        extracted += 1
+
+    filename = f"match_details_{region}_{shard_number:02d}.json"
+    with open(os.path.join(output_dir, filename), 'w') as f:
+        json.dump(rows, f, indent=4)
+    return filename, extracted, len(rows)
+
+
+def reextract(output_dir=OUTPUT_DIR, workers=None, cache_dir=raw_cache.CACHE_DIR):
+    """
+    Rebuild every match details shard from the raw response cache, without any API requests.
+
+    Shards are independent, so they are extracted in parallel, one per worker process at a time.
+
+    Parameters:
+    - output_dir: str, directory to write the shards to (kept separate so the current shards stay intact).
+    - workers: int, number of worker processes; defaults to the number of cores.
+    - cache_dir: str, raw response cache to read from.
+    """
+    start = time.perf_counter()
+    shards = plan_shards(cached_match_ids(cache_dir))
+    if not shards:
+        print(f"No cached matches with timelines found in {cache_dir}")
+        return []
+
+    os.makedirs(output_dir, exist_ok=True)
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(extract_shard, region, shard_number, match_ids, output_dir, cache_dir)
+                   for region, shard_number, match_ids in shards]
+        for future in futures:
+            filename, extracted, rows = future.result()
+            results.append((filename, extracted, rows))
+            print(f"Wrote {filename}: {extracted} matches, {rows} rows")
+
+    total_matches = sum(extracted for _, extracted, _ in results)
+    print(f"Re-extracted {total_matches} matches into {len(results)} shard(s) in {time.perf_counter() - start:.1f}s")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the match details shards from cached raw API responses.")
+    parser.add_argument("--output-dir", default=OUTPUT_DIR)
+    parser.add_argument("--cache-dir", default=raw_cache.CACHE_DIR)
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per core)")
+    args = parser.parse_args()
+
+    reextract(args.output_dir, args.workers, args.cache_dir)
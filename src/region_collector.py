@@ -0,0 +1,511 @@
+import os
+import json
+import time
+import asyncio
+import argparse
+from collections import deque
+
+import aiohttp
+
+import raw_cache
+from crawl_frontier import CrawlFrontier, load_seed_ranks, seed_frontier
+from crawler_metrics import RIOT_API_BASE, CrawlerMetrics
+from match_details import extract_match_details, parse_timeline_stream, parse_timeline_stream_async
+
+
+# platform routing values and the regional route that serves their match-v5 data
+PLATFORM_TO_REGION = {
+    "na1": "americas", "br1": "americas", "la1": "americas", "la2": "americas",
+    "euw1": "europe", "eun1": "europe", "tr1": "europe", "ru": "europe", "me1": "europe",
+    "kr": "asia", "jp1": "asia",
+    "oc1": "sea", "ph2": "sea", "sg2": "sea", "th2": "sea", "tw2": "sea", "vn2": "sea",
+}
+
+# development key limits, enforced by Riot separately for every routing value
+DEFAULT_RATE_LIMITS = [(20, 1), (100, 120)]
+
+OUTPUT_DIR = "../data/raw/match_details/"
+FRONTIER_DIR = "../data/raw/crawl_frontier/"
+SUMMONER_IDS_PATH = "../data/raw/summoner_id/summoner_id.json"
+SHARD_SIZE = 10000
+# consecutive requests without any response after which a route is considered down
+MAX_UNREACHABLE = 20
+# times a player or match is popped and fetched before it is given up on
+MAX_ATTEMPTS = 3
+
+
+def load_api_key():
+    """
+    Load the API key from the credentials file.
+    """
+    with open("../config/credentials.json", 'r') as f:
+        data = json.load(f)
+    return data.get("riot_api_key")
+
+
+class RouteRateLimiter:
+    """
+    Sliding-window rate limiter for a single routing value.
+
+    Every window (e.g. 20 requests per second and 100 per two minutes) is tracked separately,
+    and a 429 with Retry-After blocks the whole route until the server lets us back in.
+    """
+
+    def __init__(self, limits=DEFAULT_RATE_LIMITS, metrics=None):
+        self.limits = limits
+        self.windows = [deque() for _ in limits]
+        self.blocked_until = 0.0
+        self.lock = asyncio.Lock()
+        self.sleep_seconds = 0.0
+        self.metrics = metrics
+
+    async def acquire(self):
+        """
+        Wait until a request fits in every window, then record it.
+        """
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                retry_wait = self.blocked_until - now
+                window_wait = 0.0
+                for (limit, seconds), window in zip(self.limits, self.windows):
+                    while window and window[0] <= now - seconds:
+                        window.popleft()
+                    if len(window) >= limit:
+                        window_wait = max(window_wait, window[0] + seconds - now)
+                wait = max(retry_wait, window_wait)
+                if wait <= 0:
+                    break
+                self.sleep_seconds += wait
+                if self.metrics is not None:
+                    self.metrics.record_sleep(wait, "retry_after" if retry_wait >= window_wait else "self_imposed")
+                await asyncio.sleep(wait)
+
+            for window in self.windows:
+                window.append(now)
+
+    def block(self, seconds):
+        """
+        Stop issuing requests on this route for the given number of seconds.
+        """
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+
+class RouteClient:
+    """
+    HTTP client for one routing value, with its own rate-limit state and request statistics.
+    """
+
+    def __init__(self, route, session, api_key, limits=DEFAULT_RATE_LIMITS, base_url=RIOT_API_BASE, max_retries=3,
+                 max_unreachable=MAX_UNREACHABLE):
+        self.route = route
+        self.session = session
+        self.api_key = api_key
+        self.metrics = CrawlerMetrics(f"region_collector_{route}", limits)
+        self.limiter = RouteRateLimiter(limits, self.metrics)
+        self.base_url = base_url.format(route=route)
+        self.max_retries = max_retries
+        self.max_unreachable = max_unreachable
+        self.unreachable = 0
+        self.requests = 0
+        self.rate_limited = 0
+        self.errors = 0
+
+    async def get_json(self, path, stream_parser=None):
+        """
+        GET a JSON document, honouring Retry-After on 429 and retrying server errors.
+
+        Parameters:
+        - path: str, request path below the route's base URL.
+        - stream_parser: async callable, optional; parses the response body incrementally instead of decoding it whole.
+
+        Returns:
+        - the decoded (or stream-parsed) JSON, or None if the resource does not exist or keeps failing.
+
+        Raises:
+        - ConnectionError, once max_unreachable requests in a row failed to get any response.
+        """
+        headers = {"X-Riot-Token": self.api_key}
+        for attempt in range(self.max_retries + 1):
+            await self.limiter.acquire()
+            self.requests += 1
+            try:
+                async with self.session.get(self.base_url + path, headers=headers) as response:
+                    self.unreachable = 0
+                    self.metrics.record_request(response.status)
+                    if response.status == 200:
+                        if stream_parser is not None:
+                            return await stream_parser(response.content)
+                        return await response.json()
+                    if response.status == 403:  # Forbidden, possible expired API key
+                        raise Exception("API Key might be expired. Please renew your key.")
+                    if response.status == 404:
+                        return None
+                    if response.status == 429:
+                        self.rate_limited += 1
+                        self.limiter.block(float(response.headers.get("Retry-After", 1)))
+                        continue
+                    self.errors += 1
+                    if response.status < 500:
+                        print(f"[{self.route}] Unexpected status {response.status} for {path}")
+                        return None
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                # dropped connections and timeouts (also mid-body) are retried like server errors
+                self.metrics.record_request(None)
+                self.errors += 1
+                self.unreachable += 1
+                print(f"[{self.route}] {type(e).__name__} for {path}: {e}")
+                if self.unreachable >= self.max_unreachable:
+                    # stop rather than pop (and drop) the whole frontier while the route is down
+                    raise ConnectionError(f"{self.route} unreachable after {self.unreachable} failed requests") from e
+            self.metrics.record_sleep(2 ** attempt, "backoff")
+            await asyncio.sleep(2 ** attempt)
+        return None
+
+
+class RegionShardWriter:
+    """
+    Append extracted rows to region-tagged shard files of SHARD_SIZE rows each.
+    """
+
+    def __init__(self, region, output_dir=OUTPUT_DIR):
+        self.region = region
+        self.output_dir = output_dir
+        os.makedirs(output_dir, exist_ok=True)
+
+        prefix = f"match_details_{region}_"
+        existing_files = sorted(f for f in os.listdir(output_dir) if f.startswith(prefix) and f.endswith(".json"))
+        if existing_files:
+            self.shard_number = int(existing_files[-1][len(prefix):-5])
+            with open(os.path.join(output_dir, existing_files[-1]), 'r') as f:
+                self.rows = json.load(f)
+        else:
+            self.shard_number = 1
+            self.rows = []
+
+    def shard_path(self):
+        return os.path.join(self.output_dir, f"match_details_{self.region}_{self.shard_number:02d}.json")
+
+    def extend(self, rows):
+        for row in rows:
+            row["region"] = self.region
+        self.rows.extend(rows)
+        if len(self.rows) >= SHARD_SIZE:
+            with open(self.shard_path(), 'w') as f:
+                json.dump(self.rows[:SHARD_SIZE], f, indent=4)
+            self.rows = self.rows[SHARD_SIZE:]
+            self.shard_number += 1
+
+    def save(self):
+        with open(self.shard_path(), 'w') as f:
+            json.dump(self.rows, f, indent=4)
+
+
+async def read_json_async(stream):
+    """
+    Read a whole asynchronous body and decode it as JSON off the event loop.
+    """
+    chunks = []
+    while True:
+        chunk = await stream.read(raw_cache.CHUNK_SIZE)
+        if not chunk:
+            break
+        chunks.append(chunk)
+    return await asyncio.to_thread(json.loads, b"".join(chunks))
+
+
+async def get_cached(client, endpoint, key, path, parse, parse_async):
+    """
+    Read a match-v5 response from the raw response cache, fetching and caching it on a miss.
+
+    A fetched body is parsed while it streams into the cache, so it is never held whole in memory.
+    Decompressing, parsing a cached body and writing the cache run in worker threads, so other
+    requests on the route (and its rate limiter) keep going meanwhile.
+
+    Parameters:
+    - client: RouteClient, client bound to the match's regional route.
+    - endpoint: str, cache namespace ("match" or "timeline").
+    - key: str, match ID.
+    - path: str, request path.
+    - parse: callable, parses a binary stream of a cached body (json.load or parse_timeline_stream).
+    - parse_async: async callable, parses the streamed response body (read_json_async or parse_timeline_stream_async).
+    """
+    def load():
+        stream = raw_cache.open_cached(endpoint, key)
+        if stream is None:
+            return None
+        with stream:
+            return parse(stream)
+
+    cached = await asyncio.to_thread(load)
+    if cached is not None:
+        client.metrics.record_cache_hit()
+        return cached
+
+    async def store(stream):
+        return await raw_cache.put_stream_async(endpoint, key, stream, parse_async)
+
+    return await client.get_json(path, store)
+
+
+async def crawl_region(region, client, frontier, writer, max_matches, concurrency=4, match_count=10):
+    """
+    Snowball-crawl one regional route: players -> match IDs -> match details and timelines.
+
+    Parameters:
+    - region: str, regional routing value (e.g. "europe").
+    - client: RouteClient, client bound to that route.
+    - frontier: CrawlFrontier, the region's own queue of players and matches.
+    - writer: RegionShardWriter, output for extracted rows.
+    - max_matches: int, stop after this many matches have been extracted.
+    - concurrency: int, number of requests kept in flight on this route.
+    - match_count: int, number of match IDs requested per player.
+
+    Returns:
+    - int, number of matches extracted.
+    """
+    processed = 0
+    attempts = {}
+
+    def requeue(kind, entry):
+        (frontier.requeue_player if kind == "player" else frontier.requeue_match)(entry)
+
+    def retry_later(kind, key, entry):
+        # the request already went through the client's own retries, so this is a longer outage
+        # (or a resource that went missing); put the entry back unless it keeps failing
+        attempts[key] = attempts.get(key, 0) + 1
+        if attempts[key] < MAX_ATTEMPTS:
+            requeue(kind, entry)
+        else:
+            print(f"[{region}] Giving up on {kind} {key} after {MAX_ATTEMPTS} attempts")
+
+    async def next_task():
+        # prefer finishing known matches over discovering new ones, so output keeps flowing
+        entry = frontier.pop_match()
+        if entry is not None:
+            return "match", entry
+        entry = frontier.pop_player()
+        if entry is not None:
+            return "player", entry
+        return None, None
+
+    async def worker():
+        nonlocal processed
+        idle_rounds = 0
+        while processed < max_matches:
+            kind, entry = await next_task()
+            if kind is None:
+                # other workers may still be about to queue work
+                idle_rounds += 1
+                if idle_rounds > 10:
+                    return
+                await asyncio.sleep(0.5)
+                continue
+            idle_rounds = 0
+
+            try:
+                if kind == "player":
+                    path = f"/lol/match/v5/matches/by-puuid/{entry['puuid']}/ids?queue=420&start=0&count={match_count}"
+                    match_ids = await client.get_json(path)
+                    match_data = timeline_data = None
+                else:
+                    match_id = entry["match_id"]
+                    match_data = await get_cached(client, "match", match_id, f"/lol/match/v5/matches/{match_id}",
+                                                  json.load, read_json_async)
+                    timeline_data = await get_cached(client, "timeline", match_id,
+                                                     f"/lol/match/v5/matches/{match_id}/timeline",
+                                                     parse_timeline_stream, parse_timeline_stream_async)
+            except BaseException:
+                # stopped mid-fetch (another worker failed, or the route went down): keep the entry
+                # queued for the next run without counting it as an attempt
+                requeue(kind, entry)
+                raise
+
+            if kind == "player":
+                if match_ids is None:
+                    retry_later(kind, entry["puuid"], entry)
+                    continue
+                for match_id in match_ids:
+                    frontier.push_match(match_id, entry["rank"])
+                continue
+
+            if match_data is None or timeline_data is None:
+                retry_later(kind, match_id, entry)
+                continue
+
+            writer.extend(extract_match_details(match_data, timeline_data))
+            frontier.push_match_participants(match_data, entry["rank"])
+            processed += 1
+            client.metrics.record_done(backlog=frontier.pending_matches())
+            if processed % 20 == 0:
+                print(f"[{region}] {processed} matches extracted, {client.requests} requests, "
+                      f"{client.rate_limited} rate limited")
+
+    workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+    try:
+        await asyncio.gather(*workers)
+    finally:
+        # a failing worker (e.g. an expired key) stops the others, and the buffered rows and the
+        # frontier are saved however the crawl ends
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        writer.save()
+        frontier.save()
+    return processed
+
+
+def platform_seed_paths(platform):
+    """
+    Get the summoner ID and PUUID seed files of a platform (na1 keeps the original file names).
+    """
+    if platform == "na1":
+        return SUMMONER_IDS_PATH, "../data/raw/puuids/puuids.json"
+    return f"../data/raw/summoner_id/summoner_id_{platform}.json", f"../data/raw/puuids/puuids_{platform}.json"
+
+
+async def load_platform_seeds(platform, client, seed_limit):
+    """
+    Load the seed PUUIDs of a platform, resolving summoner IDs on the platform route if puuids.py
+    has not been run for it yet.
+
+    Parameters:
+    - platform: str, platform routing value.
+    - client: RouteClient, client bound to the platform route.
+    - seed_limit: int, maximum number of summoner IDs to resolve.
+
+    Returns:
+    - tuple of (list of PUUIDs, dict of PUUID -> rank).
+    """
+    summoner_ids_path, puuids_path = platform_seed_paths(platform)
+    if os.path.exists(puuids_path):
+        with open(puuids_path, 'r') as f:
+            puuids = list(json.load(f).values())
+        return puuids, load_seed_ranks(summoner_ids_path, puuids_path)
+
+    if not os.path.exists(summoner_ids_path):
+        print(f"[{platform}] No seed files found, skipping.")
+        return [], {}
+
+    with open(summoner_ids_path, 'r') as f:
+        summoner_data = json.load(f)
+
+    puuid_ranks = {}
+    for rank, summoner_ids in summoner_data.items():
+        for summoner_id in summoner_ids:
+            if len(puuid_ranks) >= seed_limit:
+                break
+            summoner = await client.get_json(f"/lol/summoner/v4/summoners/{summoner_id}")
+            if summoner and summoner.get("puuid"):
+                puuid_ranks[summoner["puuid"]] = rank
+    return list(puuid_ranks), puuid_ranks
+
+
+async def collect_regions(api_key, platforms, max_matches_per_region, concurrency=4, limits=DEFAULT_RATE_LIMITS,
+                          base_url=RIOT_API_BASE, output_dir=OUTPUT_DIR, seed_puuids=None, seed_limit=200):
+    """
+    Crawl several regional routes concurrently, each with its own rate limiter, frontier and output shards.
+
+    Parameters:
+    - api_key: str, Riot Games API key.
+    - platforms: list of str, platforms whose players seed the crawl (e.g. ["na1", "euw1", "kr"]).
+    - max_matches_per_region: int, matches to extract per regional route.
+    - concurrency: int, requests in flight per route.
+    - limits: list of (requests, seconds) windows enforced per route.
+    - base_url: str, URL template with a {route} placeholder.
+    - output_dir: str, directory for the region-tagged shards.
+    - seed_puuids: dict, optional platform -> list of PUUIDs overriding the seed files.
+    - seed_limit: int, summoner IDs resolved per platform when it has no PUUID file yet.
+
+    Returns:
+    - dict, per-region statistics (matches, requests, 429s, elapsed seconds, requests per second).
+    """
+    regions = {}
+    for platform in platforms:
+        regions.setdefault(PLATFORM_TO_REGION[platform], []).append(platform)
+
+    async with aiohttp.ClientSession() as session:
+        # platform and regional routes are rate limited independently, so each gets its own client
+        platform_clients = {platform: RouteClient(platform, session, api_key, limits, base_url) for platform in platforms}
+        clients = {region: RouteClient(region, session, api_key, limits, base_url) for region in regions}
+
+        async def platform_seeds(platform):
+            if seed_puuids is not None:
+                return platform, (seed_puuids.get(platform, []), {})
+            return platform, await load_platform_seeds(platform, platform_clients[platform], seed_limit)
+
+        seeds = dict(await asyncio.gather(*(platform_seeds(platform) for platform in platforms)))
+
+        frontiers = {}
+        for region, region_platforms in regions.items():
+            frontier = CrawlFrontier(path=os.path.join(FRONTIER_DIR, f"frontier_{region}.json"))
+            for platform in region_platforms:
+                puuids, puuid_ranks = seeds[platform]
+                seed_frontier(frontier, puuids, puuid_ranks, platform)
+            frontiers[region] = frontier
+
+        async def timed_crawl(region):
+            start = time.monotonic()
+            writer = RegionShardWriter(region, output_dir)
+            matches = await crawl_region(region, clients[region], frontiers[region], writer,
+                                         max_matches_per_region, concurrency)
+            elapsed = time.monotonic() - start
+            client = clients[region]
+            return region, {
+                "matches": matches,
+                "requests": client.requests,
+                "rate_limited": client.rate_limited,
+                "errors": client.errors,
+                "sleep_seconds": client.limiter.sleep_seconds,
+                "seconds": elapsed,
+                "requests_per_second": client.requests / elapsed if elapsed else 0.0,
+            }
+
+        # one region failing must not cancel the crawls of the others
+        outcomes = await asyncio.gather(*(timed_crawl(region) for region in regions), return_exceptions=True)
+        results = {}
+        for region, outcome in zip(regions, outcomes):
+            if isinstance(outcome, BaseException):
+                print(f"[{region}] Crawl stopped: {outcome}")
+                continue
+            results[outcome[0]] = outcome[1]
+        for client in list(platform_clients.values()) + list(clients.values()):
+            client.metrics.close()
+
+    total_requests = sum(r["requests"] for r in results.values())
+    total_seconds = max((r["seconds"] for r in results.values()), default=0.0)
+    for region, stats in results.items():
+        print(f"{region:>9}: {stats['matches']} matches, {stats['requests']} requests, "
+              f"{stats['requests_per_second']:.1f} req/s, {stats['rate_limited']} x 429")
+    if total_seconds:
+        print(f"    total: {total_requests} requests, {total_requests / total_seconds:.1f} req/s across {len(results)} routes")
+    return results
+
+
+def parse_limits(text):
+    """
+    Parse "20:1,100:120" into [(20, 1), (100, 120)].
+    """
+    return [tuple(int(part) for part in window.split(":")) for window in text.split(",")]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Crawl match data from several Riot routing regions concurrently.")
+    parser.add_argument("--platforms", nargs="+", default=["na1"], choices=sorted(PLATFORM_TO_REGION))
+    parser.add_argument("--matches", type=int, default=1000, help="matches to extract per regional route")
+    parser.add_argument("--concurrency", type=int, default=4, help="requests in flight per route")
+    parser.add_argument("--limits", type=parse_limits, default=DEFAULT_RATE_LIMITS, help='per-route windows, e.g. "20:1,100:120"')
+    parser.add_argument("--base-url", default=RIOT_API_BASE, help="URL template with a {route} placeholder")
+    parser.add_argument("--api-key", default=None, help="defaults to the key in config/credentials.json")
+    parser.add_argument("--seed-limit", type=int, default=200, help="summoner IDs to resolve per platform without a PUUID file")
+    args = parser.parse_args()
+
+    asyncio.run(collect_regions(
+        api_key=args.api_key or load_api_key(),
+        platforms=args.platforms,
+        max_matches_per_region=args.matches,
+        concurrency=args.concurrency,
+        limits=args.limits,
+        base_url=args.base_url,
+        seed_limit=args.seed_limit,
+    ))
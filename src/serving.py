@@ -0,0 +1,1093 @@
+import os
+import gc
+import json
+import time
+import pickle
+import hashlib
+import asyncio
+import argparse
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from frequency_engine import FrequencyRecommender, POSITION_IDS
+from matchup_index import MatchupIndex
+from model_partitions import PartitionedModel, MANIFEST_FILE, DEFAULT_CACHE_SIZE
+from fast_path import FastPath, FAST_PATH_FILE
+
+# artifact locations, relative to src/ like the rest of the scripts
+DF_PATH = "../data/processed/transformed_data.csv"
+MODEL_DIR = "../models"
+MODEL_FILE = "best_recommendation_model.pkl"
+PIPELINE_FILE = "preprocessing_pipeline.pkl"
+LABEL_ENCODERS_FILE = "label_encoders.pkl"
+# frequency tables and matchup index precomputed by pipeline_dag.py, rebuilt on load when missing or stale
+INDEXES_FILE = "serving_indexes.pkl"
+# bumped whenever the pickled index classes change shape, so older files are rebuilt instead of unpickled into them
+INDEXES_FORMAT = 2
+
+# serve the per-partition models of train_partitioned.py (e.g. "position") instead of the single model,
+# keeping at most MODEL_PARTITION_CACHE of them loaded per process
+MODEL_PARTITIONS = os.environ.get("MODEL_PARTITIONS", "")
+MODEL_PARTITION_CACHE = int(os.environ.get("MODEL_PARTITION_CACHE", DEFAULT_CACHE_SIZE))
+
+# loading champion, item, and rune datasets
+with open("../data/raw/champion_data/champions.json", "r") as f:
+    champion_data = json.load(f)["data"]
+
+with open("../data/raw/item_data/items.json", "r") as f:
+    item_data = json.load(f)["data"]
+
+with open("../data/raw/runes_data/runes.json", "r") as f:
+    rune_data = json.load(f)
+
+champion_name_to_id = {v["name"].lower(): int(v["key"]) for k, v in champion_data.items()}
+champion_id_to_name = {int(v["key"]): v["name"] for k, v in champion_data.items()}
+item_id_to_name = {int(k): v["name"] for k, v in item_data.items()}
+
+rune_id_to_name = {}
+rune_id_to_tree = {}
+rune_id_to_row = {}
+rune_trees = []
+
+for style in rune_data:
+    rune_id_to_name[style["id"]] = style["name"]
+    rune_trees.append(style["id"])
+    for row_idx, slot in enumerate(style["slots"]):
+        for rune in slot["runes"]:
+            rune_id_to_name[rune["id"]] = rune["name"]
+            rune_id_to_tree[rune["id"]] = style["id"]
+            rune_id_to_row[rune["id"]] = row_idx
+
+target_features = [
+    "Boots_id", "Legendary_1_id", "Legendary_2_id",
+    "Keystone", "PrimarySlot1", "PrimarySlot2",
+    "PrimarySlot3", "SecondarySlot1", "SecondarySlot2"
+]
+
+def target_names():
+    """
+    Get the ID to display name lookup of every target feature.
+    """
+    return {col: item_id_to_name if col in ['Boots_id', 'Legendary_1_id', 'Legendary_2_id'] else rune_id_to_name
+            for col in target_features}
+
+
+# the display names baked into an exported fast path, so a changed items.json or runes.json invalidates it
+NAMES_DIGEST = hashlib.sha256(
+    json.dumps([sorted(item_id_to_name.items()), sorted(rune_id_to_name.items())]).encode()).hexdigest()
+
+
+# recommendation backends selectable per request
+ENGINES = ("model", "frequency")
+
+# active artifact bundle, populated by load_artifacts() in the parent before workers are forked
+ARTIFACTS = {}
+
+# pool of forked prediction workers, None when predictions run in-process
+_executor = None
+_num_workers = 0
+
+# serializes reloads so two swaps never race each other
+_reload_lock = None
+
+
+def partition_manifest_path(model_dir=MODEL_DIR):
+    return os.path.join(model_dir, "partitions", MODEL_PARTITIONS, MANIFEST_FILE)
+
+
+def artifact_paths(model_dir=MODEL_DIR, df_path=DF_PATH):
+    model_path = partition_manifest_path(model_dir) if MODEL_PARTITIONS else os.path.join(model_dir, MODEL_FILE)
+    return [df_path, model_path] + [os.path.join(model_dir, name) for name in (PIPELINE_FILE, LABEL_ENCODERS_FILE)]
+
+
+def artifact_signature(model_dir=MODEL_DIR, df_path=DF_PATH):
+    """
+    Compute a short tag from the names, sizes and modification times of the artifacts.
+
+    Hashing metadata instead of contents keeps polling cheap even for multi-GB model pickles. The
+    signature only decides when to reload; the served version is the content digest of read_artifacts.
+    """
+    digest = hashlib.sha256()
+    for path in artifact_paths(model_dir, df_path):
+        stat = os.stat(path)
+        digest.update(f"{os.path.basename(path)}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    return digest.hexdigest()[:12]
+
+
+def file_digest(f, chunk_size=1 << 20):
+    """
+    Hash an open binary file and rewind it, so the caller loads exactly the bytes that were hashed.
+    """
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: f.read(chunk_size), b""):
+        digest.update(chunk)
+    f.seek(0)
+    return digest.hexdigest()
+
+
+def build_indexes(df):
+    """
+    Build the lookup structures served next to the model: the frequency tables and the matchup index.
+    """
+    return {
+        "frequency": FrequencyRecommender(rune_id_to_tree, rune_id_to_row).update(df),
+        "matchup_index": MatchupIndex.build(df, rune_id_to_tree),
+    }
+
+
+def write_indexes(df_path=DF_PATH, model_dir=MODEL_DIR):
+    """
+    Precompute the indexes of a processed dataset so loading the artifacts doesn't rebuild them.
+    """
+    with open(df_path, "rb") as f:
+        df_digest = file_digest(f)
+        indexes = build_indexes(pd.read_csv(f))
+    indexes["df_digest"] = df_digest
+    indexes["format"] = INDEXES_FORMAT
+    os.makedirs(model_dir, exist_ok=True)
+    # plain pickle: joblib's unpickler is pure Python and loads millions of small table objects several times slower
+    with open(os.path.join(model_dir, INDEXES_FILE), "wb") as f:
+        pickle.dump(indexes, f, protocol=pickle.HIGHEST_PROTOCOL)
+    return indexes
+
+
+def read_indexes(df, df_digest, model_dir=MODEL_DIR):
+    """
+    Load the precomputed indexes if they were built from the current dataset by the current code,
+    otherwise build them.
+
+    The dataset is matched by content, which costs far less than parsing it, so a rewrite with
+    identical rows keeps the precomputed indexes.
+    """
+    path = os.path.join(model_dir, INDEXES_FILE)
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            indexes = pickle.load(f)
+        if indexes.get("df_digest") == df_digest and indexes.get("format") == INDEXES_FORMAT:
+            return indexes
+    return build_indexes(df)
+
+
+def fast_path_source(pipeline_digest, label_encoders_digest):
+    """
+    Identify what a fast path is exported from: the pipeline, the label encoders and the display names.
+    """
+    return hashlib.sha256(f"{pipeline_digest};{label_encoders_digest};{NAMES_DIGEST}".encode()).hexdigest()
+
+
+def write_fast_path(model_dir=MODEL_DIR, path=None):
+    """
+    Export the NumPy fast path of the saved pipeline and label encoders so loading the artifacts doesn't rebuild it.
+
+    Raises:
+    - ValueError, if the pipeline holds a step the fast path cannot reproduce exactly.
+    """
+    with open(os.path.join(model_dir, PIPELINE_FILE), "rb") as pipeline_file, \
+            open(os.path.join(model_dir, LABEL_ENCODERS_FILE), "rb") as label_encoders_file:
+        source = fast_path_source(file_digest(pipeline_file), file_digest(label_encoders_file))
+        fast_path = FastPath.from_fitted(joblib.load(pipeline_file), joblib.load(label_encoders_file),
+                                         target_features, target_names())
+    fast_path.arrays["source"] = np.array(source)
+    fast_path.save(path or os.path.join(model_dir, FAST_PATH_FILE))
+    return fast_path
+
+
+def read_fast_path(pipeline, label_encoders, source, model_dir=MODEL_DIR):
+    """
+    Load the exported fast path if it was exported from these artifacts, otherwise build it.
+
+    Raises:
+    - ValueError, if the pipeline holds a step the fast path cannot reproduce exactly.
+    """
+    path = os.path.join(model_dir, FAST_PATH_FILE)
+    if os.path.exists(path):
+        fast_path = FastPath.load(path)
+        if str(fast_path.arrays.get("source")) == source:
+            return fast_path
+    return FastPath.from_fitted(pipeline, label_encoders, target_features, target_names())
+
+
+def read_artifacts(model_dir=MODEL_DIR, df_path=DF_PATH):
+    """
+    Load the historical data, model, pipeline and label encoders without activating them.
+
+    With MODEL_PARTITIONS set, the model is a PartitionedModel that loads the partitions on first use.
+
+    Parameters:
+    - model_dir: str, directory containing the pickled model, pipeline and label encoders.
+    - df_path: str, path to the processed dataset.
+
+    Returns:
+    - dict, the loaded artifact bundle.
+    """
+    signature = artifact_signature(model_dir, df_path)
+    paths = artifact_paths(model_dir, df_path)
+    df_path, model_path, pipeline_path, label_encoders_path = paths
+    # every file is hashed and loaded through the same open handle, so the version names exactly
+    # what was loaded even if the files are replaced meanwhile
+    handles = {path: open(path, "rb") for path in paths}
+    try:
+        digests = {path: file_digest(f) for path, f in handles.items()}
+        df = pd.read_csv(handles[df_path])
+        indexes = read_indexes(df, digests[df_path], model_dir)
+        pipeline = joblib.load(handles[pipeline_path])
+        label_encoders = joblib.load(handles[label_encoders_path])
+        if MODEL_PARTITIONS:
+            # the manifest names every partition file by content, so its digest covers the partitions too
+            model = PartitionedModel(os.path.dirname(model_path), pipeline, label_encoders,
+                                     target_features, MODEL_PARTITION_CACHE, json.load(handles[model_path]))
+        else:
+            model = joblib.load(handles[model_path])
+    finally:
+        for f in handles.values():
+            f.close()
+    version = hashlib.sha256("".join(f"{os.path.basename(path)}:{digests[path]};" for path in paths).encode())
+    try:
+        fast_path = read_fast_path(pipeline, label_encoders,
+                                   fast_path_source(digests[pipeline_path], digests[label_encoders_path]), model_dir)
+    except ValueError as e:
+        print(f"Using the scikit-learn preprocessing: {e}")
+        fast_path = None
+    return {
+        "version": version.hexdigest()[:12],
+        "signature": signature,
+        "model_dir": model_dir,
+        "df_path": df_path,
+        "df": df,
+        "model": model,
+        "pipeline": pipeline,
+        "label_encoders": label_encoders,
+        "fast_path": fast_path,
+        "frequency": indexes["frequency"],
+        "matchup_index": indexes["matchup_index"],
+    }
+
+
+def load_artifacts(model_dir=None, df_path=None):
+    """
+    Load the artifacts and make them the active bundle.
+
+    Without arguments, MODEL_DIR and DF_PATH are read when called, so a harness can point every
+    front end at other artifacts (e.g. synthetic_data.py's) before they load.
+
+    Returns:
+    - dict, the loaded artifact bundle.
+    """
+    global ARTIFACTS
+    ARTIFACTS = read_artifacts(model_dir or MODEL_DIR, df_path or DF_PATH)
+    print(f"Loaded artifacts version {ARTIFACTS['version']}")
+    return ARTIFACTS
+
+
+def position_id_of(position):
+    """
+    Get the position ID of a position name (e.g. "mid"), or None when no position is given.
+    """
+    if position is None:
+        return None
+    position_id = POSITION_IDS.get(position.lower())
+    if position_id is None:
+        raise ValueError(f"Position provided is not valid: {position}")
+    return position_id
+
+
+def predict_optimal_build(champion_name, matchup_champion_name, df, pipeline, model, label_encoders, matchup_index=None,
+                          fast_path=None, position=None):
+    """
+    Predict the optimal item build and runes for the given champion and matchup champion.
+
+    Parameters:
+    - champion_name: str, champion name of the player.
+    - matchup_champion_name: str, champion name of the opponent.
+    - df: DataFrame, original DataFrame with historical data.
+    - pipeline: preprocessing pipeline used for transforming the features.
+    - model: trained MultiOutputClassifier model.
+    - label_encoders: dict, dictionary of LabelEncoders for each target feature.
+    - matchup_index: MatchupIndex, optional; when given, sparse matchups use the historical
+      data of the most similar data-rich matchup instead of raising.
+    - fast_path: FastPath, optional; preprocesses and decodes with NumPy instead of the
+      pipeline and label encoders, with identical results.
+    - position: str, optional position name (e.g. "top"); only games played in that position
+      are averaged. All positions are used when omitted.
+
+    Returns:
+    - DataFrame, containing the predicted items and runes. attrs["substitute"] holds the
+      (champion ID, matchup champion ID) whose data was used, or None.
+    """
+    # Convert champion names to IDs
+    champion_id = champion_name_to_id.get(champion_name.lower())
+    matchup_champion_id = champion_name_to_id.get(matchup_champion_name.lower())
+
+    if champion_id is None or matchup_champion_id is None:
+        raise ValueError(f"Champion name(s) provided are not valid: {champion_name}, {matchup_champion_name}")
+    position_id = position_id_of(position)
+
+    # Fall back to the closest data-rich matchup when this one has no games at all
+    data_champion_id, data_matchup_champion_id = champion_id, matchup_champion_id
+    substitute = None
+    if matchup_index is not None and not matchup_index.has_data(champion_id, matchup_champion_id):
+        substitute = matchup_index.substitute(champion_id, matchup_champion_id)
+        if substitute is not None:
+            data_champion_id, data_matchup_champion_id = substitute
+
+    # Create a new input DataFrame with average values for other features
+    matchup_rows = df[(df['championId'] == data_champion_id) & (df['matchupChampion'] == data_matchup_champion_id)]
+    if position_id is not None:
+        matchup_rows = matchup_rows[matchup_rows['individualPosition'] == position_id]
+    input_data = matchup_rows.mean().to_dict()
+
+    # Check if input_data has NaN values and provide default values if needed
+    if any(pd.isna(value) for value in input_data.values()):
+        raise ValueError(f"No data available for the matchup: {champion_name} vs {matchup_champion_name}"
+                         f"{f' ({position})' if position is not None else ''}")
+
+    # Override champion-specific fields
+    input_data['championId'] = champion_id
+    input_data['matchupChampion'] = matchup_champion_id
+
+    if fast_path is not None:
+        # Preprocess, predict and decode without building DataFrames
+        predicted_output = model.predict(fast_path.transform_records([input_data]))
+        predicted_decoded_df = pd.DataFrame(fast_path.decode(predicted_output))
+    else:
+        # Create a DataFrame for input
+        input_features = df.columns.difference(target_features)
+        input_df = pd.DataFrame([input_data], columns=input_features)
+
+        # Preprocess the input features using the pipeline
+        input_processed = pipeline.transform(input_df)
+
+        # Predict the output
+        predicted_output = model.predict(input_processed)
+
+        # Convert the prediction to a DataFrame for easier handling
+        predicted_encoded_df = pd.DataFrame(predicted_output, columns=target_features)
+
+        # Decode the predictions using the stored LabelEncoders
+        predicted_decoded_df = pd.DataFrame()
+        for col in target_features:
+            predicted_decoded_df[col] = label_encoders[col].inverse_transform(predicted_encoded_df[col])
+
+    # Ensure unique legendary items
+    if predicted_decoded_df['Legendary_1_id'][0] == predicted_decoded_df['Legendary_2_id'][0]:
+        current_item = predicted_decoded_df['Legendary_1_id'][0]
+        # Find the next best performing item from historical data
+        alternative_items = (
+            df[(df['championId'] == data_champion_id) & (df['matchupChampion'] == data_matchup_champion_id)]['Legendary_2_id']
+            .value_counts()
+            .index.tolist()
+        )
+        # Select the first alternative item that is not the current item
+        for alt_item in alternative_items:
+            if alt_item != current_item:
+                predicted_decoded_df["Legendary_2_id"] = alt_item
+                break
+
+    # Validate rune selections - ensure they come from the same tree
+    primary_tree = rune_id_to_tree.get(predicted_decoded_df['Keystone'][0], None)
+    for col in ['PrimarySlot1', 'PrimarySlot2', 'PrimarySlot3']:
+        if rune_id_to_tree.get(predicted_decoded_df[col][0]) != primary_tree:
+            # Replace with the most frequent rune from the primary tree if it doesn't match
+            valid_runes = df[(df['Keystone'] == predicted_decoded_df['Keystone'][0])][col].value_counts().index.tolist()
+            if valid_runes:
+                predicted_decoded_df[col] = valid_runes[0]
+
+    # Replace SecondarySlot1 if it doesn't come from a tree other than the primary tree
+    secondary_tree_options = [t for t in rune_trees if t != primary_tree]
+
+    valid_runes_secondary_1 = df[
+        (df['championId'] == data_champion_id) &
+        (df['matchupChampion'] == data_matchup_champion_id) &
+        (df['SecondarySlot1'].apply(lambda x: rune_id_to_tree.get(x, None)).isin(secondary_tree_options))
+    ]['SecondarySlot1'].value_counts().index.tolist()
+
+    if valid_runes_secondary_1:
+        predicted_decoded_df['SecondarySlot1'] = valid_runes_secondary_1[0]
+    else:
+        # Fallback: Select any rune from a tree not equal to the primary tree
+        all_valid_secondary_1_runes = [
+            r for r, t in rune_id_to_tree.items()
+            if t != primary_tree
+        ]
+        if all_valid_secondary_1_runes:
+            predicted_decoded_df['SecondarySlot1'] = all_valid_secondary_1_runes[0]
+
+    # Ensure SecondarySlot2 is from the same tree as SecondarySlot1, but not from the same row
+    secondary_tree = rune_id_to_tree.get(predicted_decoded_df['SecondarySlot1'][0], None)
+
+    valid_runes_secondary_2 = df[
+        (df['championId'] == data_champion_id) &
+        (df['matchupChampion'] == data_matchup_champion_id) &
+        (df['SecondarySlot1'] == predicted_decoded_df['SecondarySlot1'][0]) &
+        (df['SecondarySlot2'].apply(lambda x: rune_id_to_tree.get(x, None)) == secondary_tree) &
+        (df['SecondarySlot2'].apply(lambda x: rune_id_to_row.get(x, None)) != rune_id_to_row.get(predicted_decoded_df['SecondarySlot1'][0], None))
+    ]['SecondarySlot2'].value_counts().index.tolist()
+
+    if valid_runes_secondary_2:
+        predicted_decoded_df['SecondarySlot2'] = valid_runes_secondary_2[0]
+    else:
+        # If no valid rune exists, choose from the secondary tree but ensure no row conflicts
+        all_valid_secondary_2_runes = [
+            r for r, t in rune_id_to_tree.items()
+            if t == secondary_tree and
+            rune_id_to_row.get(r, None) != rune_id_to_row.get(predicted_decoded_df['SecondarySlot1'][0], None)
+        ]
+        if all_valid_secondary_2_runes:
+            predicted_decoded_df['SecondarySlot2'] = all_valid_secondary_2_runes[0]
+
+    def handle_unknown_boots(boots):
+        if boots == "Unknown Item":
+            return "Plated Steelcaps / Mercury's Treads / Ionian Boots of Lucidity"
+        return boots
+
+    # Convert IDs to item and rune names for user-friendly output
+    if fast_path is not None and fast_path.names:
+        # the repairs above may have swapped in IDs, so names are looked up by ID, not decoded from the prediction
+        for col in target_features:
+            predicted_decoded_df[col] = fast_path.names_of(col, predicted_decoded_df[col])
+        predicted_decoded_df['Boots_id'] = predicted_decoded_df['Boots_id'].apply(handle_unknown_boots)
+    else:
+        for col in ['Boots_id', 'Legendary_1_id', 'Legendary_2_id']:
+            predicted_decoded_df[col] = predicted_decoded_df[col].apply(lambda x: item_id_to_name.get(int(x), "Unknown Item"))
+            if col == 'Boots_id':
+                predicted_decoded_df[col] = predicted_decoded_df[col].apply(handle_unknown_boots)
+
+        for col in ['Keystone', 'PrimarySlot1', 'PrimarySlot2', 'PrimarySlot3', 'SecondarySlot1', 'SecondarySlot2']:
+            predicted_decoded_df[col] = predicted_decoded_df[col].apply(lambda x: rune_id_to_name.get(int(x), "Unknown Rune"))
+
+    predicted_decoded_df.attrs["substitute"] = substitute
+    return predicted_decoded_df
+
+
+def frequency_build(champion_name, matchup_champion_name, recommender, position=None, matchup_index=None):
+    """
+    Look up the historically most-winning legal build for the matchup in the frequency tables.
+
+    Parameters:
+    - champion_name: str, champion name of the player.
+    - matchup_champion_name: str, champion name of the opponent.
+    - recommender: FrequencyRecommender, tables built from the historical data.
+    - position: str, optional position name (e.g. "top"); all positions are used when omitted.
+    - matchup_index: MatchupIndex, optional; used to find a similar matchup when this one has no legal build.
+
+    Returns:
+    - dict, mapping each target feature to its display name, plus the substitute pair used (or None).
+    """
+    champion_id = champion_name_to_id.get(champion_name.lower())
+    matchup_champion_id = champion_name_to_id.get(matchup_champion_name.lower())
+
+    if champion_id is None or matchup_champion_id is None:
+        raise ValueError(f"Champion name(s) provided are not valid: {champion_name}, {matchup_champion_name}")
+
+    position_id = position_id_of(position)
+
+    build = recommender.recommend_ids(champion_id, matchup_champion_id, position_id)
+    substitute = None
+    if build is None and matchup_index is not None:
+        for pair in matchup_index.substitutes(champion_id, matchup_champion_id):
+            build = recommender.recommend_ids(*pair, position_id)
+            if build is not None:
+                substitute = pair
+                break
+    if build is None:
+        raise ValueError(f"No data available for the matchup: {champion_name} vs {matchup_champion_name}")
+
+    result = build_names(build)
+    result["substitute"] = substitute
+    return result
+
+
+def build_names(build):
+    """
+    Convert a build of item and rune IDs to display names.
+
+    Parameters:
+    - build: dict, target feature -> item or rune ID.
+
+    Returns:
+    - dict, target feature -> display name.
+    """
+    result = {}
+    for col in ['Boots_id', 'Legendary_1_id', 'Legendary_2_id']:
+        result[col] = item_id_to_name.get(int(build[col]), "Unknown Item")
+    if result['Boots_id'] == "Unknown Item":
+        result['Boots_id'] = "Plated Steelcaps / Mercury's Treads / Ionian Boots of Lucidity"
+    for col in ['Keystone', 'PrimarySlot1', 'PrimarySlot2', 'PrimarySlot3', 'SecondarySlot1', 'SecondarySlot2']:
+        result[col] = rune_id_to_name.get(int(build[col]), "Unknown Rune")
+    return result
+
+
+def _masked_argmax(probabilities, mask):
+    """
+    Pick the most probable allowed class of every row, falling back to the most probable
+    class for rows where no class is allowed.
+
+    Returns:
+    - tuple of (chosen class indices, their probabilities).
+    """
+    masked = np.where(mask, probabilities, -1.0)
+    choice = np.where(mask.any(axis=1), masked.argmax(axis=1), probabilities.argmax(axis=1))
+    return choice, probabilities[np.arange(len(choice)), choice]
+
+
+def decode_legal_builds(probabilities, class_ids):
+    """
+    Decode a batch of predicted probabilities into legal builds.
+
+    Every target takes its most probable class among the ones compatible with the choices made
+    before it: a second legendary different from the first, a keystone from a keystone row,
+    primary runes from the keystone's tree and their own row, and secondary runes from one
+    other tree and two different non-keystone rows.
+
+    Parameters:
+    - probabilities: dict, target feature -> array (candidates x classes) of predicted probabilities.
+    - class_ids: dict, target feature -> array of the item or rune ID of each class.
+
+    Returns:
+    - tuple of (dict of target feature -> array of chosen IDs, array of mean chosen probability per candidate).
+    """
+    def tree_of(ids):
+        return np.array([rune_id_to_tree.get(int(i), -1) for i in ids])
+
+    def row_of(ids):
+        return np.array([rune_id_to_row.get(int(i), -1) for i in ids])
+
+    chosen = {}
+    confidence = []
+
+    def choose(col, mask=None):
+        if mask is None:
+            mask = np.ones_like(probabilities[col], dtype=bool)
+        index, probability = _masked_argmax(probabilities[col], mask)
+        chosen[col] = class_ids[col][index]
+        confidence.append(probability)
+
+    choose('Boots_id')
+    choose('Legendary_1_id')
+    choose('Legendary_2_id', class_ids['Legendary_2_id'][None, :] != chosen['Legendary_1_id'][:, None])
+
+    choose('Keystone', np.broadcast_to(row_of(class_ids['Keystone']) == 0, probabilities['Keystone'].shape))
+    primary_tree = tree_of(chosen['Keystone'])
+    for row, col in enumerate(['PrimarySlot1', 'PrimarySlot2', 'PrimarySlot3'], start=1):
+        trees, rows = tree_of(class_ids[col]), row_of(class_ids[col])
+        choose(col, (trees[None, :] == primary_tree[:, None]) & (rows[None, :] == row))
+
+    trees, rows = tree_of(class_ids['SecondarySlot1']), row_of(class_ids['SecondarySlot1'])
+    choose('SecondarySlot1', (trees[None, :] != primary_tree[:, None]) & (trees[None, :] != -1) & (rows[None, :] > 0))
+    secondary_tree, secondary_row = tree_of(chosen['SecondarySlot1']), row_of(chosen['SecondarySlot1'])
+    trees, rows = tree_of(class_ids['SecondarySlot2']), row_of(class_ids['SecondarySlot2'])
+    choose('SecondarySlot2', (trees[None, :] == secondary_tree[:, None]) & (rows[None, :] > 0) &
+           (rows[None, :] != secondary_row[:, None]))
+
+    return chosen, np.mean(confidence, axis=0)
+
+
+def counter_picks(opponent_name, df, pipeline, model, label_encoders, position=None, top_n=5,
+                  min_games=3, prior_games=10, confidence_weight=0.25, fast_path=None):
+    """
+    Rank every champion with games against the opponent and recommend a build for the best ones.
+
+    All candidates are built from one grouped pass over the opponent's games and scored in a
+    single batched predict_proba call, instead of one predict_optimal_build call per champion.
+
+    Parameters:
+    - opponent_name: str, champion name of the opponent.
+    - df: DataFrame, original DataFrame with historical data.
+    - pipeline: preprocessing pipeline used for transforming the features.
+    - model: trained MultiOutputClassifier model.
+    - label_encoders: dict, dictionary of LabelEncoders for each target feature.
+    - position: str, optional position name (e.g. "top"); all positions are used when omitted.
+    - top_n: int, number of champions to return.
+    - min_games: int, games a champion needs against the opponent to be considered.
+    - prior_games: int, weight of the opponent's average win rate when smoothing small samples.
+    - confidence_weight: float, share of the score given to model confidence instead of win rate.
+    - fast_path: FastPath, optional; preprocesses and decodes with NumPy, with identical results.
+
+    Returns:
+    - list of dicts, best first, with the champion, games, win rate, confidence, score and build names.
+    """
+    opponent_id = champion_name_to_id.get(opponent_name.lower())
+    if opponent_id is None:
+        raise ValueError(f"Champion name provided is not valid: {opponent_name}")
+
+    history = df[df['matchupChampion'] == opponent_id]
+    position_id = position_id_of(position)
+    if position_id is not None:
+        history = history[history['individualPosition'] == position_id]
+    history = history[(history['championId'] != opponent_id) & history['championId'].isin(champion_id_to_name)]
+
+    # one grouped pass gives every candidate's sample size, wins and average stats
+    input_features = df.columns.difference(target_features)
+    grouped = history.groupby('championId')
+    games = grouped.size()
+    games = games[games >= min_games]
+    if games.empty:
+        raise ValueError(f"No data available for counter picks against {opponent_name}")
+
+    wins = grouped['win'].sum().loc[games.index]
+    candidates = grouped[list(input_features)].mean().loc[games.index]
+    candidates['championId'] = games.index
+    candidates['matchupChampion'] = opponent_id
+    if position_id is not None:
+        candidates['individualPosition'] = position_id
+    else:
+        # each champion's most played position against this opponent
+        positions = history.groupby(['championId', 'individualPosition']).size().reset_index(name='games')
+        positions = positions.sort_values('games', ascending=False).drop_duplicates('championId').set_index('championId')
+        candidates['individualPosition'] = positions['individualPosition'].loc[games.index]
+
+    # small samples are pulled towards the average win rate into this opponent
+    prior = wins.sum() / games.sum()
+    win_rate = ((wins + prior * prior_games) / (games + prior_games)).to_numpy()
+
+    # one batched prediction for the whole champion pool
+    transform = fast_path.transform if fast_path is not None else pipeline.transform
+    input_processed = transform(candidates[input_features])
+    probabilities, class_ids = {}, {}
+    for col, estimator, col_probabilities in zip(target_features, model.estimators_, model.predict_proba(input_processed)):
+        probabilities[col] = col_probabilities
+        if fast_path is not None:
+            class_ids[col] = fast_path.classes[col][estimator.classes_]
+        else:
+            class_ids[col] = label_encoders[col].inverse_transform(estimator.classes_)
+    builds, confidence = decode_legal_builds(probabilities, class_ids)
+
+    score = (1 - confidence_weight) * win_rate + confidence_weight * confidence
+    picks = []
+    for i in np.argsort(-score)[:top_n]:
+        pick = {
+            "champion": champion_id_to_name[int(games.index[i])],
+            "games": int(games.iloc[i]),
+            "win_rate": float(win_rate[i]),
+            "confidence": float(confidence[i]),
+            "score": float(score[i]),
+        }
+        pick.update(build_names({col: builds[col][i] for col in target_features}))
+        picks.append(pick)
+    return picks
+
+
+def recommend_counters(opponent_name, position=None, top_n=5, bundle=None):
+    """
+    Recommend counter picks with the active (or the given) artifact bundle.
+
+    Returns:
+    - dict, with the ranked picks and the artifact version used.
+    """
+    bundle = bundle or ARTIFACTS
+    try:
+        picks = counter_picks(opponent_name, bundle["df"], bundle["pipeline"], bundle["model"],
+                              bundle["label_encoders"], position, top_n, fast_path=bundle.get("fast_path"))
+    except ValueError as e:
+        e.artifact_version = bundle["version"]
+        raise
+    return {"picks": picks, "artifact_version": bundle["version"]}
+
+
+def recommend(champion_name, matchup_champion_name, bundle=None, engine="model", position=None):
+    """
+    Recommend a build with the active (or the given) artifact bundle.
+
+    Runs in the calling process or, when a worker pool is running, inside a worker holding the
+    same version.
+
+    Parameters:
+    - engine: str, "model" for the classifier or "frequency" for the historical count tables.
+    - position: str, optional position name (e.g. "top"); both engines then only use games
+      played in that position.
+
+    Returns:
+    - dict, mapping each target feature to its display name, plus the artifact version and engine used
+      and, when the matchup had too little data, the similar matchup the build is based on.
+    """
+    # grab the bundle once so a swap in the middle of a request cannot mix versions
+    bundle = bundle or ARTIFACTS
+    try:
+        if engine not in ENGINES:
+            raise ValueError(f"Engine provided is not valid: {engine} (choose from {', '.join(ENGINES)})")
+        if engine == "frequency":
+            result = frequency_build(champion_name, matchup_champion_name, bundle["frequency"], position,
+                                     bundle["matchup_index"])
+        else:
+            recommended_build = predict_optimal_build(
+                champion_name, matchup_champion_name,
+                bundle["df"], bundle["pipeline"], bundle["model"], bundle["label_encoders"], bundle["matchup_index"],
+                bundle.get("fast_path"), position
+            )
+            # plain dicts are much cheaper than DataFrames to send back over the worker pipe
+            result = {col: recommended_build[col].values[0] for col in target_features}
+            result["substitute"] = recommended_build.attrs.get("substitute")
+    except ValueError as e:
+        # error replies name the version that answered too; the attribute survives the worker pipe
+        e.artifact_version = bundle["version"]
+        raise
+
+    substitute = result.pop("substitute")
+    result["substitute"] = None
+    if substitute is not None:
+        result["substitute"] = f"{champion_id_to_name.get(substitute[0], substitute[0])} vs " \
+                               f"{champion_id_to_name.get(substitute[1], substitute[1])}"
+    result["artifact_version"] = bundle["version"]
+    result["engine"] = engine
+    return result
+
+
+def _warm_up_worker(_):
+    # submitting a task makes the pool start its workers now rather than on the first real
+    # request; returns the pid (how many distinct processes answered) and the version it serves
+    return os.getpid(), ARTIFACTS["version"]
+
+
+def _init_worker(model_dir, df_path, version):
+    # forkserver/spawn workers start from a fresh interpreter and load their own copy of the artifacts;
+    # files replaced since the parent read them would give the pool another version than the parent
+    load_artifacts(model_dir, df_path)
+    if ARTIFACTS["version"] != version:
+        raise RuntimeError(f"Worker loaded version {ARTIFACTS['version']}, expected {version}")
+
+
+def _fork_workers(num_workers, bundle):
+    """
+    Start a pool serving the given bundle.
+
+    Workers are forked to share the bundle copy-on-write only when this is the main thread and no
+    other thread is running: a fork copies every lock as it is, so one held by another thread (the
+    discord.py heartbeat, an executor thread) would stay locked forever in the child. Otherwise they
+    are started with forkserver (or spawn) and each loads its own copy of the bundle's files.
+    """
+    # the pool forks its workers on the first submit, which callers make from this same thread
+    if threading.current_thread() is threading.main_thread() and threading.active_count() == 1:
+        # unfreeze first so a bundle loaded earlier can be collected, then move everything
+        # allocated so far into the permanent generation so the cyclic GC in the workers never
+        # writes to (and therefore never copies) the parent's pages
+        gc.unfreeze()
+        gc.collect()
+        gc.freeze()
+        executor = ProcessPoolExecutor(max_workers=num_workers, mp_context=multiprocessing.get_context("fork"))
+    else:
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        executor = ProcessPoolExecutor(max_workers=num_workers, mp_context=multiprocessing.get_context(method),
+                                       initializer=_init_worker,
+                                       initargs=(bundle["model_dir"], bundle["df_path"], bundle["version"]))
+    return executor
+
+
+def start_worker_pool(num_workers):
+    """
+    Fork prediction workers that share the already loaded artifacts.
+
+    Parameters:
+    - num_workers: int, number of worker processes to fork.
+
+    Returns:
+    - ProcessPoolExecutor, the running pool.
+    """
+    global _executor, _num_workers
+    if not ARTIFACTS:
+        raise RuntimeError("Artifacts must be loaded before starting the worker pool.")
+
+    _executor = _fork_workers(num_workers, ARTIFACTS)
+    _num_workers = num_workers
+    worker_pids = {pid for pid, _ in _executor.map(_warm_up_worker, range(num_workers * 4))}
+    print(f"Started {num_workers} prediction workers for version {ARTIFACTS['version']} (pids: {sorted(worker_pids)})")
+    return _executor
+
+
+def stop_worker_pool():
+    """
+    Shut down the worker pool, letting in-flight predictions finish.
+    """
+    global _executor, _num_workers
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+        _num_workers = 0
+        gc.unfreeze()
+
+
+def error_version(error):
+    """
+    Get the artifact version a failed request ran on, or the active one if it failed before reaching a bundle.
+    """
+    return getattr(error, "artifact_version", ARTIFACTS.get("version"))
+
+
+def smoke_test(bundle):
+    """
+    Run one prediction on the most played matchup of a bundle to make sure it is usable.
+
+    Raises:
+    - RuntimeError, if the bundle cannot produce a recommendation.
+    """
+    pairs = sample_matchups(bundle["df"], 1)
+    if not pairs:
+        raise RuntimeError(f"Artifacts version {bundle['version']} have no matchups to validate against.")
+    champion, opponent = pairs[0]
+    try:
+        recommend(champion, opponent, bundle=bundle)
+    except Exception as e:
+        raise RuntimeError(f"Smoke prediction failed for version {bundle['version']}: {e}") from e
+
+
+async def reload_artifacts(model_dir=None, df_path=None):
+    """
+    Load new artifacts in the background, validate them and swap them in atomically.
+
+    Requests already running (in-process or queued on the old workers) finish on the old
+    version; the old workers are shut down once they drain. Without arguments, the files the
+    active bundle was loaded from are reloaded.
+
+    Nothing blocking runs on the event loop: the bundle is read and checked on an executor
+    thread, and since threads are running by then, replacement workers are started with
+    forkserver and load the new files in their own processes. The new version is only made
+    active once its workers are up and serve it; if they fail, the old version keeps serving.
+
+    Returns:
+    - str, the version that is active after the reload.
+    """
+    global ARTIFACTS, _executor, _reload_lock
+    model_dir = model_dir or ARTIFACTS.get("model_dir", MODEL_DIR)
+    df_path = df_path or ARTIFACTS.get("df_path", DF_PATH)
+    if _reload_lock is None:
+        _reload_lock = asyncio.Lock()
+
+    async with _reload_lock:
+        loop = asyncio.get_running_loop()
+        signature = artifact_signature(model_dir, df_path)
+        if ARTIFACTS and signature == ARTIFACTS["signature"]:
+            return ARTIFACTS["version"]
+
+        old_version = ARTIFACTS.get("version")
+        bundle = await loop.run_in_executor(None, read_artifacts, model_dir, df_path)
+        if ARTIFACTS and bundle["version"] == old_version:
+            # touched but unchanged files: remember the new signature and keep the running bundle
+            ARTIFACTS["signature"] = bundle["signature"]
+            return old_version
+        await loop.run_in_executor(None, smoke_test, bundle)
+
+        new_executor = None
+        if _num_workers > 0:
+            new_executor = _fork_workers(_num_workers, bundle)
+            try:
+                futures = [loop.run_in_executor(new_executor, _warm_up_worker, i) for i in range(_num_workers * 4)]
+                answers = await asyncio.gather(*futures)
+            except BaseException:
+                new_executor.shutdown(wait=False, cancel_futures=True)
+                raise
+            print(f"Started {_num_workers} prediction workers for version {bundle['version']} "
+                  f"(pids: {sorted({pid for pid, _ in answers})})")
+
+        # in-process requests and the pool switch together
+        old_executor = _executor
+        ARTIFACTS = bundle
+        if new_executor is not None:
+            _executor = new_executor
+        if old_executor is not None:
+            # pending futures are not cancelled, so in-flight requests still complete
+            old_executor.shutdown(wait=False)
+        # the old bundle may sit in the frozen generation; unfreezing is cheap, and lets the
+        # collector free it once the last request using it finishes
+        gc.unfreeze()
+
+        print(f"Swapped artifacts {old_version} -> {bundle['version']}")
+        return bundle["version"]
+
+
+async def watch_artifacts(model_dir=None, df_path=None, interval=60):
+    """
+    Poll the artifact files (by default those of the active bundle) and hot-swap them whenever
+    their version changes.
+
+    A reload that fails to load or to pass the smoke prediction is logged and the
+    current version keeps serving.
+    """
+    model_dir = model_dir or ARTIFACTS.get("model_dir", MODEL_DIR)
+    df_path = df_path or ARTIFACTS.get("df_path", DF_PATH)
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            if artifact_signature(model_dir, df_path) != ARTIFACTS.get("signature"):
+                await reload_artifacts(model_dir, df_path)
+        except Exception as e:
+            print(f"Artifact reload failed, keeping version {ARTIFACTS.get('version')}: {e}")
+
+
+async def recommend_async(champion_name, matchup_champion_name, engine="model", position=None):
+    """
+    Await a recommendation without blocking the event loop when a worker pool is running.
+    """
+    # frequency lookups are a few dict reads, cheaper than the round trip to a worker
+    if _executor is None or engine == "frequency":
+        return recommend(champion_name, matchup_champion_name, engine=engine, position=position)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, recommend, champion_name, matchup_champion_name, None, engine,
+                                      position)
+
+
+def recommend_pooled(champion_name, matchup_champion_name, engine="model", position=None):
+    """
+    Recommend on the worker pool when one is running, blocking until the answer is ready,
+    for synchronous front ends such as the Streamlit app.
+    """
+    if _executor is None or engine == "frequency":
+        return recommend(champion_name, matchup_champion_name, engine=engine, position=position)
+    return _executor.submit(recommend, champion_name, matchup_champion_name, None, engine, position).result()
+
+
+async def recommend_counters_async(opponent_name, position=None, top_n=5):
+    """
+    Await counter picks without blocking the event loop when a worker pool is running.
+    """
+    if _executor is None:
+        return recommend_counters(opponent_name, position, top_n)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, recommend_counters, opponent_name, position, top_n)
+
+
+async def handle_recommend(request):
+    """
+    aiohttp handler for GET /recommend?champion=...&opponent=...[&engine=model|frequency][&position=...]
+    """
+    from aiohttp import web
+
+    champion = request.query.get("champion", "")
+    opponent = request.query.get("opponent", "")
+    engine = request.query.get("engine", "model")
+    position = request.query.get("position") or None
+    if not champion or not opponent:
+        return web.json_response({"error": "Please provide both champion and opponent."}, status=400)
+    if engine not in ENGINES:
+        return web.json_response({"error": f"Engine must be one of: {', '.join(ENGINES)}"}, status=400)
+
+    try:
+        build = await recommend_async(champion, opponent, engine, position)
+    except ValueError as e:
+        return web.json_response({"error": str(e), "artifact_version": error_version(e)}, status=404)
+    version = build.pop("artifact_version")
+    build.pop("engine")
+    substitute = build.pop("substitute")
+    return web.json_response({
+        "champion": champion, "opponent": opponent, "engine": engine, "position": position, "build": build,
+        "substitute": substitute, "artifact_version": version
+    })
+
+
+async def handle_reload(request):
+    """
+    aiohttp handler for POST /admin/reload, authorized by the X-Admin-Token header.
+    """
+    from aiohttp import web
+
+    admin_token = os.environ.get("SERVING_ADMIN_TOKEN")
+    if not admin_token or request.headers.get("X-Admin-Token") != admin_token:
+        return web.json_response({"error": "Forbidden"}, status=403)
+
+    try:
+        version = await reload_artifacts()
+    except Exception as e:
+        return web.json_response({"error": str(e), "artifact_version": ARTIFACTS["version"]}, status=500)
+    return web.json_response({"artifact_version": version})
+
+
+def run_http_server(host="127.0.0.1", port=8080, watch_interval=0):
+    """
+    Serve recommendations over HTTP using the active bundle and worker pool.
+
+    Parameters:
+    - watch_interval: int, seconds between artifact checks; 0 disables watching.
+    """
+    from aiohttp import web
+
+    async def start_watcher(app):
+        app["artifact_watcher"] = asyncio.create_task(watch_artifacts(interval=watch_interval))
+
+    app = web.Application()
+    app.router.add_get("/recommend", handle_recommend)
+    app.router.add_post("/admin/reload", handle_reload)
+    if watch_interval > 0:
+        app.on_startup.append(start_watcher)
+    web.run_app(app, host=host, port=port)
+
+
+def sample_matchups(df, count):
+    """
+    Pick the most played (champion, opponent) pairs as a representative request mix.
+    """
+    pairs = (
+        df[df['matchupChampion'] > 0]
+        .groupby(['championId', 'matchupChampion'])
+        .size()
+        .sort_values(ascending=False)
+        .head(count)
+        .index.tolist()
+    )
+    return [(champion_id_to_name[c], champion_id_to_name[m]) for c, m in pairs
+            if c in champion_id_to_name and m in champion_id_to_name]
+
+
+def benchmark_worker_counts(worker_counts, num_requests=200):
+    """
+    Measure recommendation throughput for each worker count.
+
+    Parameters:
+    - worker_counts: list of int, worker counts to measure (0 runs in-process).
+    - num_requests: int, number of recommendations issued per measurement.
+
+    Returns:
+    - list of dicts with the worker count, elapsed seconds and requests per second.
+    """
+    pairs = sample_matchups(ARTIFACTS["df"], 50)
+    requests_mix = [pairs[i % len(pairs)] for i in range(num_requests)]
+    results = []
+
+    for num_workers in worker_counts:
+        if num_workers > 0:
+            start_worker_pool(num_workers)
+
+        start = time.perf_counter()
+        if _executor is None:
+            for champion, opponent in requests_mix:
+                recommend(champion, opponent)
+        else:
+            futures = [_executor.submit(recommend, c, o) for c, o in requests_mix]
+            for future in futures:
+                future.result()
+        elapsed = time.perf_counter() - start
+
+        stop_worker_pool()
+        results.append({
+            "artifact_version": ARTIFACTS["version"],
+            "workers": num_workers,
+            "seconds": elapsed,
+            "requests_per_second": num_requests / elapsed,
+        })
+        print(f"[{ARTIFACTS['version']}] {num_workers:>3} workers: {num_requests / elapsed:8.1f} req/s "
+              f"({elapsed:.2f}s for {num_requests} requests)")
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve build recommendations from a pre-forked worker pool.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="number of forked prediction workers")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--watch", type=int, default=0, help="seconds between artifact checks for hot-swapping (0 disables)")
+    parser.add_argument("--benchmark", action="store_true", help="measure throughput for 0..--workers workers and exit")
+    parser.add_argument("--requests", type=int, default=200, help="requests per benchmark measurement")
+    args = parser.parse_args()
+
+    load_artifacts()
+
+    if args.benchmark:
+        counts = sorted({0, 1, 2, 4, 8, args.workers} & set(range(args.workers + 1)))
+        benchmark_worker_counts(counts, args.requests)
+    else:
+        if args.workers > 0:
+            start_worker_pool(args.workers)
+        run_http_server(args.host, args.port, args.watch)
@@ -0,0 +1,153 @@
+import os
+import json
+import argparse
+
+import numpy as np
+import pandas as pd
+
+# generated dataset and artifacts live apart from the real ones, so they can never be served by mistake
+SYNTHETIC_DIR = "../data/synthetic/"
+DATASET_FILE = "transformed_data.csv"
+MODEL_SUBDIR = "models"
+
+CHAMPIONS_PATH = "../data/raw/champion_data/champions.json"
+ITEMS_PATH = "../data/raw/item_data/items.json"
+RUNES_PATH = "../data/raw/runes_data/runes.json"
+
+DEFAULT_ROWS = 20000
+RUNE_PAGES = 40
+
+
+def load_choices(champions_path=CHAMPIONS_PATH, items_path=ITEMS_PATH, runes_path=RUNES_PATH):
+    """
+    Get the real champion, boots, legendary item and rune IDs, so names resolve like on real data.
+
+    Returns:
+    - dict with champion_ids, boots_ids, legendary_ids (lists of int) and rune_trees (runes.json).
+    """
+    with open(champions_path, 'r') as f:
+        champion_ids = sorted(int(v["key"]) for v in json.load(f)["data"].values())
+    with open(items_path, 'r') as f:
+        items = json.load(f)["data"]
+    with open(runes_path, 'r') as f:
+        rune_trees = json.load(f)
+
+    on_rift = {k: v for k, v in items.items() if v.get("maps", {}).get("11")}
+    boots_ids = sorted(int(k) for k, v in on_rift.items() if "Boots" in v.get("tags", []))
+    # finished items: nothing builds out of them and they cost a full legendary's price
+    legendary_ids = sorted(int(k) for k, v in on_rift.items()
+                           if not v.get("into") and v.get("gold", {}).get("total", 0) >= 2500)
+    return {"champion_ids": champion_ids, "boots_ids": boots_ids, "legendary_ids": legendary_ids,
+            "rune_trees": rune_trees}
+
+
+def legal_rune_page(rng, rune_trees):
+    """
+    Draw a rune page the client accepts: a keystone and one rune per row of the primary tree,
+    then two runes from different non-keystone rows of another tree.
+    """
+    primary, secondary = rng.choice(len(rune_trees), 2, replace=False)
+    primary_slots, secondary_slots = rune_trees[primary]["slots"], rune_trees[secondary]["slots"]
+    page = [rng.choice([rune["id"] for rune in primary_slots[row]["runes"]]) for row in range(4)]
+    for row in sorted(rng.choice([1, 2, 3], 2, replace=False)):
+        page.append(rng.choice([rune["id"] for rune in secondary_slots[row]["runes"]]))
+    return [int(rune) for rune in page]
+
+
+def make_processed_dataset(rows=DEFAULT_ROWS, seed=0, choices=None):
+    """
+    Generate a processed dataset with the columns train_streaming.py and serving.py read.
+
+    Every champion keeps one position, win rates lean slightly per matchup and builds are drawn
+    from a fixed set of legal rune pages, so every lookup path has data; the builds themselves
+    carry no signal.
+
+    Parameters:
+    - rows: int, number of games (rows) to generate.
+    - seed: int, random seed; the same seed gives the same dataset.
+    - choices: dict, optional, output of load_choices().
+
+    Returns:
+    - DataFrame, one row per champion per game.
+    """
+    choices = choices or load_choices()
+    rng = np.random.default_rng(seed)
+    champion_ids = np.array(choices["champion_ids"])
+    champion_position = dict(zip(champion_ids.tolist(), rng.integers(0, 5, len(champion_ids)).tolist()))
+
+    champions = rng.choice(champion_ids, rows)
+    opponents = rng.choice(champion_ids, rows)
+    df = pd.DataFrame({
+        "championId": champions,
+        "matchupChampion": opponents,
+        "individualPosition": [champion_position[c] for c in champions.tolist()],
+        "kills": rng.poisson(5, rows),
+        "deaths": rng.poisson(5, rows),
+        "assists": rng.poisson(7, rows),
+        "goldEarned": rng.normal(11000, 2000, rows).astype(int),
+        "totalDamageDealt": rng.normal(20000, 5000, rows).astype(int),
+        "totalDamageTaken": rng.normal(20000, 5000, rows).astype(int),
+        "totalHeal": rng.normal(5000, 2000, rows).astype(int),
+    })
+    df["win"] = (rng.random(rows) < 0.5 + ((champions * 7 + opponents * 3) % 11 - 5) / 100).astype(int)
+    df["Boots_id"] = rng.choice(choices["boots_ids"], rows)
+    legendaries = np.array([rng.choice(choices["legendary_ids"], 2, replace=False) for _ in range(rows)])
+    df["Legendary_1_id"], df["Legendary_2_id"] = legendaries[:, 0], legendaries[:, 1]
+
+    pages = np.array([legal_rune_page(rng, choices["rune_trees"]) for _ in range(RUNE_PAGES)])
+    page_rows = pages[rng.integers(0, RUNE_PAGES, rows)]
+    for i, col in enumerate(["Keystone", "PrimarySlot1", "PrimarySlot2", "PrimarySlot3", "SecondarySlot1",
+                             "SecondarySlot2"]):
+        df[col] = page_rows[:, i]
+    return df
+
+
+def synthetic_paths(output_dir=SYNTHETIC_DIR):
+    """
+    Get the dataset path and model directory of a synthetic artifact set.
+    """
+    return os.path.join(output_dir, DATASET_FILE), os.path.join(output_dir, MODEL_SUBDIR)
+
+
+def write_synthetic_artifacts(output_dir=SYNTHETIC_DIR, rows=DEFAULT_ROWS, seed=0, n_estimators=20, max_depth=4):
+    """
+    Write a synthetic processed dataset and train small artifacts on it with train_streaming.py.
+
+    Returns:
+    - tuple of (dataset path, model directory).
+    """
+    from train_streaming import train_streaming
+
+    df_path, model_dir = synthetic_paths(output_dir)
+    os.makedirs(output_dir, exist_ok=True)
+    make_processed_dataset(rows, seed).to_csv(df_path, index=False)
+    train_streaming([df_path], output_dir=model_dir, n_estimators=n_estimators, max_depth=max_depth)
+    return df_path, model_dir
+
+
+def ensure_synthetic_artifacts(output_dir=SYNTHETIC_DIR, **kwargs):
+    """
+    Reuse the synthetic artifacts of an earlier run, generating them only when missing.
+
+    Returns:
+    - tuple of (dataset path, model directory).
+    """
+    df_path, model_dir = synthetic_paths(output_dir)
+    if os.path.exists(df_path) and os.path.exists(os.path.join(model_dir, "best_recommendation_model.pkl")):
+        return df_path, model_dir
+    print(f"Generating synthetic data and models in {output_dir}...")
+    return write_synthetic_artifacts(output_dir, **kwargs)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic processed dataset and small model artifacts.")
+    parser.add_argument("--output-dir", default=SYNTHETIC_DIR)
+    parser.add_argument("--rows", type=int, default=DEFAULT_ROWS)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--n-estimators", type=int, default=20, help="boosting rounds per target")
+    parser.add_argument("--max-depth", type=int, default=4)
+    args = parser.parse_args()
+
+    df_path, model_dir = write_synthetic_artifacts(args.output_dir, args.rows, args.seed, args.n_estimators,
+                                                   args.max_depth)
+    print(f"Wrote {args.rows} rows to {df_path} and the artifacts to {model_dir}")
@@ -0,0 +1,323 @@
+import os
+import json
+import time
+import shutil
+import argparse
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import numpy as np
+import pandas as pd
+from xgboost import XGBClassifier
+from sklearn.cluster import KMeans
+
+from matchup_index import champion_embeddings
+from model_partitions import PartitionedModel, PARTITIONS_DIR, MANIFEST_FILE
+from serving import file_digest, rune_id_to_tree
+from train_streaming import fit_streaming_preprocessing, target_features, train_streaming
+
+DF_PATH = "../data/processed/transformed_data.csv"
+MODEL_DIR = "../models"
+PARTITION_SCHEMES = ("position", "cluster")
+POSITION_NAMES = {0: "top", 1: "jungle", 2: "middle", 3: "bottom", 4: "utility"}
+
+
+def partition_routing(df, scheme, n_clusters=8, seed=42):
+    """
+    Assign every champion to a partition.
+
+    - position: the champion's most played position, so e.g. all mainly-top champions share a model.
+    - cluster: k-means over the champion embeddings of matchup_index.py (how a champion is built
+      and played), so champions with similar builds share a model.
+
+    Returns:
+    - dict, championId -> partition key.
+    """
+    if scheme == "position":
+        counts = df.groupby(["championId", "individualPosition"]).size().reset_index(name="games")
+        main = counts.sort_values("games", ascending=False).drop_duplicates("championId")
+        return {int(c): POSITION_NAMES.get(int(p), f"position_{int(p)}")
+                for c, p in zip(main["championId"], main["individualPosition"])}
+
+    champion_ids, matrix = champion_embeddings(df, rune_id_to_tree)
+    n_clusters = min(n_clusters, len(champion_ids))
+    labels = KMeans(n_clusters=n_clusters, n_init=10, random_state=seed).fit_predict(matrix)
+    return {int(c): f"cluster_{label:02d}" for c, label in zip(champion_ids, labels)}
+
+
+def fit_partition(X, Y, n_estimators=100, max_depth=6):
+    """
+    Train one classifier per target on a partition's rows.
+
+    Labels are re-encoded to the classes present in the partition (XGBoost needs contiguous
+    labels); the actual IDs are kept so serving can map them back to the global label space.
+
+    Returns:
+    - dict, per-target estimators (None when the partition only has one class) and class IDs.
+    """
+    estimators, classes = [], []
+    for t in range(Y.shape[1]):
+        local_classes, codes = np.unique(Y[:, t], return_inverse=True)
+        classes.append(local_classes)
+        if len(local_classes) == 1:
+            estimators.append(None)
+            continue
+        classifier = XGBClassifier(n_estimators=n_estimators, max_depth=max_depth, tree_method="hist",
+                                   random_state=42, n_jobs=1, eval_metric="logloss")
+        classifier.fit(X, codes)
+        estimators.append(classifier)
+    return {"estimators": estimators, "classes": classes}
+
+
+def train_partition(key, X, Y, output_dir, n_estimators, max_depth):
+    """
+    Train and save one partition; runs in a worker process.
+
+    The file is named after its content, so retraining writes new files next to the ones a
+    running server's manifest still points to instead of overwriting them.
+    """
+    start = time.perf_counter()
+    partition = fit_partition(X, Y, n_estimators, max_depth)
+    fd, temp_path = tempfile.mkstemp(dir=output_dir, prefix=f".{key}-", suffix=".tmp")
+    os.close(fd)
+    joblib.dump(partition, temp_path, protocol=4)
+    with open(temp_path, "rb") as f:
+        digest = file_digest(f)[:16]
+    output_path = os.path.join(output_dir, f"{key}-{digest}.pkl")
+    os.replace(temp_path, output_path)
+    return key, {
+        "file": os.path.basename(output_path),
+        "rows": int(len(X)),
+        "bytes": os.path.getsize(output_path),
+        "train_seconds": time.perf_counter() - start,
+    }
+
+
+def load_preprocessing(df_path=DF_PATH, model_dir=MODEL_DIR):
+    """
+    Load the shared pipeline and global label encoders, fitting and saving them if they don't exist yet.
+    """
+    pipeline_path = os.path.join(model_dir, "preprocessing_pipeline.pkl")
+    encoders_path = os.path.join(model_dir, "label_encoders.pkl")
+    if os.path.exists(pipeline_path) and os.path.exists(encoders_path):
+        return joblib.load(pipeline_path), joblib.load(encoders_path)
+
+    pipeline, label_encoders, _ = fit_streaming_preprocessing([df_path])
+    os.makedirs(model_dir, exist_ok=True)
+    joblib.dump(pipeline, pipeline_path)
+    joblib.dump(label_encoders, encoders_path)
+    return pipeline, label_encoders
+
+
+def transform(df, pipeline):
+    X = pipeline.transform(df[list(pipeline.named_steps["preprocessor"].feature_names_in_)])
+    return X.toarray() if hasattr(X, "toarray") else X
+
+
+def train_partitioned(df, pipeline, routing, output_dir, workers=2, n_estimators=100, max_depth=6, scheme="custom"):
+    """
+    Train one model per partition in parallel and write them with a manifest serving can load.
+
+    Parameters:
+    - df: DataFrame, processed training data.
+    - pipeline: the fitted preprocessing pipeline shared by all partitions.
+    - routing: dict, championId -> partition key (see partition_routing).
+    - output_dir: str, directory for the partition pickles and manifest.json. Partition files are
+      named by content and the previous set is kept until the next retraining.
+    - workers: int, partitions trained at the same time.
+    - n_estimators: int, boosting rounds per target.
+    - max_depth: int, maximum tree depth.
+
+    Returns:
+    - dict, the manifest.
+    """
+    start = time.perf_counter()
+    os.makedirs(output_dir, exist_ok=True)
+    X = transform(df, pipeline)
+    Y = df[target_features].to_numpy(dtype=np.int64)
+    keys = df["championId"].map(routing).fillna("").to_numpy()
+
+    partitions = {}
+    with ProcessPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = [
+            executor.submit(train_partition, key, X[keys == key], Y[keys == key], output_dir, n_estimators, max_depth)
+            for key in sorted(set(routing.values())) if (keys == key).any()
+        ]
+        for future in futures:
+            key, info = future.result()
+            info["champions"] = sum(1 for k in routing.values() if k == key)
+            partitions[key] = info
+            print(f"Trained {key}: {info['rows']} rows, {info['champions']} champions, "
+                  f"{info['bytes'] / 2 ** 20:.1f} MB in {info['train_seconds']:.1f}s")
+
+    manifest = {
+        "scheme": scheme,
+        "routing": {str(c): key for c, key in routing.items() if key in partitions},
+        # champions without a partition (unseen when training) use the largest one
+        "default_partition": max(partitions, key=lambda key: partitions[key]["rows"]),
+        "partitions": partitions,
+        "params": {"n_estimators": n_estimators, "max_depth": max_depth},
+    }
+    # switching the manifest is what publishes the new set: a server that read the old manifest
+    # keeps loading the old files, one that reads the new one only finds complete files
+    manifest_path = os.path.join(output_dir, MANIFEST_FILE)
+    previous = set()
+    if os.path.exists(manifest_path):
+        with open(manifest_path, "r") as f:
+            previous = {info["file"] for info in json.load(f)["partitions"].values()}
+    temp_path = manifest_path + ".tmp"
+    with open(temp_path, "w") as f:
+        json.dump(manifest, f, indent=4)
+    os.replace(temp_path, manifest_path)
+
+    # keep the set just replaced for servers that have not reloaded yet, and drop older ones
+    keep = previous | {info["file"] for info in partitions.values()}
+    for name in os.listdir(output_dir):
+        if name.endswith(".pkl") and name not in keep:
+            os.remove(os.path.join(output_dir, name))
+
+    train_seconds = sum(info["train_seconds"] for info in partitions.values())
+    print(f"Saved {len(partitions)} partitions to {output_dir} in {time.perf_counter() - start:.1f}s "
+          f"({train_seconds:.1f}s of training)")
+    return manifest
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+
+def evaluate(model, X_test, Y_test, label_encoders, X_requests):
+    """
+    Measure accuracy on held-out rows and single-request prediction latency.
+    """
+    predicted = model.predict(X_test)
+    decoded = np.column_stack([label_encoders[col].classes_[predicted[:, t]] for t, col in enumerate(target_features)])
+    correct = decoded == Y_test
+
+    # start from an empty LRU, so partition loads show up in the request latencies
+    partitioned = isinstance(model, PartitionedModel)
+    if partitioned:
+        model.cache.clear()
+        model.hits = model.misses = 0
+    latencies, hit_latencies = [], []
+    for row in X_requests:
+        misses = model.misses if partitioned else 0
+        start = time.perf_counter()
+        model.predict(row[np.newaxis, :])
+        latencies.append(time.perf_counter() - start)
+        if not partitioned or model.misses == misses:
+            hit_latencies.append(latencies[-1])
+
+    return {
+        "accuracy": {col: float(correct[:, t].mean()) for t, col in enumerate(target_features)},
+        "mean_accuracy": float(correct.mean()),
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "hit_p50_ms": percentile(hit_latencies, 0.50) * 1000,
+    }
+
+
+def compare(df, scheme, n_clusters=8, workers=2, n_estimators=100, max_depth=6,
+            test_size=0.2, cache_size=3, requests=500, seed=42):
+    """
+    Train the single model of train_streaming.py and a partitioned one on the same rows and
+    compare them on held-out rows. Both use the preprocessing fitted on the training rows only.
+
+    Requests replay held-out rows in random order, so popular champions come up as often as in
+    the data, the skew the partition LRU relies on. Memory is the size of the models a process
+    holds: the whole single model, or the partitions in the LRU when the run ends.
+
+    Returns:
+    - dict, the comparison report.
+    """
+    rng = np.random.default_rng(seed)
+    test_mask = rng.random(len(df)) < test_size
+    train_df, test_df = df[~test_mask].reset_index(drop=True), df[test_mask].reset_index(drop=True)
+    Y_test = test_df[target_features].to_numpy(dtype=np.int64)
+    request_rows = rng.choice(len(test_df), size=min(requests, len(test_df)), replace=False)
+
+    work_dir = tempfile.mkdtemp(prefix="partitions_")
+    try:
+        report = {}
+
+        # the model serving loads without MODEL_PARTITIONS; its preprocessing is fitted on the training rows
+        # and, as in models/, the partitions share it
+        print("Training the single model...")
+        train_path = os.path.join(work_dir, "train.csv")
+        train_df.to_csv(train_path, index=False)
+        single_dir = os.path.join(work_dir, "single")
+        start = time.perf_counter()
+        single_pipeline, single_encoders, single_model = train_streaming([train_path], single_dir,
+                                                                         n_estimators=n_estimators, max_depth=max_depth)
+        train_wall = time.perf_counter() - start
+        X_test = transform(test_df, single_pipeline)
+        result = evaluate(single_model, X_test, Y_test, single_encoders, X_test[request_rows])
+        model_mb = os.path.getsize(os.path.join(single_dir, "best_recommendation_model.pkl")) / 2 ** 20
+        result.update(partitions=1, train_seconds=train_wall, total_mb=model_mb, resident_mb=model_mb,
+                      cache_hit_rate=1.0)
+        report["single"] = result
+
+        print(f"Training the {scheme} partitions...")
+        routing = partition_routing(train_df, scheme, n_clusters, seed)
+        start = time.perf_counter()
+        manifest = train_partitioned(train_df, single_pipeline, routing, os.path.join(work_dir, scheme),
+                                     workers, n_estimators, max_depth, scheme)
+        train_wall = time.perf_counter() - start
+        model = PartitionedModel(os.path.join(work_dir, scheme), single_pipeline, single_encoders, target_features,
+                                 cache_size)
+        result = evaluate(model, X_test, Y_test, single_encoders, X_test[request_rows])
+        stats = model.stats()
+        result.update(
+            partitions=len(manifest["partitions"]),
+            train_seconds=train_wall,
+            total_mb=sum(p["bytes"] for p in manifest["partitions"].values()) / 2 ** 20,
+            resident_mb=sum(manifest["partitions"][key]["bytes"] for key in stats["loaded"]) / 2 ** 20,
+            cache_hit_rate=stats["hits"] / max(1, stats["hits"] + stats["misses"]),
+        )
+        report[scheme] = result
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"{'setup':>10} {'parts':>6} {'train s':>8} {'accuracy':>9} {'p50 ms':>7} {'p95 ms':>7} {'p99 ms':>7} "
+          f"{'hit p50':>8} {'total MB':>9} {'held MB':>8} {'hits':>6}")
+    for name, r in report.items():
+        print(f"{name:>10} {r['partitions']:6d} {r['train_seconds']:8.1f} {r['mean_accuracy']:9.3f} {r['p50_ms']:7.2f} "
+              f"{r['p95_ms']:7.2f} {r['p99_ms']:7.2f} {r['hit_p50_ms']:8.2f} {r['total_mb']:9.1f} {r['resident_mb']:8.1f} "
+              f"{r['cache_hit_rate']:6.0%}")
+    print(f"{'target':>15} " + " ".join(f"{name:>10}" for name in report))
+    for col in target_features:
+        print(f"{col:>15} " + " ".join(f"{report[name]['accuracy'][col]:10.3f}" for name in report))
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train smaller per-position or per-cluster models that serving loads on demand.")
+    parser.add_argument("--scheme", choices=PARTITION_SCHEMES, default="position")
+    parser.add_argument("--clusters", type=int, default=8, help="champion clusters for --scheme cluster")
+    parser.add_argument("--workers", type=int, default=2, help="partitions trained at the same time")
+    parser.add_argument("--n-estimators", type=int, default=100)
+    parser.add_argument("--max-depth", type=int, default=6)
+    parser.add_argument("--output-dir", default=None, help=f"defaults to {PARTITIONS_DIR}/<scheme>")
+    parser.add_argument("--compare", action="store_true",
+                        help="compare against train_streaming.py's single model on held-out rows instead of writing partitions")
+    parser.add_argument("--test-size", type=float, default=0.2)
+    parser.add_argument("--cache-size", type=int, default=3, help="partitions held in memory during --compare")
+    parser.add_argument("--requests", type=int, default=500, help="single-row predictions timed during --compare")
+    parser.add_argument("--output", default=None, help="write the --compare report as JSON to this path")
+    args = parser.parse_args()
+
+    df = pd.read_csv(DF_PATH)
+    if args.compare:
+        report = compare(df, args.scheme, args.clusters, args.workers, args.n_estimators,
+                         args.max_depth, args.test_size, args.cache_size, args.requests)
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(report, f, indent=4)
+    else:
+        pipeline, label_encoders = load_preprocessing()
+        routing = partition_routing(df, args.scheme, args.clusters)
+        train_partitioned(df, pipeline, routing, args.output_dir or os.path.join(PARTITIONS_DIR, args.scheme),
+                          args.workers, args.n_estimators, args.max_depth, args.scheme)
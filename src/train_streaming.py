@@ -0,0 +1,238 @@
+import os
+import glob
+import time
+import shutil
+import argparse
+import tempfile
+import contextlib
+
+import joblib
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from xgboost import XGBClassifier
+from sklearn.compose import ColumnTransformer
+from sklearn.multioutput import MultiOutputClassifier
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler, LabelEncoder
+
+# same features and preprocessing as 04_modeling.ipynb
+input_features = [
+    "championId", "matchupChampion", "individualPosition",
+    "kills", "deaths", "assists",
+    "goldEarned", "totalDamageDealt",
+    "totalDamageTaken", "totalHeal", "win"
+]
+target_features = [
+    "Boots_id", "Legendary_1_id", "Legendary_2_id",
+    "Keystone", "PrimarySlot1", "PrimarySlot2",
+    "PrimarySlot3", "SecondarySlot1", "SecondarySlot2"
+]
+scaled_features = ["kills", "deaths", "assists", "goldEarned", "totalDamageDealt", "totalDamageTaken", "totalHeal"]
+
+SHARDS_GLOB = "../data/processed/shards/*.csv"
+DF_PATH = "../data/processed/transformed_data.csv"
+MODEL_DIR = "../models"
+CHUNK_SIZE = 50000
+
+
+def find_shards(pattern=SHARDS_GLOB):
+    """
+    List the processed shards to train on, falling back to the single processed CSV.
+    """
+    shard_paths = sorted(glob.glob(pattern))
+    if not shard_paths and os.path.exists(DF_PATH):
+        shard_paths = [DF_PATH]
+    return shard_paths
+
+
+def iter_chunks(shard_paths, chunksize=CHUNK_SIZE, columns=None):
+    """
+    Yield the processed data chunk by chunk, so at most one chunk is held in memory.
+    """
+    for path in shard_paths:
+        for chunk in pd.read_csv(path, chunksize=chunksize, usecols=columns):
+            yield chunk
+
+
+def fit_streaming_preprocessing(shard_paths, chunksize=CHUNK_SIZE):
+    """
+    Fit the preprocessing pipeline and label encoders from streaming statistics.
+
+    The scaler is fitted with partial_fit over every chunk; the one-hot encoder and the label
+    encoders only need the set of categories, which is collected on the same pass. The
+    resulting objects are the same types, with the same fitted state, as fitting the
+    04_modeling.ipynb pipeline on the whole DataFrame.
+
+    Returns:
+    - tuple of (fitted Pipeline, dict of fitted LabelEncoders, number of rows).
+    """
+    scaler = StandardScaler()
+    positions = set()
+    target_classes = {col: set() for col in target_features}
+    rows = 0
+
+    for chunk in iter_chunks(shard_paths, chunksize, input_features + target_features):
+        scaler.partial_fit(chunk[scaled_features])
+        positions.update(chunk["individualPosition"].unique().tolist())
+        for col in target_features:
+            target_classes[col].update(chunk[col].unique().tolist())
+        rows += len(chunk)
+
+    preprocessor = ColumnTransformer(
+        transformers=[
+            ("position", OneHotEncoder(drop='first', handle_unknown='ignore'), ["individualPosition"]),
+            ("scaling", StandardScaler(), scaled_features)
+        ],
+        remainder='passthrough'
+    )
+    pipeline = Pipeline([("preprocessor", preprocessor)])
+
+    # fit on one prototype row per position so the encoder learns every category, then
+    # replace the prototype scaling statistics with the streamed ones
+    prototype = pd.DataFrame(0, index=range(len(positions)), columns=input_features, dtype=np.int64)
+    prototype["individualPosition"] = sorted(positions)
+    prototype[scaled_features] = prototype[scaled_features].astype(np.float64)
+    pipeline.fit(prototype)
+
+    fitted_scaler = pipeline.named_steps["preprocessor"].named_transformers_["scaling"]
+    for attr in ("mean_", "var_", "scale_", "n_samples_seen_"):
+        setattr(fitted_scaler, attr, getattr(scaler, attr))
+
+    label_encoders = {}
+    for col in target_features:
+        le = LabelEncoder()
+        le.fit(np.array(sorted(target_classes[col]), dtype=np.int64))
+        label_encoders[col] = le
+
+    return pipeline, label_encoders, rows
+
+
+class ShardIterator(xgb.DataIter):
+    """
+    Feed preprocessed chunks of the shards to XGBoost, which caches them on disk
+    (external memory) instead of holding the whole dataset.
+    """
+
+    def __init__(self, shard_paths, pipeline, label_encoder, target, chunksize, cache_prefix):
+        self.shard_paths = shard_paths
+        self.pipeline = pipeline
+        self.label_encoder = label_encoder
+        self.target = target
+        self.chunksize = chunksize
+        self._chunks = None
+        super().__init__(cache_prefix=cache_prefix)
+
+    def next(self, input_data):
+        if self._chunks is None:
+            self._chunks = iter_chunks(self.shard_paths, self.chunksize, input_features + [self.target])
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            return 0
+
+        X = self.pipeline.transform(chunk[input_features])
+        if hasattr(X, "toarray"):
+            X = X.toarray()
+        y = self.label_encoder.transform(chunk[self.target])
+        input_data(data=X, label=y)
+        return 1
+
+    def reset(self):
+        self._chunks = None
+
+
+def train_target(shard_paths, pipeline, label_encoder, target, chunksize, cache_dir, params, num_boost_round):
+    """
+    Train one XGBoost classifier over the shards with bounded memory.
+
+    Returns:
+    - XGBClassifier, wrapping the trained booster so it predicts like the in-memory models.
+    """
+    n_classes = len(label_encoder.classes_)
+    iterator = ShardIterator(shard_paths, pipeline, label_encoder, target, chunksize,
+                             cache_prefix=os.path.join(cache_dir, target))
+    dtrain = xgb.DMatrix(iterator)
+
+    target_params = dict(params)
+    if n_classes > 2:
+        target_params.update(objective="multi:softprob", num_class=n_classes, eval_metric="mlogloss")
+    else:
+        target_params.update(objective="binary:logistic", eval_metric="logloss")
+
+    booster = xgb.train(target_params, dtrain, num_boost_round=num_boost_round)
+
+    # loading the raw booster restores n_classes_ and the objective on the sklearn wrapper
+    classifier = XGBClassifier()
+    classifier.load_model(bytearray(booster.save_raw("ubj")))
+    return classifier
+
+
+def train_streaming(shard_paths, output_dir=MODEL_DIR, chunksize=CHUNK_SIZE, n_estimators=100, max_depth=6,
+                    profiler=None):
+    """
+    Train the recommendation model over processed shards without loading them into one DataFrame.
+
+    Writes preprocessing_pipeline.pkl, label_encoders.pkl and best_recommendation_model.pkl, the
+    same artifacts (and types) the apps load.
+
+    Parameters:
+    - shard_paths: list of str, processed CSV shards.
+    - output_dir: str, directory to write the artifacts to.
+    - chunksize: int, rows per chunk; peak memory scales with this, not with the dataset.
+    - n_estimators: int, boosting rounds per target.
+    - max_depth: int, maximum tree depth.
+    - profiler: MemoryProfiler, optional, records memory around preprocessing, every target and saving.
+    """
+    stage = profiler.stage if profiler is not None else lambda name, rows=None: contextlib.nullcontext({})
+    start = time.perf_counter()
+    with stage("fit_preprocessing") as record:
+        pipeline, label_encoders, rows = fit_streaming_preprocessing(shard_paths, chunksize)
+        record["rows"] = rows
+    print(f"Fitted preprocessing on {rows} rows from {len(shard_paths)} shard(s) in {time.perf_counter() - start:.1f}s")
+
+    params = {"max_depth": max_depth, "tree_method": "hist", "seed": 42}
+    cache_dir = tempfile.mkdtemp(prefix="xgb_cache_")
+    estimators = []
+    try:
+        for target in target_features:
+            target_start = time.perf_counter()
+            with stage(f"train_{target}", rows):
+                estimators.append(train_target(shard_paths, pipeline, label_encoders[target], target,
+                                               chunksize, cache_dir, params, n_estimators))
+            print(f"Trained {target} ({len(label_encoders[target].classes_)} classes) "
+                  f"in {time.perf_counter() - target_start:.1f}s")
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    model = MultiOutputClassifier(XGBClassifier(n_estimators=n_estimators, random_state=42))
+    model.estimators_ = estimators
+
+    with stage("save_artifacts", rows):
+        os.makedirs(output_dir, exist_ok=True)
+        joblib.dump(pipeline, os.path.join(output_dir, "preprocessing_pipeline.pkl"))
+        joblib.dump(label_encoders, os.path.join(output_dir, "label_encoders.pkl"))
+        joblib.dump(model, os.path.join(output_dir, "best_recommendation_model.pkl"), protocol=4)
+
+    try:
+        import resource  # Unix only, and only needed for this report
+        peak = f" (peak RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB)"
+    except ImportError:
+        peak = ""
+    print(f"Saved artifacts to {output_dir} in {time.perf_counter() - start:.1f}s{peak}")
+    return pipeline, label_encoders, model
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the recommendation model out of core over processed shards.")
+    parser.add_argument("--shards", default=SHARDS_GLOB, help="glob of processed CSV shards")
+    parser.add_argument("--output-dir", default=MODEL_DIR)
+    parser.add_argument("--chunksize", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--n-estimators", type=int, default=100)
+    parser.add_argument("--max-depth", type=int, default=6)
+    args = parser.parse_args()
+
+    shard_paths = find_shards(args.shards)
+    if not shard_paths:
+        print(f"No processed shards found for {args.shards}")
+    else:
+        train_streaming(shard_paths, args.output_dir, args.chunksize, args.n_estimators, args.max_depth)
@@ -0,0 +1,44 @@
+import os
+import sys
+
+# the scripts import each other by module name and read their data relative to src/, so the
+# tests run from there exactly like the scripts do
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+sys.path.insert(0, SRC_DIR)
+os.chdir(SRC_DIR)
+
+import numpy as np
+import pandas as pd
+import pytest
+
+
+def make_processed_frame(rows=2000, seed=0):
+    """
+    A small processed dataset with the columns of transformed_data.csv and random values.
+    """
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "championId": rng.integers(1, 60, rows),
+        "matchupChampion": rng.integers(1, 60, rows),
+        "individualPosition": rng.integers(0, 5, rows),
+        "kills": rng.poisson(5, rows), "deaths": rng.poisson(5, rows), "assists": rng.poisson(7, rows),
+        "goldEarned": rng.normal(11000, 2000, rows).astype(int),
+        "totalDamageDealt": rng.normal(20000, 5000, rows).astype(int),
+        "totalDamageTaken": rng.normal(20000, 5000, rows).astype(int),
+        "totalHeal": rng.normal(5000, 2000, rows).astype(int),
+        "win": rng.integers(0, 2, rows),
+    })
+    for col, choices in (("Boots_id", [3006, 3020, 3047, 3111]), ("Legendary_1_id", [3031, 3089, 3157]),
+                         ("Legendary_2_id", [3071, 3053, 3065]), ("Keystone", [8005, 8112, 8214]),
+                         ("PrimarySlot1", [9111, 8126]), ("PrimarySlot2", [9104, 8138]),
+                         ("PrimarySlot3", [8014, 8135]), ("SecondarySlot1", [8304, 8345]),
+                         ("SecondarySlot2", [8347, 8410])):
+        df[col] = rng.choice(choices, rows)
+    return df
+
+
+@pytest.fixture
+def processed_csv(tmp_path):
+    path = tmp_path / "transformed_data.csv"
+    make_processed_frame().to_csv(path, index=False)
+    return str(path)
@@ -0,0 +1,137 @@
+import ast
+import json
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+from clean_data import build_processed_dataset, clean_match_details
+
+SHARD_PATH = "../data/raw/match_details_backup/all_match_details10.json"
+
+
+def notebook_cleaning(folder):
+    # the cells of 02_data_cleaning.ipynb, row by row like the notebook
+    all_match_data = []
+    for filename in os.listdir(folder):
+        if filename.endswith(".json"):
+            with open(os.path.join(folder, filename), "r") as f:
+                all_match_data.extend(json.load(f))
+    new_df = pd.DataFrame(all_match_data)
+
+    with open("../data/raw/item_data/items.json", 'r') as f:
+        items = json.load(f)["data"]
+
+    def get_item_cost(item_id):
+        return items.get(str(item_id), {}).get("gold", {}).get("total", 0)
+
+    for index, row in new_df.iterrows():
+        for i in range(6):
+            item_id = row[f"item_{i}"]
+            item_cost = get_item_cost(item_id)
+            if row[f"item_purchase_time_{i}"] == "Unknown Time" and (
+                    item_cost > 2100 or item_id in [1001, 2422, 3111, 3158, 3006, 3020] or item_id in [1054, 1055, 1056]):
+                previous_times = [int(row[f"item_purchase_time_{j}"]) for j in range(i)
+                                  if row[f"item_purchase_time_{j}"] != "Unknown Time"]
+                if len(previous_times) > 0:
+                    new_df.at[index, f"item_purchase_time_{i}"] = max(previous_times) + (item_cost // 100) * 30
+                else:
+                    new_df.at[index, f"item_purchase_time_{i}"] = 900
+
+    def filter_important_items(row):
+        items_with_time = []
+        boots = None
+        for i in range(6):
+            item_id, item_purchase_time = row[f"item_{i}"], row[f"item_purchase_time_{i}"]
+            if item_id in [1001, 3009, 3111, 3158, 3006, 3020]:
+                boots = (item_id, item_purchase_time)
+            if get_item_cost(item_id) > 2100:
+                items_with_time.append((item_id, item_purchase_time))
+        items_with_time = sorted(items_with_time, key=lambda x: int(x[1]) if isinstance(x[1], int) or str(x[1]).isdigit() else float('inf'))
+        legendary_items = items_with_time[:2]
+        return {
+            "Boots": boots if boots else (None, None),
+            "Legendary_1": legendary_items[0] if len(legendary_items) > 0 else (None, None),
+            "Legendary_2": legendary_items[1] if len(legendary_items) > 1 else (None, None),
+        }
+
+    filtered_df = new_df.copy()
+    filtered_items_dicts = filtered_df.apply(filter_important_items, axis=1)
+    for important_item in ["Boots", "Legendary_1", "Legendary_2"]:
+        filtered_df[f"{important_item}_id"] = filtered_items_dicts.apply(lambda x: x[important_item][0])
+        filtered_df[f"{important_item}_purchase_time"] = filtered_items_dicts.apply(lambda x: x[important_item][1])
+    filtered_df.drop(columns=[f"item_{i}" for i in range(6)] + [f"item_purchase_time_{i}" for i in range(6)], inplace=True)
+
+    with open("../data/raw/runes_data/runes.json", "r") as f:
+        runes_data = json.load(f)
+    rune_dict = {rune["id"]: rune["name"] for tree in runes_data for slot in tree["slots"] for rune in slot["runes"]}
+
+    def clean_rune_data(rune_column):
+        readable_runes = []
+        for row in rune_column:
+            if isinstance(row, str):
+                row = ast.literal_eval(row)
+            readable_runes.append({
+                "style": rune_dict.get(row['style'], "Unknown Style"),
+                "selections": [rune_dict.get(selection['perk'], "Unknown Rune") for selection in row.get('selections', [])],
+            })
+        return readable_runes
+
+    filtered_df["primaryRune_clean"] = clean_rune_data(filtered_df["primaryRune"])
+    filtered_df["secondaryRune_clean"] = clean_rune_data(filtered_df["secondaryRune"])
+    filtered_df.drop(columns=["primaryRune", "secondaryRune"], inplace=True)
+
+    def split_rune_data(row):
+        primary, secondary = row['primaryRune_clean']['selections'], row['secondaryRune_clean']['selections']
+        return pd.Series([primary[i] if len(primary) > i else None for i in range(4)]
+                         + [secondary[i] if len(secondary) > i else None for i in range(2)])
+
+    rune_columns = filtered_df.apply(split_rune_data, axis=1)
+    rune_columns.columns = ['Keystone', 'PrimarySlot1', 'PrimarySlot2', 'PrimarySlot3', 'SecondarySlot1', 'SecondarySlot2']
+    runes_fix_df = pd.concat([filtered_df, rune_columns], axis=1)
+    runes_fix_df.drop(columns=['primaryRune_clean', 'secondaryRune_clean'], inplace=True)
+
+    rune_name_to_id = {rune['name']: rune['id'] for tree in runes_data for slot in tree['slots'] for rune in slot['runes']}
+    for column in rune_columns.columns:
+        runes_fix_df[column] = runes_fix_df[column].map(rune_name_to_id)
+    runes_fix_df[list(rune_columns.columns)] = runes_fix_df[list(rune_columns.columns)].fillna(0).astype(int)
+
+    with open("../data/raw/champion_data/champions.json", "r") as f:
+        champions_data = json.load(f)
+    champion_name_to_id = {info["name"]: int(info["key"]) for info in champions_data["data"].values()}
+    df = runes_fix_df.copy()
+    df['matchupChampion'] = df['matchupChampion'].map(champion_name_to_id).fillna(-1).astype(int)
+    df.drop(columns=['matchId', 'championName', 'region'], errors='ignore', inplace=True)
+    df['individualPosition'] = df['individualPosition'].map(
+        {'TOP': 0, 'JUNGLE': 1, 'MIDDLE': 2, 'BOTTOM': 3, 'UTILITY': 4}).fillna(-1).astype('int64')
+    bool_columns = df.select_dtypes(include='bool').columns
+    df[bool_columns] = df[bool_columns].astype(int)
+    for column in ['Boots_id', 'Boots_purchase_time', 'Legendary_1_id', 'Legendary_1_purchase_time',
+                   'Legendary_2_id', 'Legendary_2_purchase_time']:
+        df[column] = df[column].fillna(0).astype('int64')
+    return df
+
+
+@pytest.fixture
+def match_details_dir(tmp_path):
+    folder = tmp_path / "match_details"
+    folder.mkdir()
+    shutil.copy(SHARD_PATH, folder)
+    return folder
+
+
+def test_cleaning_matches_the_notebook_row_for_row(match_details_dir, tmp_path):
+    cleaned_path, processed_path = tmp_path / "cleaned.csv", tmp_path / "processed.csv"
+    cleaned_rows = clean_match_details(str(match_details_dir), str(cleaned_path))
+    processed_rows = build_processed_dataset(str(cleaned_path), str(processed_path))
+
+    # the notebook writes the cleaned frame, reads it back and keeps games of 20 minutes or more
+    expected_path = tmp_path / "notebook.csv"
+    notebook_cleaning(match_details_dir).to_csv(expected_path, index=False)
+    expected = pd.read_csv(expected_path)
+    assert cleaned_rows == len(expected)
+    expected = expected[expected['gameDuration'] >= 1200].reset_index(drop=True)
+
+    assert 0 < processed_rows == len(expected)
+    pd.testing.assert_frame_equal(pd.read_csv(processed_path), expected)
@@ -0,0 +1,110 @@
+from crawl_frontier import CrawlFrontier
+
+
+def test_players_pop_most_recent_first_within_quotas(tmp_path):
+    frontier = CrawlFrontier(path=str(tmp_path / "frontier.json"), rank_quotas={"GOLD": 1},
+                             region_quotas={"euw1": 2})
+    frontier.push_player("gold-old", "GOLD", "na1", last_seen=1)
+    frontier.push_player("gold-new", "GOLD", "na1", last_seen=5)
+    frontier.push_player("euw-a", "SILVER", "euw1", last_seen=4)
+    frontier.push_player("euw-b", "SILVER", "euw1", last_seen=3)
+    frontier.push_player("euw-c", "SILVER", "euw1", last_seen=2)
+
+    popped = [frontier.pop_player()["puuid"] for _ in range(3)]
+
+    # the GOLD quota is spent after one player and euw1's after two
+    assert popped == ["gold-new", "euw-a", "euw-b"]
+    assert frontier.pop_player() is None
+    # players over quota stay queued for a later run
+    assert len(frontier) == 2
+
+
+def test_players_and_matches_are_queued_once(tmp_path):
+    frontier = CrawlFrontier(path=str(tmp_path / "frontier.json"))
+    assert frontier.push_player("a")
+    assert not frontier.push_player("a")
+    assert frontier.push_match("NA1_2")
+    assert not frontier.push_match("NA1_2")
+    frontier.push_match("NA1_10")
+
+    assert frontier.pop_match()["match_id"] == "NA1_10"
+    assert frontier.pop_match()["match_id"] == "NA1_2"
+    assert frontier.pop_match() is None
+
+
+def test_save_and_load_round_trip(tmp_path):
+    path = str(tmp_path / "frontier.json")
+    frontier = CrawlFrontier(path=path, region_quotas={None: 1})
+    frontier.push_player("seed", region=None, last_seen=0)
+    frontier.push_player("waiting", region=None, last_seen=0)
+    frontier.push_player("na", "GOLD", "na1", last_seen=7)
+    frontier.push_match("NA1_1", "GOLD")
+    assert frontier.pop_player()["puuid"] == "na"
+    assert frontier.pop_player()["region"] is None
+    frontier.save()
+
+    loaded = CrawlFrontier(path=path, region_quotas={None: 1})
+
+    assert loaded.crawled_per_region == {"na1": 1, None: 1}
+    assert loaded.crawled_per_rank == frontier.crawled_per_rank
+    assert loaded.seen_puuids == {"seed", "waiting", "na"}
+    # the None region is still over quota after the reload
+    assert loaded.pop_player() is None
+    assert len(loaded) == 1
+    assert loaded.pop_match() == {"match_id": "NA1_1", "rank": "GOLD"}
+
+
+def test_concurrent_collectors_keep_each_others_discoveries(tmp_path):
+    path = str(tmp_path / "frontier.json")
+    seed = CrawlFrontier(path=path)
+    seed.push_player("p1", last_seen=1)
+    seed.push_match("NA1_1")
+    seed.save()
+
+    # match_history.py and match_details.py both load the same file
+    history = CrawlFrontier(path=path)
+    details = CrawlFrontier(path=path)
+
+    assert history.pop_player()["puuid"] == "p1"
+    history.push_match("NA1_2")
+    assert details.pop_match()["match_id"] == "NA1_1"
+    details.push_player("p2", last_seen=2)
+
+    history.save()
+    details.save()
+    merged = CrawlFrontier(path=path)
+
+    assert [merged.pop_player()["puuid"]] == ["p2"]
+    assert merged.pop_player() is None
+    assert merged.pop_match()["match_id"] == "NA1_2"
+    assert merged.pop_match() is None
+    assert merged.seen_puuids == {"p1", "p2"}
+    assert merged.seen_match_ids == {"NA1_1", "NA1_2"}
+    # the collector that saved first picks up the other's changes on its next save
+    history.save()
+    assert history.pending_matches() == 1 and len(history) == 1
+
+
+def test_requeued_entries_survive_a_save_in_between(tmp_path):
+    path = str(tmp_path / "frontier.json")
+    frontier = CrawlFrontier(path=path, rank_quotas={"GOLD": 1})
+    frontier.push_player("p1", "GOLD", "na1", last_seen=3)
+    frontier.push_match("NA1_1", "GOLD")
+    frontier.save()
+
+    player, match = frontier.pop_player(), frontier.pop_match()
+    # saved while the fetches are in flight, then the fetches fail
+    frontier.save()
+    frontier.requeue_player(player)
+    frontier.requeue_match(match)
+    # the failed player gives its quota slot back
+    assert frontier.crawled_per_rank == {"GOLD": 0}
+    frontier.save()
+    frontier.save()
+
+    loaded = CrawlFrontier(path=path, rank_quotas={"GOLD": 1})
+    assert loaded.pop_player() == player
+    assert loaded.pop_player() is None
+    assert loaded.pop_match() == match
+    assert loaded.pop_match() is None
+    assert not loaded.push_player("p1") and not loaded.push_match("NA1_1")
@@ -0,0 +1,81 @@
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+import serving
+from fast_path import FastPath, check_identical
+from train_streaming import fit_streaming_preprocessing, input_features, target_features
+
+ID_TO_NAME = {col: {3006: "Berserker's Greaves", 3020: "Sorcerer's Shoes", 8214: "Summon Aery"}
+              for col in target_features}
+
+
+@pytest.fixture
+def fitted(processed_csv):
+    df = pd.read_csv(processed_csv)
+    pipeline, label_encoders, _ = fit_streaming_preprocessing([processed_csv], chunksize=300)
+    return df, pipeline, label_encoders, FastPath.from_fitted(pipeline, label_encoders, target_features, ID_TO_NAME)
+
+
+def bits(X):
+    X = X.toarray() if hasattr(X, "toarray") else X
+    return X.dtype, np.ascontiguousarray(X).view(np.uint64)
+
+
+def test_fast_path_is_bit_identical_to_scikit_learn(fitted):
+    df, pipeline, label_encoders, fast_path = fitted
+    rng = np.random.default_rng(0)
+    codes = np.stack([rng.integers(0, len(label_encoders[col].classes_), len(df)) for col in target_features], axis=1)
+
+    assert check_identical(fast_path, pipeline, label_encoders, df[input_features], codes) == \
+        {"transform": True, "decode": True}
+
+
+@pytest.mark.filterwarnings("ignore:Found unknown categories")
+def test_averaged_records_transform_like_a_one_row_frame(fitted):
+    df, pipeline, _, fast_path = fitted
+    # predict_optimal_build averages the matchup's rows, so positions and counts can be fractional
+    for position in (2, 2.4):
+        record = df[input_features].mean().to_dict()
+        record["individualPosition"] = position
+        expected = pipeline.transform(pd.DataFrame([record], columns=input_features))
+        actual = fast_path.transform_records([record])
+        assert bits(actual)[0] == bits(expected)[0]
+        np.testing.assert_array_equal(bits(actual)[1], bits(expected)[1])
+
+
+def test_names_match_the_id_lookup_and_survive_saving(fitted, tmp_path):
+    _, pipeline, label_encoders, fast_path = fitted
+    fast_path.save(str(tmp_path / "fast_path.npz"))
+    loaded = FastPath.load(str(tmp_path / "fast_path.npz"))
+
+    ids = [3006, 3020, 3047, 8214, 0]
+    for col in ("Boots_id", "Keystone"):
+        unknown = "Unknown Item" if col == "Boots_id" else "Unknown Rune"
+        expected = [ID_TO_NAME[col].get(i, unknown) for i in ids]
+        assert list(fast_path.names_of(col, ids)) == expected
+        assert list(loaded.names_of(col, ids)) == expected
+
+    codes = np.zeros((1, len(target_features)), dtype=np.int64)
+    names = loaded.decode_names(codes)
+    assert names["Boots_id"][0] == ID_TO_NAME["Boots_id"].get(int(label_encoders["Boots_id"].classes_[0]), "Unknown Item")
+    X = pipeline.transform(pd.DataFrame(np.ones((3, len(input_features))), columns=input_features))
+    np.testing.assert_array_equal(bits(loaded.transform(np.ones((3, len(input_features)))))[1], bits(X)[1])
+
+
+def test_serving_loads_the_export_only_for_the_artifacts_it_came_from(fitted, tmp_path):
+    _, pipeline, label_encoders, _ = fitted
+    joblib.dump(pipeline, tmp_path / serving.PIPELINE_FILE)
+    joblib.dump(label_encoders, tmp_path / serving.LABEL_ENCODERS_FILE)
+    exported = serving.write_fast_path(str(tmp_path))
+    source = str(exported.arrays["source"])
+
+    loaded = serving.read_fast_path(pipeline, label_encoders, source, str(tmp_path))
+    assert str(loaded.arrays["source"]) == source
+    # a retrained pipeline or label encoders give another source, and the export is not used
+    rebuilt = serving.read_fast_path(pipeline, label_encoders, "another", str(tmp_path))
+    assert "source" not in rebuilt.arrays
+    for fast_path in (loaded, rebuilt):
+        np.testing.assert_array_equal(bits(fast_path.transform(np.ones((3, len(input_features)))))[1],
+                                      bits(exported.transform(np.ones((3, len(input_features)))))[1])
@@ -0,0 +1,97 @@
+import pandas as pd
+import pytest
+
+import serving
+from frequency_engine import FrequencyRecommender, POSITION_IDS
+
+
+def rune_page(primary, secondary, choice=0):
+    """
+    A legal rune page: keystone and one rune per row from the primary tree, two rows of the secondary.
+    """
+    primary_tree, secondary_tree = serving.rune_data[primary], serving.rune_data[secondary]
+    runes = [primary_tree["slots"][row]["runes"][choice]["id"] for row in range(4)]
+    return tuple(runes + [secondary_tree["slots"][row]["runes"][choice]["id"] for row in (1, 2)])
+
+
+PAGE_A = rune_page(0, 1)
+PAGE_B = rune_page(2, 3)
+# secondary runes from the primary tree: never a legal page
+ILLEGAL_PAGE = rune_page(0, 0)
+
+AHRI, ZED = serving.champion_name_to_id["ahri"], serving.champion_name_to_id["zed"]
+MID, TOP = POSITION_IDS["mid"], POSITION_IDS["top"]
+
+
+def games(*rows):
+    columns = ["championId", "matchupChampion", "individualPosition", "win", "Boots_id",
+               "Legendary_1_id", "Legendary_2_id", "Keystone", "PrimarySlot1", "PrimarySlot2", "PrimarySlot3",
+               "SecondarySlot1", "SecondarySlot2"]
+    return pd.DataFrame([(AHRI, ZED, position, win, boots, l1, l2) + page
+                         for position, win, boots, (l1, l2), page in rows], columns=columns)
+
+
+def recommender(df):
+    return FrequencyRecommender(serving.rune_id_to_tree, serving.rune_id_to_row).update(df)
+
+
+HISTORY = games(
+    (MID, 1, 3020, (3089, 3157), PAGE_A),
+    (MID, 1, 3020, (3089, 3157), PAGE_A),
+    (MID, 0, 3111, (3089, 3157), PAGE_A),
+    (TOP, 1, 3111, (3071, 3053), PAGE_B),
+    (TOP, 1, 3111, (3071, 3053), PAGE_B),
+    (TOP, 1, 3111, (3071, 3053), PAGE_B),
+    (TOP, 1, 3111, (3071, 3071), ILLEGAL_PAGE),
+)
+
+
+def test_tables_rank_each_position_and_all_positions():
+    tables = recommender(HISTORY)
+
+    mid = tables.recommend_ids(AHRI, ZED, MID)
+    top = tables.recommend_ids(AHRI, ZED, TOP)
+    overall = tables.recommend_ids(AHRI, ZED)
+
+    assert (mid["Boots_id"], mid["Legendary_1_id"], mid["Legendary_2_id"]) == (3020, 3089, 3157)
+    assert tuple(mid[col] for col in ["Keystone", "PrimarySlot1", "PrimarySlot2", "PrimarySlot3",
+                                      "SecondarySlot1", "SecondarySlot2"]) == PAGE_A
+    assert top["Boots_id"] == 3111 and top["Keystone"] == PAGE_B[0]
+    # over all positions 3111 won four games to 3020's two
+    assert overall["Boots_id"] == 3111
+    assert tables.recommend_ids(AHRI, ZED, POSITION_IDS["support"]) is None
+
+
+def test_illegal_choices_are_never_recommended():
+    tables = recommender(games(
+        (MID, 1, 3020, (3089, 3089), ILLEGAL_PAGE),
+        (MID, 1, 3020, (3089, 3089), ILLEGAL_PAGE),
+    ))
+
+    assert tables.recommend_ids(AHRI, ZED, MID) is None
+    assert not tables.is_legal_rune_page(ILLEGAL_PAGE)
+    assert tables.is_legal_rune_page(PAGE_A)
+
+
+def test_incremental_updates_match_a_single_build():
+    batch = recommender(HISTORY)
+    incremental = recommender(HISTORY.iloc[:3]).update(HISTORY.iloc[3:])
+
+    for position in (MID, TOP, None):
+        assert incremental.recommend_ids(AHRI, ZED, position) == batch.recommend_ids(AHRI, ZED, position)
+    assert incremental.rows_seen == batch.rows_seen == len(HISTORY)
+
+
+def test_position_reaches_the_tables_through_recommend():
+    bundle = {"frequency": recommender(HISTORY), "matchup_index": None, "version": "test"}
+
+    mid = serving.recommend("Ahri", "Zed", bundle=bundle, engine="frequency", position="mid")
+    top = serving.recommend("Ahri", "Zed", bundle=bundle, engine="frequency", position="Top")
+
+    assert mid["Boots_id"] == serving.item_id_to_name[3020]
+    assert top["Boots_id"] == serving.item_id_to_name[3111]
+    assert top["Keystone"] == serving.rune_id_to_name[PAGE_B[0]]
+    with pytest.raises(ValueError, match="Position provided is not valid"):
+        serving.recommend("Ahri", "Zed", bundle=bundle, engine="frequency", position="goalkeeper")
+    with pytest.raises(ValueError, match="No data available"):
+        serving.recommend("Ahri", "Zed", bundle=bundle, engine="frequency", position="support")
@@ -0,0 +1,116 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.multioutput import MultiOutputClassifier
+from sklearn.tree import DecisionTreeClassifier
+
+import serving
+from frequency_engine import FrequencyRecommender
+from matchup_index import MatchupIndex
+from train_streaming import fit_streaming_preprocessing, input_features, target_features
+
+STATS = {"kills": 5, "deaths": 5, "assists": 7, "goldEarned": 11000, "totalDamageDealt": 20000,
+         "totalDamageTaken": 20000, "totalHeal": 5000}
+
+
+def games(champion_id, matchup_champion_id, count, boots=3020, position=0):
+    return [dict(STATS, championId=champion_id, matchupChampion=matchup_champion_id, Boots_id=boots, Keystone=8005,
+                 SecondarySlot1=8304, individualPosition=position) for _ in range(count)]
+
+
+def index(rows, **kwargs):
+    return MatchupIndex.build(pd.DataFrame(rows), serving.rune_id_to_tree, **kwargs)
+
+
+# champions 1 and 2 are played identically, 3 differently
+ROWS = games(1, 10, 5) + games(2, 10, 5) + games(2, 11, 2) + games(3, 10, 6, boots=3047, position=3) + games(1, 11, 5)
+
+
+def test_pairs_with_any_games_are_not_substituted():
+    matchups = index(ROWS)
+
+    assert matchups.has_data(2, 11)
+    assert not matchups.is_data_rich(2, 11)
+    assert not matchups.has_data(2, 12)
+
+
+def test_substitutes_are_data_rich_and_closest_first():
+    matchups = index(ROWS, k=2)
+
+    # champion 1 is 2's nearest neighbour, so (1, 10) comes before (3, 10)
+    assert matchups.substitutes(2, 10)[:2] == [(1, 10), (3, 10)]
+    # (2, 11) has two games, below min_games, so it is never offered
+    assert (2, 11) not in matchups.substitutes(1, 11)
+    assert matchups.substitute(2, 99) is None
+
+
+def served_frame():
+    df = pd.DataFrame(ROWS)
+    df["win"] = 1
+    df["Legendary_1_id"], df["Legendary_2_id"] = 3089, 3157
+    keystone_tree, secondary_tree = serving.rune_data[0], serving.rune_data[1]
+    page = [keystone_tree["slots"][row]["runes"][0]["id"] for row in range(4)] + \
+           [secondary_tree["slots"][row]["runes"][0]["id"] for row in (1, 2)]
+    for col, rune in zip(["Keystone", "PrimarySlot1", "PrimarySlot2", "PrimarySlot3", "SecondarySlot1",
+                          "SecondarySlot2"], page):
+        df[col] = rune
+    # the sparse pair plays other boots than its neighbours, so its own data is recognisable
+    df.loc[(df.championId == 2) & (df.matchupChampion == 11), "Boots_id"] = 3111
+    return df
+
+
+def test_serving_answers_sparse_pairs_from_their_own_games():
+    df = served_frame()
+    recommender = FrequencyRecommender(serving.rune_id_to_tree, serving.rune_id_to_row).update(df)
+    matchups = index(ROWS)
+
+    # champion IDs 2, 3 and 11 are Olaf, Galio and Master Yi
+    sparse = serving.frequency_build("Olaf", "Master Yi", recommender, matchup_index=matchups)
+    empty = serving.frequency_build("Galio", "Master Yi", recommender, matchup_index=matchups)
+
+    assert sparse["substitute"] is None
+    assert sparse["Boots_id"] == serving.item_id_to_name[3111]
+    assert empty["substitute"] == (1, 11)
+
+
+def test_substitute_cache_is_bounded():
+    matchups = index(ROWS, k=2)
+    matchups.cache_size = 2
+
+    for opponent in (20, 21, 22):
+        matchups.substitutes(2, opponent)
+    matchups.substitutes(2, 21)
+
+    assert list(matchups.substitute_cache) == [(2, 22), (2, 21)]
+
+
+def test_model_predictions_use_the_substitute_for_pairs_without_games(tmp_path):
+    df = served_frame()
+    path = tmp_path / "transformed_data.csv"
+    df.to_csv(path, index=False)
+    pipeline, label_encoders, _ = fit_streaming_preprocessing([str(path)])
+    X = pipeline.transform(df[input_features])
+    y = np.stack([label_encoders[col].transform(df[col]) for col in target_features], axis=1)
+    model = MultiOutputClassifier(DecisionTreeClassifier(random_state=0)).fit(X, y)
+    matchups = index(ROWS)
+
+    with pytest.raises(ValueError, match="No data available"):
+        serving.predict_optimal_build("Galio", "Master Yi", df, pipeline, model, label_encoders)
+    empty = serving.predict_optimal_build("Galio", "Master Yi", df, pipeline, model, label_encoders, matchups)
+    sparse = serving.predict_optimal_build("Olaf", "Master Yi", df, pipeline, model, label_encoders, matchups)
+
+    assert empty.attrs["substitute"] == (1, 11)
+    assert sparse.attrs["substitute"] is None
+
+
+def test_indexes_of_another_format_are_rebuilt(tmp_path, monkeypatch):
+    df = served_frame()
+    path = tmp_path / "transformed_data.csv"
+    df.to_csv(path, index=False)
+    written = serving.write_indexes(str(path), str(tmp_path))
+    with open(path, "rb") as f:
+        digest = serving.file_digest(f)
+
+    assert serving.read_indexes(df, digest, str(tmp_path))["format"] == written["format"]
+    monkeypatch.setattr(serving, "INDEXES_FORMAT", written["format"] + 1)
+    assert "format" not in serving.read_indexes(df, digest, str(tmp_path))
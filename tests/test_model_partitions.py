@@ -0,0 +1,91 @@
+import os
+
+import joblib
+import numpy as np
+import pytest
+
+from conftest import make_processed_frame
+from model_partitions import PartitionedModel
+from train_partitioned import train_partitioned, transform
+from train_streaming import fit_streaming_preprocessing, target_features
+
+BOOTS, KEYSTONE = target_features.index("Boots_id"), target_features.index("Keystone")
+
+
+@pytest.fixture
+def partitions(tmp_path):
+    df = make_processed_frame(rows=800)
+    # champions of the "late" partition only ever build two of the four boots and one keystone
+    late = df["championId"] >= 30
+    df.loc[late, "Boots_id"] = np.where(df.loc[late, "kills"] % 2, 3020, 3111)
+    df.loc[late, "Keystone"] = 8214
+    path = tmp_path / "transformed_data.csv"
+    df.to_csv(path, index=False)
+
+    pipeline, label_encoders, _ = fit_streaming_preprocessing([str(path)])
+    routing = {int(c): "late" if c >= 30 else "early" for c in df["championId"].unique()}
+    train_partitioned(df, pipeline, routing, str(tmp_path / "parts"), workers=1, n_estimators=5, max_depth=2)
+    return df, pipeline, label_encoders, str(tmp_path / "parts")
+
+
+def test_partition_predictions_are_global_labels(partitions):
+    df, pipeline, label_encoders, partition_dir = partitions
+    model = PartitionedModel(partition_dir, pipeline, label_encoders, target_features)
+    X = transform(df, pipeline)
+    predicted = model.predict(X)
+    probabilities = model.predict_proba(X)
+
+    for key in ("early", "late"):
+        rows = np.flatnonzero((df["championId"] >= 30) == (key == "late"))
+        partition = joblib.load(os.path.join(partition_dir, model.manifest["partitions"][key]["file"]))
+        for t, col in enumerate(target_features):
+            global_labels = label_encoders[col].classes_[predicted[rows, t]]
+            estimator, local_classes = partition["estimators"][t], partition["classes"][t]
+            if estimator is None:
+                expected = np.full(len(rows), local_classes[0])
+            else:
+                expected = local_classes[estimator.predict(X[rows])]
+            np.testing.assert_array_equal(global_labels, expected)
+            # classes the partition never saw get no probability, and the best one is the prediction
+            unseen = ~np.isin(label_encoders[col].classes_, local_classes)
+            assert not probabilities[t][np.ix_(rows, np.flatnonzero(unseen))].any()
+            np.testing.assert_array_equal(probabilities[t][rows].argmax(axis=1), predicted[rows, t])
+
+    late = np.flatnonzero(df["championId"] >= 30)
+    assert set(label_encoders["Boots_id"].classes_[predicted[late, BOOTS]]) <= {3020, 3111}
+    assert set(label_encoders["Keystone"].classes_[predicted[late, KEYSTONE]]) == {8214}
+
+
+def test_partitions_are_loaded_on_demand_into_a_bounded_lru(partitions):
+    df, pipeline, label_encoders, partition_dir = partitions
+    model = PartitionedModel(partition_dir, pipeline, label_encoders, target_features, cache_size=1)
+    X = transform(df, pipeline)
+    early, late = X[df["championId"] < 30][:1], X[df["championId"] >= 30][:1]
+
+    model.predict(early)
+    model.predict(early)
+    model.predict(late)
+    stats = model.stats()
+    assert stats["loaded"] == ["late"]
+    assert (stats["hits"], stats["misses"]) == (1, 2)
+
+
+def test_retraining_leaves_a_live_model_on_its_own_partitions(partitions):
+    df, pipeline, label_encoders, partition_dir = partitions
+    X = transform(df, pipeline)
+    expected = PartitionedModel(partition_dir, pipeline, label_encoders, target_features).predict(X)
+    # a server that read the manifest but has not loaded any partition yet
+    live = PartitionedModel(partition_dir, pipeline, label_encoders, target_features)
+
+    retrained = df.copy()
+    retrained["Keystone"] = 8005
+    manifest = train_partitioned(retrained, pipeline, {int(c): "late" if c >= 30 else "early" for c in df["championId"]},
+                                 partition_dir, workers=1, n_estimators=5, max_depth=2)
+
+    np.testing.assert_array_equal(live.predict(X), expected)
+    current = PartitionedModel(partition_dir, pipeline, label_encoders, target_features)
+    assert set(label_encoders["Keystone"].classes_[current.predict(X)[:, KEYSTONE]]) == {8005}
+    old_files = {info["file"] for info in live.manifest["partitions"].values()}
+    new_files = {info["file"] for info in manifest["partitions"].values()}
+    assert not old_files & new_files
+    assert set(f for f in os.listdir(partition_dir) if f.endswith(".pkl")) == old_files | new_files
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.multioutput import MultiOutputClassifier
+from sklearn.tree import DecisionTreeClassifier
+
+import serving
+from conftest import make_processed_frame
+from train_streaming import fit_streaming_preprocessing, input_features, target_features
+
+RUNE_IDS = np.array(sorted(serving.rune_id_to_row))
+
+
+def test_decoded_builds_are_legal():
+    rng = np.random.default_rng(0)
+    candidates = 500
+    # every rune is a class of every rune slot, so an unconstrained argmax would often be illegal
+    class_ids = {col: RUNE_IDS for col in target_features}
+    class_ids["Boots_id"] = np.array([3006, 3020, 3047])
+    class_ids["Legendary_1_id"] = class_ids["Legendary_2_id"] = np.array([3031, 3089, 3157])
+    probabilities = {col: rng.dirichlet(np.ones(len(ids)), candidates) for col, ids in class_ids.items()}
+    # the second legendary is often predicted to be the first one
+    probabilities["Legendary_2_id"] = probabilities["Legendary_1_id"]
+
+    builds, confidence = serving.decode_legal_builds(probabilities, class_ids)
+
+    assert confidence.shape == (candidates,)
+    tree, row = serving.rune_id_to_tree.get, serving.rune_id_to_row.get
+    for i in range(candidates):
+        build = {col: int(builds[col][i]) for col in target_features}
+        assert build["Legendary_1_id"] != build["Legendary_2_id"]
+        assert row(build["Keystone"]) == 0
+        for slot, col in enumerate(["PrimarySlot1", "PrimarySlot2", "PrimarySlot3"], start=1):
+            assert tree(build[col]) == tree(build["Keystone"]) and row(build[col]) == slot
+        first, second = build["SecondarySlot1"], build["SecondarySlot2"]
+        assert tree(first) == tree(second) != tree(build["Keystone"])
+        assert 0 < row(first) != row(second) > 0
+
+
+@pytest.fixture
+def counter_data(tmp_path):
+    df = make_processed_frame(rows=600)
+    df = df[df["matchupChampion"] != 11].reset_index(drop=True)
+    # champion IDs 1, 2, 3 and 11 are Annie, Olaf, Galio and Master Yi
+    opponent_games = df.iloc[:14].copy()
+    opponent_games["matchupChampion"] = 11
+    opponent_games["championId"] = [1] * 2 + [2] * 6 + [3] * 6
+    opponent_games["win"] = [1] * 8 + [0] * 6
+    df = pd.concat([df, opponent_games], ignore_index=True)
+
+    path = tmp_path / "transformed_data.csv"
+    df.to_csv(path, index=False)
+    pipeline, label_encoders, _ = fit_streaming_preprocessing([str(path)])
+    X = pipeline.transform(df[input_features])
+    y = np.stack([label_encoders[col].transform(df[col]) for col in target_features], axis=1)
+    model = MultiOutputClassifier(DecisionTreeClassifier(max_depth=3, random_state=0)).fit(X, y)
+    return df, pipeline, model, label_encoders
+
+
+def test_counter_picks_need_min_games_and_rank_by_score(counter_data):
+    df, pipeline, model, label_encoders = counter_data
+
+    picks = serving.counter_picks("Master Yi", df, pipeline, model, label_encoders, min_games=3)
+    # Annie's two wins are below min_games; Olaf's six wins beat Galio's six losses
+    assert [pick["champion"] for pick in picks] == ["Olaf", "Galio"]
+    assert [pick["games"] for pick in picks] == [6, 6]
+
+    picks = serving.counter_picks("Master Yi", df, pipeline, model, label_encoders, min_games=2)
+    assert [pick["champion"] for pick in picks] == ["Olaf", "Annie", "Galio"]
+    scores = [pick["score"] for pick in picks]
+    assert scores == sorted(scores, reverse=True)
+
+    with pytest.raises(ValueError, match="No data available"):
+        serving.counter_picks("Master Yi", df, pipeline, model, label_encoders, min_games=7)
+    with pytest.raises(ValueError, match="Position provided is not valid"):
+        serving.counter_picks("Master Yi", df, pipeline, model, label_encoders, position="roam")
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.compose import ColumnTransformer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import LabelEncoder, OneHotEncoder, StandardScaler
+
+from train_streaming import fit_streaming_preprocessing, input_features, scaled_features, target_features
+
+
+def notebook_preprocessing(df):
+    # the preprocessing of 04_modeling.ipynb, fitted on the whole frame
+    preprocessor = ColumnTransformer(
+        transformers=[
+            ("position", OneHotEncoder(drop='first', handle_unknown='ignore'), ["individualPosition"]),
+            ("scaling", StandardScaler(), scaled_features)
+        ],
+        remainder='passthrough'
+    )
+    pipeline = Pipeline([("preprocessor", preprocessor)]).fit(df[input_features])
+    label_encoders = {col: LabelEncoder().fit(df[col]) for col in target_features}
+    return pipeline, label_encoders
+
+
+def test_streamed_preprocessing_matches_fitting_the_whole_frame(processed_csv):
+    df = pd.read_csv(processed_csv)
+    expected_pipeline, expected_encoders = notebook_preprocessing(df)
+
+    # several chunks, the last one partial
+    pipeline, label_encoders, rows = fit_streaming_preprocessing([processed_csv], chunksize=300)
+
+    assert rows == len(df)
+    scaler = pipeline.named_steps["preprocessor"].named_transformers_["scaling"]
+    expected_scaler = expected_pipeline.named_steps["preprocessor"].named_transformers_["scaling"]
+    for attr in ("mean_", "var_", "scale_"):
+        np.testing.assert_allclose(getattr(scaler, attr), getattr(expected_scaler, attr), rtol=1e-10)
+    assert scaler.n_samples_seen_ == expected_scaler.n_samples_seen_
+
+    encoder = pipeline.named_steps["preprocessor"].named_transformers_["position"]
+    expected_encoder = expected_pipeline.named_steps["preprocessor"].named_transformers_["position"]
+    assert [list(c) for c in encoder.categories_] == [list(c) for c in expected_encoder.categories_]
+
+    np.testing.assert_allclose(pipeline.transform(df[input_features]), expected_pipeline.transform(df[input_features]),
+                               rtol=1e-9, atol=1e-12)
+    for col in target_features:
+        assert list(label_encoders[col].classes_) == list(expected_encoders[col].classes_)
+
+
+@pytest.mark.filterwarnings("ignore:Found unknown categories")
+def test_streamed_preprocessing_ignores_unseen_positions_like_the_notebook(processed_csv):
+    df = pd.read_csv(processed_csv)
+    expected_pipeline, _ = notebook_preprocessing(df)
+    pipeline, _, _ = fit_streaming_preprocessing([processed_csv], chunksize=300)
+
+    row = df[input_features].iloc[:1].copy()
+    row["individualPosition"] = 9
+
+    np.testing.assert_allclose(pipeline.transform(row), expected_pipeline.transform(row), rtol=1e-9)